@@ -0,0 +1,120 @@
+"""Measure how much logging delays the event loop.
+
+Usage:
+    python -m benchmarks.logging_loop_latency [--tasks 100] [--records 200] [--interval-ms 1]
+
+'--tasks' tasks each log '--records' request records, yielding to the loop after each one, while a probe task
+sleeps '--interval-ms' at a time and records how late it wakes up. Records are written to a temporary file:
+
+    off      the level of the logger is WARNING, the records are dropped by the level check
+    direct   a file handler is called on the loop, as logger_settings did before
+    queue    the queue handler of logger_settings, the file is written by the listener thread
+"""
+import argparse
+import asyncio
+import logging
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from user_management.logger_settings import create_file_handler, create_queue_handler
+
+Pipeline = Tuple[logging.Handler, Callable[[], None], Callable[[], None]]
+
+
+def direct_pipeline(filename: str) -> Pipeline:
+    handler: logging.Handler = create_file_handler(filename)
+    return handler, lambda: None, handler.close
+
+
+def queue_pipeline(filename: str) -> Pipeline:
+    file_handler: logging.Handler = create_file_handler(filename)
+    handler, listener = create_queue_handler([file_handler])
+    return handler, listener.start, listener.stop
+
+
+PIPELINES: Dict[str, Tuple[int, Callable[[str], Pipeline]]] = {
+    "off": (logging.WARNING, queue_pipeline),
+    "direct": (logging.INFO, direct_pipeline),
+    "queue": (logging.INFO, queue_pipeline),
+}
+
+
+async def log_requests(logger: logging.Logger, records: int) -> None:
+    for number in range(records):
+        logger.info(
+            "%s %s %s %sB %.1fms",
+            "GET",
+            "/users",
+            200,
+            4096,
+            1.5,
+            extra={"route": "GET /users", "status": 200, "size": 4096, "duration_ms": 1.5, "request_number": number},
+        )
+        await asyncio.sleep(0)
+
+
+async def probe(interval: float, lags: List[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started_at: float = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started_at - interval)
+
+
+async def measure(level: int, pipeline: Pipeline, tasks: int, records: int, interval: float) -> Dict:
+    handler, start, stop = pipeline
+    logger: logging.Logger = logging.getLogger(f"benchmark_{id(handler)}")
+    logger.propagate = False
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    start()
+
+    lags: List[float] = []
+    probe_stopped = asyncio.Event()
+    probe_task: asyncio.Task = asyncio.create_task(probe(interval, lags, probe_stopped))
+
+    started_at: float = time.perf_counter()
+    await asyncio.gather(*(log_requests(logger, records) for _ in range(tasks)))
+    elapsed: float = time.perf_counter() - started_at
+
+    probe_stopped.set()
+    await probe_task
+    stop()
+    logger.removeHandler(handler)
+
+    lags.sort()
+    return {
+        "records_per_second": tasks * records / elapsed,
+        "mean_lag_ms": statistics.fmean(lags) * 1000,
+        "p99_lag_ms": lags[int(len(lags) * 0.99)] * 1000,
+    }
+
+
+async def run(tasks: int, records: int, interval: float) -> None:
+    sys.stdout.write(f"{'logging':>8} {'records/s':>12} {'mean lag, ms':>14} {'p99 lag, ms':>13}\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (level, create_pipeline) in PIPELINES.items():
+            pipeline: Pipeline = create_pipeline(str(pathlib.Path(directory) / f"{name}.log"))
+            result: Dict = await measure(level, pipeline, tasks=tasks, records=records, interval=interval)
+            sys.stdout.write(
+                f"{name:>8} {result['records_per_second']:>12.0f} "
+                f"{result['mean_lag_ms']:>14.3f} {result['p99_lag_ms']:>13.3f}\n"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--records", type=int, default=200)
+    parser.add_argument("--interval-ms", type=float, default=1)
+    args = parser.parse_args()
+
+    asyncio.run(run(tasks=args.tasks, records=args.records, interval=args.interval_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compare the per-request overhead of the buffering and the streaming request logging middleware.
+
+Usage:
+    python -m benchmarks.logging_middleware [--page-size 1000] [--requests 200]
+
+Serves a '/users' page of '--page-size' generated users, shaped like the response of the user list, from an
+application without logging middleware, with the former 'log_requests' middleware, which read the whole body and
+logged it, and with RequestLoggingMiddleware. Requests are sent in process through the ASGI transport and logs are
+written to os.devnull, so the figures are the cost of the middleware itself.
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from httpx import ASGITransport, AsyncClient
+
+from user_management.api.utils.request_logging import RequestLoggingMiddleware
+from user_management.logger_settings import logger
+
+
+async def log_requests(request: Request, call_next):
+    logger.info(f"Received request: {request.method} {request.url} {request.headers}")
+
+    response = await call_next(request)
+
+    response_body: bytes = b""
+
+    async for chunk in response.body_iterator:
+        response_body += chunk
+
+    logger.info(f"Sent response: status_code: {response.status_code}, body: {response_body}\n")
+
+    return Response(
+        status_code=response.status_code,
+        content=response_body,
+        headers=dict(response.headers),
+    )
+
+
+def generate_users(page_size: int) -> List[Dict]:
+    now: str = datetime.datetime.now(tz=datetime.timezone.utc).isoformat()
+    return [
+        {
+            "user_id": str(uuid.uuid4()),
+            "name": f"name{number}",
+            "surname": f"surname{number}",
+            "username": f"user{number}",
+            "phone_number": f"+3751{number:08d}",
+            "email": f"user{number}@example.com",
+            "role": "USER",
+            "image_s3_path": f"http://localhost:4566/bucket/user{number}",
+            "is_blocked": False,
+            "created_at": now,
+            "modified_at": now,
+            "version": 1,
+            "group": {"group_id": 1, "name": "group", "created_at": now},
+        }
+        for number in range(page_size)
+    ]
+
+
+def create_app(users: List[Dict], add_middleware: Callable[[FastAPI], None]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/users")
+    async def read_users():
+        return {"users": users, "total": len(users)}
+
+    add_middleware(app)
+    return app
+
+
+APPLICATIONS: Dict[str, Callable[[FastAPI], None]] = {
+    "none": lambda app: None,
+    "buffering": lambda app: app.middleware("http")(log_requests),
+    "streaming": lambda app: app.add_middleware(RequestLoggingMiddleware),
+}
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark") as client:
+        await client.get("/users")
+
+        started_at: float = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/users")
+
+        return (time.perf_counter() - started_at) / requests
+
+
+async def run(page_size: int, requests: int) -> None:
+    logger.handlers = [logging.FileHandler(os.devnull)]
+    users: List[Dict] = generate_users(page_size)
+    baseline: float = 0
+
+    sys.stdout.write(f"{'middleware':>10} {'ms/request':>12} {'overhead, ms':>14}\n")
+
+    for name, add_middleware in APPLICATIONS.items():
+        seconds_per_request: float = await measure(create_app(users, add_middleware), requests=requests)
+        baseline = baseline or seconds_per_request
+        overhead: float = seconds_per_request - baseline
+        sys.stdout.write(f"{name:>10} {seconds_per_request * 1000:>12.2f} {overhead * 1000:>14.2f}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(run(page_size=args.page_size, requests=args.requests))
+
+
+if __name__ == "__main__":
+    main()
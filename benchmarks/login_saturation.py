@@ -0,0 +1,96 @@
+"""Measure '/user/me' latency while '/auth/login' is saturated.
+
+Usage:
+    python -m benchmarks.login_saturation [--login-concurrency 32] [--duration 20] [--probe-interval 0.05]
+
+Runs against the server at WEBAPP_TEST_HOST with the admin credentials from '.env'. First '/user/me' is
+probed on an idle server, then again while 'login-concurrency' clients log in back to back. With password
+hashing on the event loop the p99 of '/user/me' grows with the login load; with the hashing pool it stays
+close to the idle value. Run it against the same server with one uvicorn worker to compare builds.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import List
+
+import httpx
+
+from tests.test_client import AuthTestClient, UserTestClient
+from user_management.config import config
+
+auth_client = AuthTestClient()
+user_client = UserTestClient()
+
+
+def percentile(samples: List[float], percent: int) -> float:
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+async def probe_me(client: httpx.AsyncClient, token: str, duration: float, interval: float) -> List[float]:
+    latencies: List[float] = []
+    deadline: float = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        started_at: float = time.perf_counter()
+        response: httpx.Response = await user_client.rud_current_user(action="read", token=token, client=client)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started_at)
+        await asyncio.sleep(interval)
+
+    return latencies
+
+
+async def saturate_login(client: httpx.AsyncClient, deadline: float) -> int:
+    logins: int = 0
+    while time.perf_counter() < deadline:
+        await auth_client.authenticate(username=config.ADMIN_USERNAME, password=config.ADMIN_PASSWORD, client=client)
+        logins += 1
+
+    return logins
+
+
+def report(name: str, latencies: List[float]) -> None:
+    sys.stdout.write(
+        f"{name:>10} | {len(latencies):>7} | {percentile(latencies, 50) * 1e3:>8.1f} | "
+        f"{percentile(latencies, 99) * 1e3:>8.1f}\n"
+    )
+
+
+async def run(login_concurrency: int, duration: float, probe_interval: float) -> None:
+    limits = httpx.Limits(max_connections=login_concurrency + 1)
+
+    async with httpx.AsyncClient(base_url=config.WEBAPP_TEST_HOST, limits=limits) as client:
+        login_response: httpx.Response = await auth_client.authenticate(
+            username=config.ADMIN_USERNAME, password=config.ADMIN_PASSWORD, client=client
+        )
+        token: str = login_response.json()["access_token"]
+
+        idle: List[float] = await probe_me(client, token, duration, probe_interval)
+
+        deadline: float = time.perf_counter() + duration
+        login_tasks = [asyncio.create_task(saturate_login(client, deadline)) for _ in range(login_concurrency)]
+        loaded: List[float] = await probe_me(client, token, duration, probe_interval)
+        logins: int = sum(await asyncio.gather(*login_tasks))
+
+    sys.stdout.write(f"{'load':>10} | {'samples':>7} | {'p50, ms':>8} | {'p99, ms':>8}\n")
+    report("idle", idle)
+    report("login", loaded)
+    sys.stdout.write(f"logins completed under load: {logins} ({logins / duration:.1f}/s)\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--login-concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20, help="seconds per phase")
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="seconds between '/user/me' probes")
+    args = parser.parse_args()
+
+    asyncio.run(
+        run(login_concurrency=args.login_concurrency, duration=args.duration, probe_interval=args.probe_interval)
+    )
+
+
+if __name__ == "__main__":
+    main()
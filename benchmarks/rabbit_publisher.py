@@ -0,0 +1,98 @@
+"""Measure the throughput of the RabbitMQ publisher with publisher confirms.
+
+Usage:
+    python -m benchmarks.rabbit_publisher [--messages 20000] [--concurrency 256] [--latency-ms 1] [--rabbitmq]
+
+By default the publisher talks to an in-memory broker stand-in which confirms every message after
+'latency-ms', so the numbers show the overhead of buffering, channel pooling and confirm tracking.
+With '--rabbitmq' the broker configured in '.env' is used instead, and the previous approach of one
+blocking connection per message is measured as well for comparison.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Optional
+
+import pika
+
+from tests.fake_broker import FakeBroker
+from user_management.config import config
+from user_management.rabbit.settings import PikaClient
+
+QUEUE_NAME = "benchmark_rabbit_publisher"
+
+
+async def publish_all(client: PikaClient, messages: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def publish(number: int) -> None:
+        async with semaphore:
+            await client.publish(QUEUE_NAME, str(number).encode())
+
+    started_at: float = time.perf_counter()
+    await asyncio.gather(*(publish(number) for number in range(messages)))
+
+    return time.perf_counter() - started_at
+
+
+def publish_with_blocking_connections(client: PikaClient, messages: int) -> float:
+    started_at: float = time.perf_counter()
+
+    for number in range(messages):
+        connection = pika.BlockingConnection(client.get_connection_parameters())
+        channel = connection.channel()
+        channel.queue_declare(queue=QUEUE_NAME)
+        channel.basic_publish(exchange="", routing_key=QUEUE_NAME, body=str(number).encode())
+        connection.close()
+
+    return time.perf_counter() - started_at
+
+
+async def run(messages: int, concurrency: int, latency: float, rabbitmq: bool) -> None:
+    broker: Optional[FakeBroker] = None if rabbitmq else FakeBroker(latency=latency)
+    client = PikaClient(
+        channel_pool_size=config.RABBITMQ_CHANNEL_POOL_SIZE,
+        max_buffered_messages=max(messages, config.RABBITMQ_MAX_BUFFERED_MESSAGES),
+        connection_factory=broker.connect if broker else None,
+    )
+    await client.start()
+
+    try:
+        elapsed: float = await publish_all(client, messages, concurrency)
+        sys.stdout.write(
+            f"persistent publisher: {messages} confirmed messages with concurrency {concurrency} "
+            f"in {elapsed:.2f} s ({messages / elapsed:.0f}/s), {client.stats()}\n"
+        )
+    finally:
+        await client.close()
+
+    if rabbitmq:
+        legacy_messages: int = min(messages, 1000)
+        elapsed = await asyncio.to_thread(publish_with_blocking_connections, client, legacy_messages)
+        sys.stdout.write(
+            f"connection per message: {legacy_messages} messages in {elapsed:.2f} s "
+            f"({legacy_messages / elapsed:.0f}/s)\n"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=1, help="confirm latency of the broker stand-in")
+    parser.add_argument("--rabbitmq", action="store_true", help="publish to the broker configured in '.env'")
+    args = parser.parse_args()
+
+    asyncio.run(
+        run(
+            messages=args.messages,
+            concurrency=args.concurrency,
+            latency=args.latency_ms / 1000,
+            rabbitmq=args.rabbitmq,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
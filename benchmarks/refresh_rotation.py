@@ -0,0 +1,88 @@
+"""Measure refresh-token rotation throughput and check that concurrent reuse of one token is caught.
+
+Usage:
+    python -m benchmarks.refresh_rotation [--tokens 10000] [--concurrency 64] [--races 1000] [--fake]
+
+Runs against the Redis configured in '.env' unless '--fake' is given. Every rotation is one MULTI/EXEC
+round trip. The race phase refreshes each token from 'concurrency' coroutines at once and counts how
+many refreshes succeeded; exactly one per token is expected.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from typing import List
+
+from fakeredis.aioredis import FakeRedis
+
+from user_management.api.auth.tokens import AuthToken
+from user_management.api.utils.exceptions import TokenError
+from user_management.redis_settings import close_redis_pool, get_redis_client
+
+
+def create_refresh_tokens(auth_token: AuthToken, count: int) -> List[str]:
+    return [auth_token.create_token_pair(user_id=uuid.uuid4(), role_name="USER")[1] for _ in range(count)]
+
+
+async def rotate_all(auth_token: AuthToken, tokens: List[str], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def rotate(token: str) -> None:
+        async with semaphore:
+            await auth_token.refresh_token(token)
+
+    started_at: float = time.perf_counter()
+    await asyncio.gather(*(rotate(token) for token in tokens))
+
+    return time.perf_counter() - started_at
+
+
+async def race(auth_token: AuthToken, token: str, concurrency: int) -> int:
+    results = await asyncio.gather(
+        *(auth_token.refresh_token(token) for _ in range(concurrency)), return_exceptions=True
+    )
+
+    for result in results:
+        if isinstance(result, Exception) and not isinstance(result, TokenError):
+            raise result
+
+    return sum(not isinstance(result, Exception) for result in results)
+
+
+async def run(tokens_count: int, concurrency: int, races: int, fake: bool) -> None:
+    auth_token = AuthToken(redis_client=FakeRedis() if fake else get_redis_client())
+
+    try:
+        tokens: List[str] = create_refresh_tokens(auth_token, tokens_count)
+        elapsed: float = await rotate_all(auth_token, tokens, concurrency)
+        sys.stdout.write(
+            f"rotated {tokens_count} tokens with concurrency {concurrency} in {elapsed:.2f} s "
+            f"({tokens_count / elapsed:.0f}/s)\n"
+        )
+
+        successes: List[int] = [
+            await race(auth_token, token, concurrency) for token in create_refresh_tokens(auth_token, races)
+        ]
+        sys.stdout.write(
+            f"raced {races} tokens x {concurrency} concurrent refreshes: "
+            f"{successes.count(1)} with exactly one success, {races - successes.count(1)} violations\n"
+        )
+
+    finally:
+        await close_redis_pool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--races", type=int, default=1_000)
+    parser.add_argument("--fake", action="store_true", help="use an in-memory fakeredis instead of a real server")
+    args = parser.parse_args()
+
+    asyncio.run(run(tokens_count=args.tokens, concurrency=args.concurrency, races=args.races, fake=args.fake))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare refresh-token revocation lookups: legacy SMEMBERS scan vs. per-token keys.
+
+Usage:
+    python -m benchmarks.token_revocation [--sizes 1000 10000 100000 1000000] [--lookups 500] [--fake]
+
+Runs against the Redis configured in '.env' unless '--fake' is given. The benchmark uses its own key
+prefix and removes all of its keys when finished.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from typing import List
+
+from fakeredis.aioredis import FakeRedis
+from redis import asyncio as aioredis
+
+from user_management.config import config
+
+LEGACY_SET_KEY = "benchmark:token_blacklist"
+REVOKED_KEY_PREFIX = "benchmark:revoked_token:"
+LEGACY_SCAN_LIMIT = 100_000
+FILL_BATCH_SIZE = 10_000
+
+
+async def fill(redis_client: aioredis.Redis, token_ids: List[str], with_legacy_set: bool) -> None:
+    for start in range(0, len(token_ids), FILL_BATCH_SIZE):
+        end: int = start + FILL_BATCH_SIZE
+        batch: List[str] = token_ids[start:end]
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for token_id in batch:
+                pipe.set(f"{REVOKED_KEY_PREFIX}{token_id}", 1, ex=3600)
+            if with_legacy_set:
+                pipe.sadd(LEGACY_SET_KEY, *batch)
+            await pipe.execute()
+
+
+async def measure_keyed_lookup(redis_client: aioredis.Redis, lookups: int) -> float:
+    started_at: float = time.perf_counter()
+    for _ in range(lookups):
+        await redis_client.exists(f"{REVOKED_KEY_PREFIX}{uuid.uuid4().hex}")
+    return (time.perf_counter() - started_at) / lookups
+
+
+async def measure_legacy_lookup(redis_client: aioredis.Redis, lookups: int) -> float:
+    started_at: float = time.perf_counter()
+    for _ in range(lookups):
+        tokens = await redis_client.smembers(LEGACY_SET_KEY)
+        _ = uuid.uuid4().hex.encode() in tokens
+    return (time.perf_counter() - started_at) / lookups
+
+
+async def cleanup(redis_client: aioredis.Redis) -> None:
+    await redis_client.delete(LEGACY_SET_KEY)
+    async for key in redis_client.scan_iter(match=f"{REVOKED_KEY_PREFIX}*", count=FILL_BATCH_SIZE):
+        await redis_client.delete(key)
+
+
+async def run(sizes: List[int], lookups: int, fake: bool) -> None:
+    redis_client = FakeRedis() if fake else aioredis.from_url(config.redis_url)
+    filled: int = 0
+
+    sys.stdout.write(f"{'revocations':>12} | {'keyed lookup, us':>16} | {'SMEMBERS scan, us':>17}\n")
+
+    try:
+        for size in sorted(sizes):
+            await fill(
+                redis_client,
+                token_ids=[uuid.uuid4().hex for _ in range(size - filled)],
+                with_legacy_set=size <= LEGACY_SCAN_LIMIT,
+            )
+            filled = size
+
+            keyed: float = await measure_keyed_lookup(redis_client, lookups)
+            legacy: str = "skipped"
+            if size <= LEGACY_SCAN_LIMIT:
+                legacy = f"{await measure_legacy_lookup(redis_client, max(lookups // 10, 1)) * 1e6:.1f}"
+
+            sys.stdout.write(f"{size:>12} | {keyed * 1e6:>16.1f} | {legacy:>17}\n")
+
+    finally:
+        await cleanup(redis_client)
+        await redis_client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--fake", action="store_true", help="use an in-memory fakeredis instead of a real server")
+    args = parser.parse_args()
+
+    asyncio.run(run(sizes=args.sizes, lookups=args.lookups, fake=args.fake))
+
+
+if __name__ == "__main__":
+    main()
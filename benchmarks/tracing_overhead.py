@@ -0,0 +1,97 @@
+"""Measure the per-request cost of tracing at several sample rates.
+
+Usage:
+    python -m benchmarks.tracing_overhead [--requests 2000] [--child-spans 5] [--rounds 5]
+
+Requests are sent in process through the ASGI transport to a route handled like the routes of the application,
+which opens '--child-spans' spans, as the statements and Redis calls of a request do. Recorded spans are written
+to os.devnull by the JSON lines exporter, so the figures include serializing them. The best of '--rounds'
+rounds is reported.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from user_management.api.utils.request_tracing import RequestTracingMiddleware
+from user_management.api.utils.routing import UnitOfWorkRoute
+from user_management.tracing import JsonLinesSpanExporter, SpanExporter, tracer
+
+# exporter, sample rate
+SETTINGS: Dict[str, Tuple[bool, float]] = {
+    "off": (False, 0),
+    "1%": (True, 0.01),
+    "10%": (True, 0.1),
+    "100%": (True, 1),
+}
+
+
+def create_app(child_spans: int) -> FastAPI:
+    router = APIRouter(route_class=UnitOfWorkRoute)
+
+    @router.get("/users/{user_id}")
+    async def read_user(user_id: int):
+        for _ in range(child_spans):
+            query_span = tracer.start_child_span("db.query", attributes={"db.operation": "UserManager.get_by_id"})
+            if query_span is not None:
+                tracer.end_span(query_span)
+        return {"user_id": user_id}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(RequestTracingMiddleware)
+    return app
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://benchmark") as client:
+        await client.get("/users/1")
+
+        started_at: float = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/users/1")
+
+        return (time.perf_counter() - started_at) / requests
+
+
+async def run(requests: int, child_spans: int, rounds: int) -> None:
+    app: FastAPI = create_app(child_spans)
+    timings: Dict[str, float] = {}
+
+    # the settings take turns, so a slower period of the host does not favour one of them
+    for _ in range(rounds):
+        for name, (export, sample_rate) in SETTINGS.items():
+            exporter: Optional[SpanExporter] = (
+                JsonLinesSpanExporter(lambda: open(os.devnull, "w")) if export else None  # noqa: SIM115
+            )
+            tracer.exporter, tracer.sample_rate = exporter, sample_rate
+
+            seconds_per_request: float = await measure(app, requests=requests)
+            timings[name] = min(timings.get(name, seconds_per_request), seconds_per_request)
+
+            if exporter is not None:
+                exporter.shutdown()
+
+    sys.stdout.write(f"{'sampled':>8} {'us/request':>12} {'overhead':>10}\n")
+    for name, seconds_per_request in timings.items():
+        overhead: float = seconds_per_request / timings["off"] - 1
+        sys.stdout.write(f"{name:>8} {seconds_per_request * 1e6:>12.0f} {overhead:>10.1%}\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--child-spans", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run(requests=args.requests, child_spans=args.child_spans, rounds=args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare insert throughput and primary key index size for uuid4 and uuid7 keys.
+
+Usage:
+    python -m benchmarks.user_id_inserts [--rows 1000000] [--batch-size 10000]
+
+Runs against the database configured in '.env'. For each generator a temporary table with a UUID primary
+key, shaped like the key of the 'user' table, is filled with '--rows' rows in batches of '--batch-size'
+generated in Python, as the application does. The table is dropped at the end of the session.
+Random keys land on random leaf pages of the index, which splits pages and leaves them half full;
+time-ordered keys are appended to the rightmost leaf.
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List
+
+from sqlalchemy import text
+
+from user_management.database.db_settings import engine
+from user_management.database.identifiers import UUID7Generator
+
+GENERATORS: Dict[str, Callable[[], uuid.UUID]] = {"uuid4": uuid.uuid4, "uuid7": UUID7Generator()}
+
+
+async def measure(name: str, generate: Callable[[], uuid.UUID], rows: int, batch_size: int) -> Dict:
+    table: str = f"benchmark_{name}"
+    insert_query = text(f"INSERT INTO {table} (user_id, username) VALUES (:user_id, :username)")  # noqa: S608
+
+    async with engine.connect() as connection:
+        await connection.execute(text(f"CREATE TEMPORARY TABLE {table} (user_id uuid PRIMARY KEY, username text)"))
+        await connection.commit()
+
+        started_at: float = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch: List[Dict] = [
+                {"user_id": generate(), "username": f"user{number}"}
+                for number in range(offset, min(offset + batch_size, rows))
+            ]
+            await connection.execute(insert_query, batch)
+            await connection.commit()
+        elapsed: float = time.perf_counter() - started_at
+
+        index_size: int = await connection.scalar(text(f"SELECT pg_relation_size('{table}_pkey')"))
+        await connection.execute(text(f"DROP TABLE {table}"))
+        await connection.commit()
+
+    return {"rows_per_second": rows / elapsed, "index_size_mb": index_size / 2**20}
+
+
+async def run(rows: int, batch_size: int) -> None:
+    try:
+        sys.stdout.write(f"{'generator':>10} {'rows/s':>12} {'pkey index, MB':>16}\n")
+
+        for name, generate in GENERATORS.items():
+            result: Dict = await measure(name, generate, rows=rows, batch_size=batch_size)
+            sys.stdout.write(f"{name:>10} {result['rows_per_second']:>12.0f} {result['index_size_mb']:>16.1f}\n")
+
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    asyncio.run(run(rows=args.rows, batch_size=args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
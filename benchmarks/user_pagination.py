@@ -0,0 +1,118 @@
+"""Compare the latency of offset and keyset (cursor) pages of the user list at increasing depth.
+
+Usage:
+    python -m benchmarks.user_pagination [--users 1000000] [--limit 50] [--sort-by created_at] [--repeat 5] [--keep]
+
+Runs against the database configured in '.env'. Missing benchmark users (usernames starting with
+'benchmark_') are inserted first with one INSERT ... SELECT FROM generate_series, and deleted at the
+end unless '--keep' is given. The cursor for each depth is looked up once outside of the timing;
+offset timings include the COUNT(*) that offset mode runs for 'total_pages'.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+
+from user_management.database.db_settings import async_session_maker, engine
+from user_management.database.models import User
+from user_management.managers.user_manager import UserManager
+
+USERNAME_PREFIX = "benchmark_"
+DEPTHS = (1, 10, 100, 1_000, 10_000)
+
+SEED_QUERY = text(
+    """
+    INSERT INTO "user" (
+        user_id, name, surname, username, password, role, phone_number, email, is_blocked, created_at, modified_at
+    )
+    SELECT gen_random_uuid(), initcap(substr(md5(i::text), 1, 8)), initcap(substr(md5(i::text), 9, 10)),
+           CAST(:prefix AS text) || i, '', 'USER', 'b' || i, CAST(:prefix AS text) || i || '@example.com', false,
+           now() - i * interval '1 second', now()
+    FROM generate_series(CAST(:start AS integer), CAST(:stop AS integer)) AS i
+    """
+)
+
+
+async def seed_users(count: int) -> None:
+    async with async_session_maker() as session:
+        existing: int = await session.scalar(
+            select(func.count()).select_from(User).filter(User.username.startswith(USERNAME_PREFIX))
+        )
+        if existing < count:
+            await session.execute(SEED_QUERY, {"prefix": USERNAME_PREFIX, "start": existing + 1, "stop": count})
+            await session.execute(text('ANALYZE "user"'))
+            await session.commit()
+
+
+async def delete_users() -> None:
+    async with async_session_maker() as session:
+        await session.execute(delete(User).filter(User.username.startswith(USERNAME_PREFIX)))
+        await session.commit()
+
+
+async def get_position(manager: UserManager, sort_field: str, offset: int) -> Optional[Tuple[Any, Any]]:
+    query = manager.order_user_list(select(User), sort_field=sort_field, ord_direction="asc").offset(offset).limit(1)
+
+    async with async_session_maker() as session:
+        user: Optional[User] = (await session.scalars(query)).unique().first()
+
+    return None if user is None else (manager.get_sort_value(user, sort_field), user.user_id)
+
+
+async def measure(coroutine_factory, repeat: int) -> float:
+    timings: List[float] = []
+
+    for _ in range(repeat):
+        started_at: float = time.perf_counter()
+        await coroutine_factory()
+        timings.append(time.perf_counter() - started_at)
+
+    return statistics.median(timings)
+
+
+async def run(users: int, limit: int, sort_field: str, repeat: int, keep: bool) -> None:
+    manager = UserManager()
+    await seed_users(users)
+
+    try:
+        sys.stdout.write(f"{'page':>8} {'offset, ms':>12} {'cursor, ms':>12}\n")
+
+        for page in DEPTHS:
+            offset: int = (page - 1) * limit
+            if offset >= users:
+                break
+
+            position = await get_position(manager, sort_field=sort_field, offset=offset - 1) if offset else None
+
+            offset_time: float = await measure(
+                lambda: manager.get_all(offset=offset, limit=limit, sort_field=sort_field), repeat
+            )
+            cursor_time: float = await measure(
+                lambda: manager.get_page_after(limit=limit, sort_field=sort_field, after=position), repeat
+            )
+            sys.stdout.write(f"{page:>8} {offset_time * 1000:>12.1f} {cursor_time * 1000:>12.1f}\n")
+
+    finally:
+        if not keep:
+            await delete_users()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--sort-by", default="created_at", choices=sorted(UserManager.sort_keys))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark users for the next run")
+    args = parser.parse_args()
+
+    asyncio.run(run(users=args.users, limit=args.limit, sort_field=args.sort_by, repeat=args.repeat, keep=args.keep))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Compare the latency of the name ILIKE filter with the trigram-indexed search at several table sizes.
+
+Usage:
+    python -m benchmarks.user_search [--sizes 100000 1000000] [--limit 50] [--repeat 5] [--keep]
+
+Runs against the database configured in '.env', after the migrations. Benchmark users are added to
+reach each size (see benchmarks.user_pagination) and deleted at the end unless '--keep' is given.
+The ILIKE path is timed with index scans disabled, which is how it ran before the trigram indexes.
+Search terms are fragments of seeded names, so both paths return rows.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import List
+
+from sqlalchemy import desc, select, text
+from sqlalchemy.sql.selectable import Select
+
+from benchmarks.user_pagination import USERNAME_PREFIX, delete_users, seed_users
+from user_management.database.db_settings import async_session_maker, engine
+from user_management.database.models import User
+from user_management.managers.user_manager import UserManager
+
+
+async def get_search_terms(count: int) -> List[str]:
+    query: Select = (
+        select(User.name).filter(User.username.startswith(USERNAME_PREFIX)).order_by(User.username).limit(count)
+    )
+
+    async with async_session_maker() as session:
+        names: List[str] = list(await session.scalars(query))
+
+    return [name[1:6] for name in names]
+
+
+async def measure(query: Select, repeat: int, disable_index_scans: bool = False) -> float:
+    timings: List[float] = []
+
+    async with async_session_maker() as session:
+        if disable_index_scans:
+            await session.execute(text("SET LOCAL enable_bitmapscan = off"))
+            await session.execute(text("SET LOCAL enable_indexscan = off"))
+
+        for _ in range(repeat):
+            started_at: float = time.perf_counter()
+            (await session.scalars(query)).unique().all()
+            timings.append(time.perf_counter() - started_at)
+
+    return statistics.median(timings)
+
+
+async def run(sizes: List[int], limit: int, repeat: int, keep: bool) -> None:
+    manager = UserManager()
+
+    try:
+        sys.stdout.write(f"{'users':>10} {'term':>8} {'ilike, ms':>12} {'search, ms':>12}\n")
+
+        for size in sorted(sizes):
+            await seed_users(size)
+
+            for term in await get_search_terms(3):
+                ilike_query: Select = manager.filter_user_list(select(User), name=term).limit(limit)
+                search_query: Select = (
+                    manager.filter_user_list(select(User), search=term)
+                    .order_by(desc(manager.get_search_rank(term)), User.user_id)
+                    .limit(limit)
+                )
+
+                ilike_time: float = await measure(ilike_query, repeat, disable_index_scans=True)
+                search_time: float = await measure(search_query, repeat)
+                sys.stdout.write(f"{size:>10} {term:>8} {ilike_time * 1000:>12.1f} {search_time * 1000:>12.1f}\n")
+
+    finally:
+        if not keep:
+            await delete_users()
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark users for the next run")
+    args = parser.parse_args()
+
+    asyncio.run(run(sizes=args.sizes, limit=args.limit, repeat=args.repeat, keep=args.keep))
+
+
+if __name__ == "__main__":
+    main()
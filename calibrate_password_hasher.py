@@ -0,0 +1,42 @@
+"""Recommend a bcrypt cost for this host.
+
+Usage:
+    python calibrate_password_hasher.py [--target-ms 250] [--min-rounds 10] [--max-rounds 16] [--samples 3]
+
+Measures how long one hash takes at each cost and prints the highest cost that fits the target latency.
+Set it as PASSWORD_HASH_BCRYPT_ROUNDS; stored hashes are upgraded on the next successful login.
+"""
+import argparse
+import sys
+
+from user_management.api.utils.hashers import recommend_bcrypt_rounds
+from user_management.config import config
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250, help="latency budget of one hash in milliseconds")
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    parser.add_argument("--samples", type=int, default=3, help="hashes measured per cost")
+    args = parser.parse_args()
+
+    recommended_rounds, timings = recommend_bcrypt_rounds(
+        target_seconds=args.target_ms / 1000,
+        min_rounds=args.min_rounds,
+        max_rounds=args.max_rounds,
+        samples=args.samples,
+    )
+
+    sys.stdout.write(f"{'rounds':>6} | {'hash time, ms':>13}\n")
+    for rounds, seconds in timings.items():
+        sys.stdout.write(f"{rounds:>6} | {seconds * 1000:>13.1f}\n")
+
+    sys.stdout.write(
+        f"PASSWORD_HASH_BCRYPT_ROUNDS={recommended_rounds} "
+        f"(currently {config.PASSWORD_HASH_BCRYPT_ROUNDS}, target {args.target_ms:.0f} ms)\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@ import asyncio
 
 from sqlalchemy.exc import IntegrityError
 
-from user_management.api.utils.hashers import PasswordHasher
+from user_management.api.utils.hashers import PasswordHasher, password_hashing_pool
 from user_management.config import config
 from user_management.database.db_settings import async_session_maker
 from user_management.database.models import User
@@ -11,7 +11,7 @@ from user_management.logger_settings import logger
 
 async def create_admin():
     async with async_session_maker() as session:
-        hashed_password = PasswordHasher().hash_password(config.ADMIN_PASSWORD)
+        hashed_password = await PasswordHasher().hash_password_async(config.ADMIN_PASSWORD)
 
         try:
             admin: User = User(
@@ -30,7 +30,10 @@ async def create_admin():
 
 
 async def main():
-    await create_admin()
+    try:
+        await create_admin()
+    finally:
+        password_hashing_pool.shutdown()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+import asyncio
+
+from user_management.api.auth.tokens import AuthToken
+from user_management.logger_settings import logger
+from user_management.redis_settings import close_redis_pool, get_redis_client
+
+
+async def migrate_token_blacklist():
+    try:
+        migrated_count: int = await AuthToken.migrate_legacy_blacklist(redis_client=get_redis_client())
+        logger.info("%s revoked tokens migrated", migrated_count)
+
+    finally:
+        await close_redis_pool()
+
+
+async def main():
+    await migrate_token_blacklist()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
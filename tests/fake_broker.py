@@ -0,0 +1,101 @@
+import asyncio
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Callable, DefaultDict, List, Optional, Tuple
+
+import pika
+from pika.exceptions import AMQPConnectionError, ConnectionClosedByBroker, ConnectionWrongStateError
+
+
+class FakeBrokerChannel:
+    """A channel which stores published messages in the broker and confirms them after the broker latency."""
+
+    def __init__(self, broker: "FakeBroker", connection: "FakeBrokerConnection", channel_number: int):
+        self.broker = broker
+        self.connection = connection
+        self.channel_number = channel_number
+        self.delivery_tag: int = 0
+        self.ack_nack_callback: Optional[Callable] = None
+        self.close_callbacks: List[Callable] = []
+
+    def add_on_close_callback(self, callback: Callable) -> None:
+        self.close_callbacks.append(callback)
+
+    def confirm_delivery(self, ack_nack_callback: Callable, callback: Optional[Callable] = None) -> None:
+        self.ack_nack_callback = ack_nack_callback
+        if callback:
+            asyncio.get_running_loop().call_soon(callback, SimpleNamespace(method=pika.spec.Confirm.SelectOk()))
+
+    def queue_declare(self, queue: str, callback: Optional[Callable] = None, **kwargs) -> None:
+        self.broker.declared_queues.append(queue)
+        if callback:
+            asyncio.get_running_loop().call_soon(callback, SimpleNamespace(method=pika.spec.Queue.DeclareOk(queue)))
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes, properties=None, mandatory=False) -> None:
+        if not self.connection.is_open:
+            raise ConnectionWrongStateError("connection is closed")
+
+        self.delivery_tag += 1
+        self.broker.queues[routing_key].append((body, properties))
+        asyncio.get_running_loop().call_later(self.broker.latency, self._confirm, self.delivery_tag)
+
+    def _confirm(self, delivery_tag: int) -> None:
+        if not self.connection.is_open:
+            return
+
+        if self.broker.reject:
+            method = pika.spec.Basic.Nack(delivery_tag=delivery_tag)
+        else:
+            method = pika.spec.Basic.Ack(delivery_tag=delivery_tag)
+        self.ack_nack_callback(SimpleNamespace(method=method))
+
+
+class FakeBrokerConnection:
+    def __init__(self, broker: "FakeBroker", on_open_callback, on_open_error_callback, on_close_callback):
+        self.broker = broker
+        self.on_close_callback = on_close_callback
+        self.channels: List[FakeBrokerChannel] = []
+        self.is_open: bool = broker.available
+
+        loop = asyncio.get_running_loop()
+        if broker.available:
+            loop.call_soon(on_open_callback, self)
+        else:
+            loop.call_soon(on_open_error_callback, self, AMQPConnectionError("broker is not available"))
+
+    @property
+    def is_closed(self) -> bool:
+        return not self.is_open
+
+    def channel(self, channel_number: Optional[int] = None, on_open_callback: Optional[Callable] = None):
+        channel = FakeBrokerChannel(self.broker, self, channel_number or len(self.channels) + 1)
+        self.channels.append(channel)
+        asyncio.get_running_loop().call_soon(on_open_callback, channel)
+
+    def close(self, reason: Optional[Exception] = None) -> None:
+        if not self.is_open:
+            return
+
+        self.is_open = False
+        asyncio.get_running_loop().call_soon(self.on_close_callback, self, reason or "closed by client")
+
+    def drop(self) -> None:
+        """Simulate the broker going away."""
+        self.close(ConnectionClosedByBroker(320, "connection forced"))
+
+
+class FakeBroker:
+    """An in-memory stand-in for RabbitMQ, pass `connect` as the publisher connection factory."""
+
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.available: bool = True
+        self.reject: bool = False
+        self.connections: List[FakeBrokerConnection] = []
+        self.declared_queues: List[str] = []
+        self.queues: DefaultDict[str, List[Tuple[bytes, pika.BasicProperties]]] = defaultdict(list)
+
+    def connect(self, parameters, on_open_callback, on_open_error_callback, on_close_callback) -> FakeBrokerConnection:
+        connection = FakeBrokerConnection(self, on_open_callback, on_open_error_callback, on_close_callback)
+        self.connections.append(connection)
+        return connection
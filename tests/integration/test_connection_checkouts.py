@@ -0,0 +1,102 @@
+from functools import partial
+from typing import Dict, Tuple
+
+import httpx
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from tests.test_client import AuthTestClient, GroupTestClient, UserTestClient
+from user_management.config import config
+
+# with read replicas a request may read from a replica and from the primary
+REPLICA_CHECKOUTS = 1 if config.DB_REPLICA_URLS else 0
+
+
+class TestConnectionCheckouts:
+    """Pin the number of pool connections a request checks out, read from the per-route stats."""
+
+    auth_client = AuthTestClient()
+    user_client = UserTestClient()
+    group_client = GroupTestClient()
+
+    @staticmethod
+    async def get_route_checkouts(route: str, admin_token: str, client: AsyncClient) -> Tuple[int, int]:
+        response: httpx.Response = await client.get("/um/stats", headers={"Authorization": f"Bearer {admin_token}"})
+        route_stats: Dict = response.json()["db_checkouts_per_route"].get(route, {"requests": 0, "checkouts": 0})
+
+        return route_stats["requests"], route_stats["checkouts"]
+
+    async def assert_checkouts(self, route: str, request, max_checkouts: int, admin_token: str, client: AsyncClient):
+        requests_before, checkouts_before = await self.get_route_checkouts(route, admin_token, client)
+
+        response: httpx.Response = await request()
+        assert response.status_code < status.HTTP_400_BAD_REQUEST
+
+        requests_after, checkouts_after = await self.get_route_checkouts(route, admin_token, client)
+        assert requests_after == requests_before + 1
+        assert 1 <= checkouts_after - checkouts_before <= max_checkouts
+
+    @pytest.mark.asyncio
+    async def test_user_routes(self, user_data: Dict, admin_data: Dict, client: AsyncClient):
+        admin_token: str = admin_data["admin_token"]
+        token: str = user_data["access_token"]
+        user_id: str = user_data["user"]["user_id"]
+
+        user_client: UserTestClient = self.user_client
+
+        requests = {
+            "GET /user/me": partial(user_client.rud_current_user, action="read", token=token, client=client),
+            "PATCH /user/me": partial(user_client.rud_current_user, action="update", token=token, client=client),
+            "GET /user/{user_id}": partial(
+                user_client.rud_specific_user, action="read", user_id=user_id, token=admin_token, client=client
+            ),
+            "PATCH /user/{user_id}": partial(
+                user_client.rud_specific_user, action="update", user_id=user_id, token=admin_token, client=client
+            ),
+            "GET /users": partial(user_client.get_users_list, token=admin_token, client=client, pagination="cursor"),
+        }
+
+        for route, request in requests.items():
+            await self.assert_checkouts(
+                route, request, max_checkouts=1 + REPLICA_CHECKOUTS, admin_token=admin_token, client=client
+            )
+
+    @pytest.mark.asyncio
+    async def test_user_list_with_count(self, admin_data: Dict, client: AsyncClient):
+        admin_token: str = admin_data["admin_token"]
+
+        # the page and the total count are read concurrently, on two connections
+        await self.assert_checkouts(
+            "GET /users",
+            lambda: self.user_client.get_users_list(token=admin_token, client=client),
+            max_checkouts=2 + REPLICA_CHECKOUTS,
+            admin_token=admin_token,
+            client=client,
+        )
+
+    @pytest.mark.asyncio
+    async def test_group_users(self, groups: Dict, admin_data: Dict, client: AsyncClient):
+        admin_token: str = admin_data["admin_token"]
+
+        await self.assert_checkouts(
+            "GET /group/{group_id}/users",
+            lambda: self.group_client.get_group_users(
+                group_id=groups["test_group"].group_id, token=admin_token, client=client
+            ),
+            max_checkouts=1 + REPLICA_CHECKOUTS,
+            admin_token=admin_token,
+            client=client,
+        )
+
+    @pytest.mark.asyncio
+    async def test_login(self, user_data: Dict, admin_data: Dict, client: AsyncClient):
+        await self.assert_checkouts(
+            "POST /auth/login",
+            lambda: self.auth_client.authenticate(
+                username=user_data["user"]["username"], password=user_data["password"], client=client
+            ),
+            max_checkouts=1,
+            admin_token=admin_data["admin_token"],
+            client=client,
+        )
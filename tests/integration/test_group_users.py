@@ -0,0 +1,143 @@
+import uuid
+from typing import AsyncGenerator, Dict, List
+
+import pytest
+import pytest_asyncio
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import delete, select
+
+from tests.query_counter import QueryCounter
+from tests.test_client import GroupTestClient
+from user_management.database.db_settings import async_session_maker, engine
+from user_management.database.models import Group, User
+from user_management.managers.user_manager import UserManager
+
+MEMBER_COUNT = 5
+
+
+@pytest_asyncio.fixture
+async def group_members(groups: Dict) -> AsyncGenerator[List[User], None]:
+    """add members to the second test group, directly in the database"""
+    group_id: int = groups["test_group2"].group_id
+    suffix: str = uuid.uuid4().hex[:8]
+    members: List[User] = [
+        User(
+            user_id=uuid.uuid4(),
+            username=f"member{i}_{suffix}",
+            password="",  # noqa: S106
+            phone_number=f"+{i}{suffix}",
+            email=f"member{i}_{suffix}@example.com",
+            group_id=group_id,
+        )
+        for i in range(MEMBER_COUNT)
+    ]
+
+    async with async_session_maker() as session:
+        session.add_all(members)
+        await session.commit()
+
+    yield members
+
+    async with async_session_maker() as session:
+        await session.execute(delete(User).filter(User.user_id.in_([member.user_id for member in members])))
+        await session.commit()
+
+
+class TestUserLoading:
+    manager = UserManager()
+
+    @pytest.mark.asyncio
+    async def test_read_user_is_one_query_and_one_row(self, group_members: List[User]):
+        user_id: uuid.UUID = group_members[0].user_id
+
+        with QueryCounter(engine) as counter:
+            user = await self.manager.get_by_id(user_id)
+
+        assert user.group.group_id == group_members[0].group_id
+        assert counter.count == 1
+        assert "password" not in counter.statements[0]
+
+        async with engine.connect() as connection:
+            rows = (await connection.execute(self.manager.select_users().filter(User.user_id == user_id))).all()
+
+        assert len(rows) == 1
+
+    @pytest.mark.asyncio
+    async def test_group_rows_do_not_grow_with_members(self, groups: Dict, group_members: List[User]):
+        group_id: int = groups["test_group2"].group_id
+
+        async with engine.connect() as connection:
+            rows = (await connection.execute(select(Group).filter(Group.group_id == group_id))).all()
+
+        assert len(rows) == 1
+
+    @pytest.mark.asyncio
+    async def test_user_list_page_is_one_query(self, groups: Dict, group_members: List[User]):
+        with QueryCounter(engine) as counter:
+            page: Dict = await self.manager.get_page_after(
+                limit=MEMBER_COUNT, sort_field="username", group_id=groups["test_group2"].group_id
+            )
+
+        assert counter.count == 1
+        assert len(page["users"]) == MEMBER_COUNT
+
+
+class TestGroupUsers:
+    group_client = GroupTestClient()
+
+    @pytest.mark.asyncio
+    async def test_walk_group_members(
+        self, groups: Dict, group_members: List[User], admin_data: Dict, client: AsyncClient
+    ):
+        user_ids: List[str] = []
+        params: Dict = {"limit": 2}
+
+        while True:
+            response = await self.group_client.get_group_users(
+                group_id=groups["test_group2"].group_id, token=admin_data["admin_token"], client=client, **params
+            )
+
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.json()["users"]) <= 2
+
+            user_ids.extend(user["user_id"] for user in response.json()["users"])
+            if response.json()["next_cursor"] is None:
+                break
+            params["cursor"] = response.json()["next_cursor"]
+
+        expected_members: List[User] = sorted(group_members, key=lambda member: member.username)
+        assert user_ids == [str(member.user_id) for member in expected_members]
+
+    @pytest.mark.asyncio
+    async def test_moderator_reads_only_own_group(self, groups: Dict, moderator_data: Dict, client: AsyncClient):
+        token: str = moderator_data["moderator_token"]
+
+        own_group_response = await self.group_client.get_group_users(
+            group_id=groups["test_group"].group_id, token=token, client=client
+        )
+        other_group_response = await self.group_client.get_group_users(
+            group_id=groups["test_group2"].group_id, token=token, client=client
+        )
+
+        assert own_group_response.status_code == status.HTTP_200_OK
+        assert moderator_data["moderator"]["user_id"] in [
+            user["user_id"] for user in own_group_response.json()["users"]
+        ]
+        assert other_group_response.status_code == status.HTTP_403_FORBIDDEN
+
+    @pytest.mark.asyncio
+    async def test_missing_group(self, admin_data: Dict, client: AsyncClient):
+        response = await self.group_client.get_group_users(
+            group_id=2**31 - 1, token=admin_data["admin_token"], client=client
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.asyncio
+    async def test_user_cannot_read_group_members(self, groups: Dict, user_data: Dict, client: AsyncClient):
+        response = await self.group_client.get_group_users(
+            group_id=groups["test_group"].group_id, token=user_data["access_token"], client=client
+        )
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
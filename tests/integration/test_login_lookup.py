@@ -0,0 +1,57 @@
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.sql.selectable import Select
+
+from user_management.database.db_settings import async_session_maker
+from user_management.database.explain import explain, iter_plan_nodes
+from user_management.managers.user_manager import UserManager
+
+
+class TestLoginLookupPlan:
+    manager = UserManager()
+
+    async def get_user_table_scans(self, query: Select) -> List[str]:
+        async with async_session_maker() as session:
+            # on a small test table a sequential scan is cheaper, so it is disabled to check the indexes can be used
+            await session.execute(text("SET LOCAL enable_seqscan = off"))
+            plan: Dict = await explain(session, query)
+
+        return [node["Node Type"] for node in iter_plan_nodes(plan) if node.get("Relation Name") == "user"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "identifier, identifier_type",
+        [("User", "username"), ("User@Example.com", "email"), ("+375 (29) 111-22-33", "phone_number")],
+    )
+    async def test_login_query_uses_index(self, identifier: str, identifier_type: str):
+        scans: List[str] = await self.get_user_table_scans(self.manager.get_login_query(identifier, identifier_type))
+
+        assert scans
+        assert "Seq Scan" not in scans
+
+    @pytest.mark.asyncio
+    async def test_login_union_query_uses_indexes(self):
+        scans: List[str] = await self.get_user_table_scans(self.manager.get_login_union_query("user@example.com"))
+
+        assert len(scans) >= 4
+        assert "Seq Scan" not in scans
+
+
+class TestLoginLookup:
+    manager = UserManager()
+
+    @pytest.mark.asyncio
+    async def test_identifiers_ignore_case_and_formatting(self, user_data: Dict):
+        user: Dict = user_data["user"]
+        phone_number: str = user["phone_number"]
+        formatted_phone_number: str = (
+            f"{phone_number[:4]} ({phone_number[4:6]}) {phone_number[6:9]}-{phone_number[9:11]}-{phone_number[11:]}"
+        )
+
+        for identifier in (user["username"].upper(), user["email"].upper(), formatted_phone_number):
+            found_user = await self.manager.get_by_username(identifier)
+
+            assert found_user is not None
+            assert str(found_user.user_id) == user["user_id"]
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from sqlalchemy import delete, func, select
+
+from tests.fake_broker import FakeBroker
+from user_management.database.db_settings import async_session_maker
+from user_management.database.models import OutboxMessage
+from user_management.managers.outbox_manager import OutboxManager
+from user_management.rabbit.settings import PikaClient
+
+
+class TestOutboxRelay:
+    manager = OutboxManager()
+    queue_name = "test_outbox_relay"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_relays_take_disjoint_batches(self):
+        async with async_session_maker() as session:
+            session.add_all(
+                [self.manager.create_message(queue_name=self.queue_name, body={"number": i}) for i in range(20)]
+            )
+            await session.commit()
+
+        broker = FakeBroker(latency=0.05)
+        publisher = PikaClient(connection_factory=broker.connect)
+        await publisher.start()
+
+        try:
+            relayed = await asyncio.gather(
+                self.manager.relay_batch(publisher=publisher, batch_size=10, confirm_timeout=5),
+                self.manager.relay_batch(publisher=publisher, batch_size=10, confirm_timeout=5),
+            )
+        finally:
+            await publisher.close()
+
+            async with async_session_maker() as session:
+                remaining: int = await session.scalar(
+                    select(func.count()).select_from(OutboxMessage).filter_by(queue_name=self.queue_name)
+                )
+                await session.execute(delete(OutboxMessage).filter_by(queue_name=self.queue_name))
+                await session.commit()
+
+        bodies = [body for body, _ in broker.queues[self.queue_name]]
+
+        assert sum(relayed) == 20
+        assert len(bodies) == len(set(bodies)) == 20
+        assert remaining == 0
@@ -0,0 +1,31 @@
+from typing import Dict
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from tests.test_client import UserTestClient
+from user_management.config import config
+
+
+@pytest.mark.skipif(not config.DB_REPLICA_URLS, reason="no read replicas configured")
+class TestReadReplicas:
+    user_client = UserTestClient()
+
+    @pytest.mark.asyncio
+    async def test_user_reads_own_write(self, user_data: Dict, admin_data: Dict, client: AsyncClient):
+        token: str = user_data["access_token"]
+
+        update_response = await self.user_client.rud_current_user(
+            action="update", token=token, client=client, surname="replicated"
+        )
+        read_response = await self.user_client.rud_current_user(action="read", token=token, client=client)
+
+        assert update_response.status_code == status.HTTP_200_OK
+        assert read_response.json()["surname"] == "replicated"
+        assert read_response.headers["ETag"] == update_response.headers["ETag"]
+
+        stats_response = await client.get("/um/stats", headers={"Authorization": f"Bearer {admin_data['admin_token']}"})
+        replicas = stats_response.json()["db_replicas"]["replicas"]
+        assert len(replicas) == len(config.DB_REPLICA_URLS)
+        assert all(replica["healthy"] for replica in replicas)
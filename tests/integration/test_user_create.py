@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, List
 
 import httpx
 import pytest
@@ -76,3 +76,27 @@ class TestUserCreate:
         await self.user_client.rud_specific_user(
             action="delete", token=admin_data["admin_token"], user_id=created_user.user_id, client=client
         )
+
+    @pytest.mark.asyncio
+    async def test_created_at_is_set_on_insert(self, client: AsyncClient, groups: Dict, admin_data: Dict):
+        group_id: int = groups["test_group"].group_id
+        created_users: List[SignupResponseModel] = []
+
+        for name in ("test_first_created_user", "test_second_created_user"):
+            user_data: Dict = generate_user_data(name=name, group_id=group_id)
+            file = user_data.pop("file")
+
+            response: httpx.Response = await self.auth_client.signup(client=client, file=file, **user_data)
+
+            assert response.status_code == status.HTTP_201_CREATED
+            created_users.append(SignupResponseModel(**response.json()))
+
+        first_user, second_user = created_users
+
+        assert first_user.created_at == first_user.modified_at
+        assert first_user.created_at < second_user.created_at
+
+        for created_user in created_users:
+            await self.user_client.rud_specific_user(
+                action="delete", token=admin_data["admin_token"], user_id=created_user.user_id, client=client
+            )
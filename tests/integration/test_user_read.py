@@ -158,6 +158,8 @@ class TestUserListRead:
         response_data = response.json()
         assert len(response_data["users"]) == 1
         assert response_data["users"][0]["name"] == user["name"]
+        assert response_data["total_count"] == 1
+        assert response_data["total_pages"] == 1
 
     @pytest.mark.asyncio
     async def test_sorting(self, user_data: Dict, admin_data: Dict, moderator_data: Dict, client: AsyncClient):
@@ -189,3 +191,64 @@ class TestUserListRead:
             user["username"] for user in response2_data["users"] if user["username"] in sorted_list_of_names
         ]
         assert second_result_names == sorted_list_of_names[::-1]
+
+    @pytest.mark.asyncio
+    async def test_cursor_pagination(
+        self, user_data: Dict, moderator_data: Dict, admin_data: Dict, client: AsyncClient
+    ):
+        admin_token = admin_data["admin_token"]
+
+        offset_response = await self.user_client.get_users_list(
+            token=admin_token, client=client, sort_by="username", limit=1000
+        )
+        expected_user_ids: List = [user["user_id"] for user in offset_response.json()["users"]]
+
+        user_ids: List = []
+        params: Dict = {"sort_by": "username", "limit": 1, "pagination": "cursor"}
+
+        while True:
+            response = await self.user_client.get_users_list(token=admin_token, client=client, **params)
+
+            assert response.status_code == status.HTTP_200_OK
+            assert "total_pages" not in response.json()
+
+            user_ids.extend(user["user_id"] for user in response.json()["users"])
+            if response.json()["next_cursor"] is None:
+                break
+            params["cursor"] = response.json()["next_cursor"]
+
+        assert user_ids == expected_user_ids
+
+    @pytest.mark.asyncio
+    async def test_cursor_pagination_with_invalid_cursor(self, admin_data: Dict, client: AsyncClient):
+        response = await self.user_client.get_users_list(token=admin_data["admin_token"], client=client, cursor="x")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.asyncio
+    async def test_search(self, user_data: Dict, admin_data: Dict, client: AsyncClient):
+        user: Dict = user_data["user"]
+
+        response = await self.user_client.get_users_list(
+            token=admin_data["admin_token"], client=client, search=user["email"][:-2]
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["users"][0]["user_id"] == user["user_id"]
+        assert response.json()["total_count"] == len(response.json()["users"])
+
+    @pytest.mark.asyncio
+    async def test_search_count_after_update(self, user_data: Dict, admin_data: Dict, client: AsyncClient):
+        admin_token: str = admin_data["admin_token"]
+        user: Dict = user_data["user"]
+        surname: str = f"surname{uuid.uuid4().hex}"
+
+        response = await self.user_client.get_users_list(token=admin_token, client=client, search=surname)
+        assert response.json()["total_count"] == 0
+
+        await self.user_client.rud_specific_user(
+            action="update", user_id=user["user_id"], token=admin_token, client=client, surname=surname
+        )
+        response = await self.user_client.get_users_list(token=admin_token, client=client, search=surname)
+
+        assert response.json()["total_count"] == 1
@@ -1,4 +1,5 @@
 import datetime
+import uuid
 from typing import Dict
 
 import httpx
@@ -8,8 +9,11 @@ from fastapi import status
 from httpx import AsyncClient
 
 from tests.integration.conftest import generate_user_data
+from tests.query_counter import QueryCounter
 from tests.test_client import UserTestClient
 from user_management.api.users.schemas import UserReadModel
+from user_management.database.db_settings import engine
+from user_management.managers.user_manager import UserManager
 
 
 class TestUserUpdate:
@@ -184,3 +188,62 @@ class TestUserUpdate:
 
         assert response.status_code == status.HTTP_200_OK
         assert response.json()["is_blocked"]
+
+
+class TestUserUpdateVersion:
+    user_client = UserTestClient()
+    manager = UserManager()
+
+    @pytest.mark.asyncio
+    async def test_update_is_one_statement(self, user_data: Dict):
+        user_id = uuid.UUID(user_data["user"]["user_id"])
+
+        with QueryCounter(engine) as counter:
+            user = await self.manager.update_user(user_id=user_id, user_data={"surname": "test_surname"})
+
+        user_statements = [statement for statement in counter.statements if '"user"' in statement]
+        assert len(user_statements) == 1
+        assert user_statements[0].lstrip().startswith("WITH")
+        assert user.surname == "test_surname"
+        assert user.version == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_edit_is_detected(self, user_data: Dict, admin_data: Dict, client: AsyncClient):
+        admin_token: str = admin_data["admin_token"]
+        user_id: str = user_data["user"]["user_id"]
+
+        read_response = await self.user_client.rud_specific_user(
+            action="read", user_id=user_id, token=admin_token, client=client
+        )
+        etag: str = read_response.headers["ETag"]
+
+        first_response = await self.user_client.rud_specific_user(
+            action="update", user_id=user_id, token=admin_token, client=client, if_match=etag, name="first"
+        )
+        second_response = await self.user_client.rud_specific_user(
+            action="update", user_id=user_id, token=admin_token, client=client, if_match=etag, name="second"
+        )
+
+        assert first_response.status_code == status.HTTP_200_OK
+        assert first_response.headers["ETag"] != etag
+        assert first_response.json()["version"] == read_response.json()["version"] + 1
+        assert second_response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+        current_response = await self.user_client.rud_specific_user(
+            action="read", user_id=user_id, token=admin_token, client=client
+        )
+        assert current_response.json()["name"] == "first"
+        assert current_response.headers["ETag"] == first_response.headers["ETag"]
+
+    @pytest.mark.asyncio
+    async def test_update_of_missing_user_with_if_match(self, admin_data: Dict, client: AsyncClient):
+        response = await self.user_client.rud_specific_user(
+            action="update",
+            user_id=uuid.uuid4(),
+            token=admin_data["admin_token"],
+            client=client,
+            if_match='"1"',
+            name="x",
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
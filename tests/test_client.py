@@ -68,10 +68,13 @@ class UserTestClient:
         client: httpx.AsyncClient,
         token: Optional[str] = None,
         file: Optional[bytes] = None,
+        if_match: Optional[str] = None,
         **kwargs,
     ) -> httpx.Response:
         """Choose the correct request method depending on the 'action' parameter."""
-        headers = {"Authorization": f"Bearer {token}"} if token else None
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        if if_match is not None:
+            headers["If-Match"] = if_match
         files = {"file": ("file.jpeg", file, "file/jpeg")} if file else None
 
         match action:
@@ -124,3 +127,21 @@ class UserTestClient:
             timeout=self.timeout,
         )
         return response
+
+
+class GroupTestClient:
+    """A class for handling group requests using HTTP."""
+
+    base_endpoint = r"/group"
+    timeout = 20
+
+    async def get_group_users(
+        self, group_id: int, client: httpx.AsyncClient, token: Optional[str] = None, **kwargs
+    ) -> httpx.Response:
+        """Make requests to /group/{group_id}/users endpoint"""
+
+        headers: Optional[Dict] = {"Authorization": f"Bearer {token}"} if token else None
+        response: httpx.Response = await client.get(
+            f"{self.base_endpoint}/{group_id}/users", params=kwargs, headers=headers, timeout=self.timeout
+        )
+        return response
@@ -1,8 +1,9 @@
 import pytest
+from fakeredis import FakeServer
 from fakeredis.aioredis import FakeRedis
 
 
 @pytest.fixture
 def fake_redis_client():
-    fake_redis = FakeRedis()
+    fake_redis = FakeRedis(server=FakeServer())
     return fake_redis
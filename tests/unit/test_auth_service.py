@@ -0,0 +1,99 @@
+import uuid
+from typing import Optional
+
+import pytest
+from fastapi import BackgroundTasks
+
+from user_management.api.auth.services import AuthService
+from user_management.api.utils.hashers import PasswordHasher, create_password_context
+from user_management.config import config
+from user_management.database.models import User
+
+
+class FakeUserManager:
+    def __init__(self, user: User):
+        self.user = user
+
+    async def get_by_username(self, username: str) -> Optional[User]:
+        return self.user if username == self.user.username else None
+
+    async def replace_password_hash(self, user_id: uuid.UUID, old_hash: str, new_hash: str) -> bool:
+        if user_id != self.user.user_id or old_hash != self.user.password:
+            return False
+
+        self.user.password = new_hash
+        return True
+
+
+class TestPasswordHashUpgrade:
+    @staticmethod
+    def create_service(hashed_password: str) -> AuthService:
+        service = AuthService()
+        service.manager = FakeUserManager(User(user_id=uuid.uuid4(), username="user", password=hashed_password))
+        service.password_hasher = PasswordHasher()
+        service.password_hasher.pwd_context = create_password_context(schemes=["bcrypt"], bcrypt_rounds=5)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_outdated_hash_is_upgraded_after_login(self):
+        old_hash = create_password_context(schemes=["bcrypt"], bcrypt_rounds=4).hash("password")
+        service = self.create_service(hashed_password=old_hash)
+        background_tasks = BackgroundTasks()
+
+        user = await service.authenticate(username="user", password="password", background_tasks=background_tasks)
+        await background_tasks()
+
+        assert user.password != old_hash
+        assert not service.password_hasher.needs_update(user.password)
+        assert await service.password_hasher.verify_password_async("password", user.password)
+
+    @pytest.mark.asyncio
+    async def test_current_hash_is_kept(self):
+        current_hash = create_password_context(schemes=["bcrypt"], bcrypt_rounds=5).hash("password")
+        service = self.create_service(hashed_password=current_hash)
+        background_tasks = BackgroundTasks()
+
+        await service.authenticate(username="user", password="password", background_tasks=background_tasks)
+
+        assert not background_tasks.tasks
+
+
+class TestPasswordResetToken:
+    @pytest.mark.asyncio
+    async def test_token_is_stored_hashed_with_expiry(self, fake_redis_client):
+        service = AuthService(redis_client=fake_redis_client)
+        user_id = uuid.uuid4()
+        token = service.generate_password_reset_token()
+
+        await service.add_password_reset_token_to_redis(token=token, user_id=user_id)
+
+        token_key = service.get_password_reset_token_key(service.reset_password_token_hasher.hash_token(token))
+
+        assert not await fake_redis_client.exists(token)
+        assert await fake_redis_client.get(token_key) == str(user_id).encode()
+        assert 0 < await fake_redis_client.ttl(token_key) <= config.PASSWORD_RESET_TOKEN_TTL_MINUTES * 60
+
+    @pytest.mark.asyncio
+    async def test_token_is_single_use(self, fake_redis_client):
+        service = AuthService(redis_client=fake_redis_client)
+        user_id = uuid.uuid4()
+        token = service.generate_password_reset_token()
+
+        await service.add_password_reset_token_to_redis(token=token, user_id=user_id)
+
+        assert await service.consume_password_reset_token(token) == user_id
+        assert await service.consume_password_reset_token(token) is None
+
+    @pytest.mark.asyncio
+    async def test_new_token_invalidates_previous_one(self, fake_redis_client):
+        service = AuthService(redis_client=fake_redis_client)
+        user_id = uuid.uuid4()
+        old_token = service.generate_password_reset_token()
+        new_token = service.generate_password_reset_token()
+
+        await service.add_password_reset_token_to_redis(token=old_token, user_id=user_id)
+        await service.add_password_reset_token_to_redis(token=new_token, user_id=user_id)
+
+        assert await service.consume_password_reset_token(old_token) is None
+        assert await service.consume_password_reset_token(new_token) == user_id
+        assert await fake_redis_client.dbsize() == 1
@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from user_management.config import config
+from user_management.database.db_settings import InstrumentedQueuePool, get_engine_options
+
+
+class TestDBPool:
+    @staticmethod
+    def create_pool(pool_size: int, max_overflow: int, timeout: float) -> InstrumentedQueuePool:
+        return InstrumentedQueuePool(
+            lambda: sqlite3.connect(":memory:"), pool_size=pool_size, max_overflow=max_overflow, timeout=timeout
+        )
+
+    @pytest.mark.asyncio
+    async def test_stats(self):
+        pool = self.create_pool(pool_size=1, max_overflow=1, timeout=0.1)
+
+        connections = [await greenlet_spawn(pool.connect) for _ in range(2)]
+        stats = pool.stats()
+        assert (stats["in_use"], stats["overflow"], stats["checkouts"]) == (2, 1, 2)
+
+        with pytest.raises(PoolTimeoutError):
+            await greenlet_spawn(pool.connect)
+
+        stats = pool.stats()
+        assert stats["timeouts"] == 1
+        assert stats["wait_time_seconds"] >= 0.1
+
+        for connection in connections:
+            await greenlet_spawn(connection.close)
+
+        stats = pool.stats()
+        assert (stats["in_use"], stats["idle"], stats["waiting"]) == (0, 1, 0)
+
+    def test_pool_settings_from_config(self, monkeypatch):
+        monkeypatch.setattr(config, "DB_POOL_SIZE", 20)
+        monkeypatch.setattr(config, "DB_PGBOUNCER_MODE", False)
+
+        options = get_engine_options()
+
+        assert options["pool_size"] == 20
+        assert "connect_args" not in options
+
+    def test_pgbouncer_mode(self, monkeypatch):
+        monkeypatch.setattr(config, "DB_PGBOUNCER_MODE", True)
+
+        connect_args = get_engine_options()["connect_args"]
+        name_func = connect_args["prepared_statement_name_func"]
+
+        assert connect_args["statement_cache_size"] == 0
+        assert connect_args["prepared_statement_cache_size"] == 0
+        assert name_func() != name_func()
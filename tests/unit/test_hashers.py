@@ -0,0 +1,103 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from user_management.api.utils.hashers import (
+    PasswordHasher,
+    PasswordHashingPool,
+    _hash_password,
+    _verify_password,
+    create_password_context,
+    recommend_bcrypt_rounds,
+)
+
+
+def blocking_call(duration: float) -> int:
+    time.sleep(duration)
+    return threading.get_ident()
+
+
+class TestPasswordHashingPool:
+    @pytest.mark.asyncio
+    async def test_hash_and_verify(self):
+        hasher = PasswordHasher()
+
+        hashed_password = await hasher.hash_password_async("password")
+
+        assert await hasher.verify_password_async("password", hashed_password)
+        assert not await hasher.verify_password_async("wrong", hashed_password)
+
+    @pytest.mark.asyncio
+    async def test_runs_off_the_event_loop(self):
+        pool = PasswordHashingPool(executor_type="thread", max_workers=1)
+
+        worker_thread_id = await pool.run(blocking_call, 0)
+        pool.shutdown()
+
+        assert worker_thread_id != threading.get_ident()
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped(self):
+        pool = PasswordHashingPool(executor_type="thread", max_workers=4, max_concurrency=2)
+
+        calls = [asyncio.create_task(pool.run(blocking_call, 0.05)) for _ in range(5)]
+        await asyncio.sleep(0.01)
+
+        assert pool.in_flight == 2
+        assert pool.queue_depth == 3
+
+        await asyncio.gather(*calls)
+        pool.shutdown()
+
+        assert pool.stats()["completed"] == 5
+        assert pool.stats()["queue_depth"] == 0
+        assert pool.stats()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_process_executor(self):
+        pool = PasswordHashingPool(executor_type="process", max_workers=1)
+        context_config = create_password_context(schemes=["bcrypt"], bcrypt_rounds=4).to_string()
+
+        hashed_password = await pool.run(_hash_password, "password", context_config)
+        is_verified = await pool.run(_verify_password, "password", hashed_password, context_config)
+        pool.shutdown()
+
+        assert is_verified
+
+    def test_wrong_executor_type(self):
+        with pytest.raises(ValueError):
+            PasswordHashingPool(executor_type="wrong", max_workers=1)
+
+
+class TestPasswordContext:
+    def test_needs_update_when_cost_changes(self):
+        old_context = create_password_context(schemes=["bcrypt"], bcrypt_rounds=4)
+        new_context = create_password_context(schemes=["bcrypt"], bcrypt_rounds=5)
+
+        old_hash = old_context.hash("password")
+
+        assert new_context.needs_update(old_hash)
+        assert not new_context.needs_update(new_context.hash("password"))
+        assert new_context.verify("password", old_hash)
+
+    def test_needs_update_when_scheme_is_deprecated(self):
+        old_context = create_password_context(schemes=["pbkdf2_sha256"], bcrypt_rounds=4)
+        new_context = create_password_context(schemes=["bcrypt", "pbkdf2_sha256"], bcrypt_rounds=4)
+
+        old_hash = old_context.hash("password")
+
+        assert new_context.needs_update(old_hash)
+        assert new_context.verify("password", old_hash)
+
+    def test_recommend_bcrypt_rounds(self):
+        recommended_rounds, timings = recommend_bcrypt_rounds(target_seconds=0, min_rounds=4, max_rounds=6, samples=1)
+
+        assert recommended_rounds == 4
+        assert list(timings) == [4]
+
+        recommended_rounds, timings = recommend_bcrypt_rounds(target_seconds=60, min_rounds=4, max_rounds=6, samples=1)
+
+        assert recommended_rounds == 6
+        assert list(timings) == [4, 5, 6]
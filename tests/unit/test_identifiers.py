@@ -0,0 +1,47 @@
+import time
+import uuid
+
+from user_management.config import config
+from user_management.database.identifiers import UUID7Generator, generate_user_id
+
+
+class TestUUID7:
+    def test_version_variant_and_timestamp(self):
+        before_ms = time.time_ns() // 1_000_000
+        value = UUID7Generator()()
+        after_ms = time.time_ns() // 1_000_000
+
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+        assert before_ms <= value.int >> 80 <= after_ms
+
+    def test_monotonic_within_millisecond(self):
+        generate = UUID7Generator()
+        values = [generate() for _ in range(10_000)]
+
+        assert values == sorted(values)
+        assert len(set(values)) == len(values)
+
+    def test_counter_overflow_moves_to_next_millisecond(self):
+        generate = UUID7Generator()
+        generate.last_timestamp_ms = time.time_ns() // 1_000_000 + 60_000
+        generate.counter = 0xFFF
+
+        value = generate()
+
+        assert value.int >> 80 == generate.last_timestamp_ms
+        assert generate.counter == 0
+
+    def test_clock_going_back_keeps_order(self):
+        generate = UUID7Generator()
+        first = generate()
+        generate.last_timestamp_ms += 1000
+
+        assert generate() > first
+
+    def test_generator_from_config(self, monkeypatch):
+        monkeypatch.setattr(config, "USER_ID_GENERATOR", "uuid4")
+        assert generate_user_id().version == 4
+
+        monkeypatch.setattr(config, "USER_ID_GENERATOR", "uuid7")
+        assert generate_user_id().version == 7
@@ -0,0 +1,91 @@
+import json
+import logging
+import pathlib
+import queue
+from typing import Dict
+
+import pytest
+
+from user_management.logger_settings import (
+    JsonFormatter,
+    LogQueueHandler,
+    RouteSamplingFilter,
+    SizeAndTimeRotatingFileHandler,
+)
+
+
+def make_record(level: int = logging.INFO, **fields) -> logging.LogRecord:
+    record = logging.makeLogRecord({"name": "logger", "levelno": level, "levelname": logging.getLevelName(level)})
+    record.msg, record.args = "%s requests", (3,)
+    record.__dict__.update(fields)
+    return record
+
+
+class TestJsonFormatter:
+    def test_format_record_with_extra_fields(self):
+        entry: Dict = json.loads(JsonFormatter().format(make_record(route="GET /users", status=200)))
+
+        assert entry["message"] == "3 requests"
+        assert entry["level"] == "INFO"
+        assert (entry["route"], entry["status"]) == ("GET /users", 200)
+        assert "args" not in entry
+
+
+class TestLogQueueHandler:
+    def test_message_and_traceback_are_prepared_for_writer_thread(self):
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        try:
+            raise ValueError("failed")
+        except ValueError as e:
+            record = make_record(level=logging.ERROR, exc_info=(type(e), e, e.__traceback__))
+
+        LogQueueHandler(log_queue).handle(record)
+        queued_record: logging.LogRecord = log_queue.get_nowait()
+        entry: Dict = json.loads(JsonFormatter().format(queued_record))
+
+        assert (queued_record.msg, queued_record.args, queued_record.exc_info) == ("3 requests", None, None)
+        assert "ValueError: failed" in entry["exception"]
+
+
+class TestRouteSamplingFilter:
+    @pytest.mark.parametrize(
+        "record, kept",
+        [
+            (make_record(route="GET /um/healthcheck"), False),
+            (make_record(level=logging.ERROR, route="GET /um/healthcheck"), True),
+            (make_record(route="GET /users"), True),
+            (make_record(), True),
+        ],
+    )
+    def test_filter(self, record: logging.LogRecord, kept: bool):
+        assert RouteSamplingFilter({"GET /um/healthcheck": 0}).filter(record) is kept
+
+
+class TestSizeAndTimeRotatingFileHandler:
+    @staticmethod
+    def write(handler: logging.Handler, count: int) -> None:
+        for _ in range(count):
+            handler.handle(make_record())
+
+    def test_rollover_on_size(self, tmp_path: pathlib.Path):
+        handler = SizeAndTimeRotatingFileHandler(
+            str(tmp_path / "info.log"), max_bytes=30, interval_seconds=3600, backup_count=2
+        )
+
+        self.write(handler, 5)
+        handler.close()
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["info.log", "info.log.1", "info.log.2"]
+
+    def test_rollover_on_time(self, tmp_path: pathlib.Path):
+        handler = SizeAndTimeRotatingFileHandler(
+            str(tmp_path / "info.log"), max_bytes=0, interval_seconds=3600, backup_count=2
+        )
+
+        self.write(handler, 1)
+        handler.rollover_at = 0
+        self.write(handler, 1)
+        handler.close()
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["info.log", "info.log.1"]
+        assert handler.rollover_at > 0
@@ -0,0 +1,37 @@
+import uuid
+
+import pytest
+
+from user_management.database.models import User
+from user_management.managers.user_manager import UserManager
+
+
+class TestLoginIdentifier:
+    manager = UserManager()
+
+    @pytest.mark.parametrize(
+        "identifier, identifier_type",
+        [
+            ("user", "username"),
+            ("User.Name_1", "username"),
+            ("12", "username"),
+            ("user@example.com", "email"),
+            ("111111111", "phone_number"),
+            ("+375 (29) 111-22-33", "phone_number"),
+        ],
+    )
+    def test_detect_type(self, identifier: str, identifier_type: str):
+        assert self.manager.detect_login_identifier_type(identifier) == identifier_type
+
+    def test_normalize(self):
+        assert self.manager.normalize_login_identifier("User@Example.com", "email") == "user@example.com"
+        assert self.manager.normalize_login_identifier("+375 (29) 111-22-33", "phone_number") == "375291112233"
+
+    def test_pick_login_match(self):
+        lower = User(user_id=uuid.uuid4(), username="user", email="user@example.com", phone_number="1")
+        upper = User(user_id=uuid.uuid4(), username="User", email="User@example.com", phone_number="2")
+
+        assert self.manager.pick_login_match([], "user") is None
+        assert self.manager.pick_login_match([upper], "USER") == upper
+        assert self.manager.pick_login_match([upper, lower], "user") == lower
+        assert self.manager.pick_login_match([lower, upper], "USER") is None
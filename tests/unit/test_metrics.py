@@ -0,0 +1,182 @@
+import time
+from typing import List
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from fastapi import APIRouter, FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from user_management.api.utils.request_metrics import UNMATCHED_ROUTE, RequestMetricsMiddleware
+from user_management.api.utils.routing import UnitOfWorkRoute
+from user_management.metrics.aggregation import WorkerMetrics
+from user_management.metrics.instruments import current_db_operation, db_operation, http_request_duration
+from user_management.metrics.registry import MetricsRegistry
+
+
+def create_registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.histogram("test_duration_seconds", "Test duration", ("route",), buckets=(0.1, 1))
+    registry.gauge("test_in_flight", "Test requests in flight")
+    return registry
+
+
+class Manager:
+    @db_operation
+    async def outer(self) -> List[str]:
+        return [current_db_operation.get(), await self.inner(), current_db_operation.get()]
+
+    @db_operation
+    async def inner(self) -> str:
+        return current_db_operation.get()
+
+
+class TestMetricsRegistry:
+    def test_render_histogram(self):
+        registry: MetricsRegistry = create_registry()
+        for value in (0.05, 0.1, 0.5, 2):
+            registry.metrics["test_duration_seconds"].observe(value, 'GET /"users"')
+
+        lines: List[str] = registry.render(registry.snapshot()).splitlines()
+
+        assert lines[:2] == ["# HELP test_duration_seconds Test duration", "# TYPE test_duration_seconds histogram"]
+        assert lines[2:7] == [
+            'test_duration_seconds_bucket{route="GET /\\"users\\"",le="0.1"} 2',
+            'test_duration_seconds_bucket{route="GET /\\"users\\"",le="1"} 3',
+            'test_duration_seconds_bucket{route="GET /\\"users\\"",le="+Inf"} 4',
+            'test_duration_seconds_sum{route="GET /\\"users\\""} 2.65',
+            'test_duration_seconds_count{route="GET /\\"users\\""} 4',
+        ]
+
+    def test_merge_sums_workers(self):
+        first_worker, second_worker = create_registry(), create_registry()
+        first_worker.metrics["test_duration_seconds"].observe(0.05, "GET /users")
+        second_worker.metrics["test_duration_seconds"].observe(0.5, "GET /users")
+        second_worker.metrics["test_duration_seconds"].observe(0.5, "GET /user/me")
+        first_worker.metrics["test_in_flight"].inc()
+        second_worker.metrics["test_in_flight"].set_function(lambda: 2)
+
+        merged = first_worker.merge([first_worker.snapshot(), second_worker.snapshot(), {"unknown": [[[], 1]]}])
+
+        assert merged["test_duration_seconds"] == [
+            [["GET /users"], [1, 1, 0, 0.55]],
+            [["GET /user/me"], [0, 1, 0, 0.5]],
+        ]
+        assert merged["test_in_flight"] == [[[], 3]]
+        assert "unknown" not in merged
+
+
+class TestWorkerMetrics:
+    @pytest.mark.asyncio
+    async def test_collect_sums_workers_of_host(self, fake_redis_client: FakeRedis):
+        registries: List[MetricsRegistry] = [create_registry() for _ in range(3)]
+        workers: List[WorkerMetrics] = [
+            WorkerMetrics(registry, redis_client=fake_redis_client, host=host, worker_id=str(number))
+            for number, (registry, host) in enumerate(zip(registries, ("host", "host", "other_host")))
+        ]
+        for registry in registries:
+            registry.metrics["test_in_flight"].inc()
+
+        for worker in workers[1:]:
+            await worker.push()
+
+        assert (await workers[0].collect())["test_in_flight"] == [[[], 2]]
+
+        await workers[1].remove()
+
+        assert (await workers[0].collect())["test_in_flight"] == [[[], 1]]
+
+    @pytest.mark.asyncio
+    async def test_stopped_workers_are_dropped(self, fake_redis_client: FakeRedis):
+        registries: List[MetricsRegistry] = [create_registry() for _ in range(2)]
+        workers: List[WorkerMetrics] = [
+            WorkerMetrics(registry, redis_client=fake_redis_client, host="host", worker_id=str(number))
+            for number, registry in enumerate(registries)
+        ]
+        for registry in registries:
+            registry.metrics["test_in_flight"].inc()
+        await workers[1].push()
+
+        # the last push of the worker was longer than three intervals ago
+        await fake_redis_client.zadd(workers[1].heartbeat_key, {workers[1].worker_id: time.time() - workers[1].ttl - 1})
+
+        assert (await workers[0].collect())["test_in_flight"] == [[[], 1]]
+        assert await fake_redis_client.hkeys(workers[0].key) == [workers[0].worker_id.encode()]
+        assert await fake_redis_client.zcard(workers[0].heartbeat_key) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("stop", ["remove", "expire"])
+    async def test_counters_stay_monotonic_after_worker_is_dropped(self, fake_redis_client: FakeRedis, stop: str):
+        registries: List[MetricsRegistry] = [create_registry() for _ in range(2)]
+        workers: List[WorkerMetrics] = [
+            WorkerMetrics(registry, redis_client=fake_redis_client, host="host", worker_id=str(number))
+            for number, registry in enumerate(registries)
+        ]
+        for registry in registries:
+            registry.metrics["test_duration_seconds"].observe(0.5, "GET /users")
+            registry.metrics["test_in_flight"].inc()
+        await workers[1].push()
+
+        assert (await workers[0].collect())["test_duration_seconds"] == [[["GET /users"], [0, 2, 0, 1.0]]]
+
+        if stop == "remove":
+            await workers[1].remove()
+        else:
+            await fake_redis_client.zadd(
+                workers[1].heartbeat_key, {workers[1].worker_id: time.time() - workers[1].ttl - 1}
+            )
+
+        collected = await workers[0].collect()
+        assert collected["test_duration_seconds"] == [[["GET /users"], [0, 2, 0, 1.0]]]
+        assert collected["test_in_flight"] == [[[], 1]]
+        assert await fake_redis_client.hkeys(workers[0].key) == [workers[0].worker_id.encode()]
+
+        # a later scrape, possibly by another worker, does not add the retired worker again
+        assert (await workers[0].collect())["test_duration_seconds"] == [[["GET /users"], [0, 2, 0, 1.0]]]
+
+
+class TestInstruments:
+    @pytest.mark.asyncio
+    async def test_db_operation_labels_nested_calls(self):
+        assert await Manager().outer() == ["Manager.outer", "Manager.inner", "Manager.outer"]
+        assert current_db_operation.get() == "other"
+
+    @pytest.mark.asyncio
+    async def test_route_duration_is_recorded_by_status(self):
+        router = APIRouter(route_class=UnitOfWorkRoute)
+
+        @router.get("/metrics-test/{item_id}")
+        async def read_item(item_id: int):
+            if item_id == 0:
+                raise HTTPException(status_code=404)
+            return {"item_id": item_id}
+
+        app = FastAPI()
+        app.include_router(router)
+        app.add_middleware(RequestMetricsMiddleware)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            for item_id in (1, 2, 0):
+                await client.get(f"/metrics-test/{item_id}")
+
+        samples = http_request_duration.samples()
+        assert sum(samples[("GET /metrics-test/{item_id}", "200")][:-1]) == 2
+        assert sum(samples[("GET /metrics-test/{item_id}", "404")][:-1]) == 1
+
+    @pytest.mark.asyncio
+    async def test_requests_outside_of_routers_are_recorded(self):
+        app = FastAPI()
+
+        @app.get("/metrics-test-healthcheck")
+        async def healthcheck():
+            return {"status": "healthy"}
+
+        app.add_middleware(RequestMetricsMiddleware)
+
+        unmatched_before: float = sum(http_request_duration.samples().get((UNMATCHED_ROUTE, "404"), [0, 0])[:-1])
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/metrics-test-healthcheck")
+            await client.get("/metrics-test-missing")
+
+        samples = http_request_duration.samples()
+        assert sum(samples[("GET /metrics-test-healthcheck", "200")][:-1]) == 1
+        assert sum(samples[(UNMATCHED_ROUTE, "404")][:-1]) == unmatched_before + 1
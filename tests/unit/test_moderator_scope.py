@@ -0,0 +1,64 @@
+import uuid
+from typing import Dict, List, Optional
+
+import pytest
+
+from user_management.api.groups.services import GroupService
+from user_management.api.users.services import UserService
+from user_management.api.utils.exceptions import PermissionHTTPException
+from user_management.api.utils.principal_cache import Principal
+from user_management.database.models import Group
+from user_management.managers.group_manager import GroupManager
+from user_management.managers.user_manager import UserManager
+
+
+class FakeGroupManager(GroupManager):
+    async def get_by_id(self, group_id: int) -> Optional[Group]:
+        return Group(group_id=group_id, name=f"group{group_id}")
+
+
+class FakeUserManager(UserManager):
+    def __init__(self):
+        self.group_ids: List[Optional[int]] = []
+
+    async def get_page_after(self, limit: int, sort_field: str, group_id: Optional[int] = None, **kwargs) -> Dict:
+        self.group_ids.append(group_id)
+        return {"users": [], "next": None}
+
+    async def get_all(self, offset: int, limit: int = 50, group_id: Optional[int] = None, **kwargs) -> Dict:
+        self.group_ids.append(group_id)
+        return {"total_count": 1, "total_count_estimated": False, "users": []}
+
+
+def create_moderator(group_id: Optional[int]) -> Principal:
+    return Principal(user_id=uuid.uuid4(), role="MODERATOR", group_id=group_id, is_blocked=False)
+
+
+class TestModeratorScope:
+    @staticmethod
+    def create_group_service() -> GroupService:
+        service = GroupService()
+        service.manager = FakeGroupManager()
+        service.user_service = UserService()
+        service.user_service.manager = FakeUserManager()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_moderator_reads_own_group_only(self):
+        service = self.create_group_service()
+        moderator = create_moderator(group_id=1)
+
+        await service.read_group_users(group_id=1, authorized_user=moderator)
+        with pytest.raises(PermissionHTTPException):
+            await service.read_group_users(group_id=2, authorized_user=moderator)
+
+    @pytest.mark.asyncio
+    async def test_moderator_without_group_is_not_limited(self):
+        group_service = self.create_group_service()
+        user_service = group_service.user_service
+        moderator = create_moderator(group_id=None)
+
+        await group_service.read_group_users(group_id=2, authorized_user=moderator)
+        await user_service.read_user_list(authorized_user=moderator)
+
+        assert user_service.manager.group_ids == [2, None]
@@ -0,0 +1,264 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Union
+
+import pytest
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import Delete, Update
+
+from tests.fake_broker import FakeBroker
+from user_management.api.auth.services import AuthService
+from user_management.config import config
+from user_management.database.models import OutboxMessage, User
+from user_management.database.unit_of_work import UnitOfWork
+from user_management.managers.outbox_manager import OutboxManager
+from user_management.rabbit.outbox_relay import OutboxRelay
+from user_management.rabbit.settings import PikaClient, PublishError
+
+
+class FakeUserManager:
+    def __init__(self, user: User):
+        self.user = user
+
+    async def get_by_email(self, email: str) -> Optional[User]:
+        return self.user if email == self.user.email else None
+
+
+class FakeOutboxManager(OutboxManager):
+    def __init__(self):
+        self.messages: List[OutboxMessage] = []
+
+    async def add_message(self, message: OutboxMessage) -> None:
+        self.messages.append(message)
+
+    async def relay_batch(
+        self,
+        publisher: PikaClient,
+        batch_size: int,
+        confirm_timeout: float,
+        in_flight: Optional[Dict[int, asyncio.Future]] = None,
+        claim_seconds: float = 0,
+    ) -> int:
+        batch, self.messages = self.messages[:batch_size], self.messages[batch_size:]
+        for message in batch:
+            await publisher.publish(message.queue_name, message.body.encode(), message.headers)
+
+        return len(batch)
+
+
+class FakeOutboxSession:
+    """Holds the outbox rows, claimed in id order and deleted or released by id."""
+
+    def __init__(self, messages: List[OutboxMessage]):
+        self.messages: Dict[int, OutboxMessage] = {message.id: message for message in messages}
+        self.claimed: Set[int] = set()
+        self.uncommitted: bool = False
+        self.sync_session = Session()
+
+    @staticmethod
+    def get_ids(statement: Union[Delete, Update]) -> List[int]:
+        return [
+            message_id
+            for value in statement.compile().params.values()
+            if isinstance(value, list)
+            for message_id in value
+        ]
+
+    async def scalars(self, statement: Update) -> List[OutboxMessage]:
+        excluded_ids: List[int] = self.get_ids(statement)
+        claimed_ids: List[int] = [
+            message_id
+            for message_id in sorted(self.messages)
+            if message_id not in self.claimed and message_id not in excluded_ids
+        ]
+        self.claimed.update(claimed_ids)
+        self.uncommitted = True
+        return [self.messages[message_id] for message_id in claimed_ids]
+
+    async def execute(self, statement: Union[Delete, Update]) -> None:
+        for message_id in self.get_ids(statement):
+            if isinstance(statement, Delete):
+                del self.messages[message_id]
+            self.claimed.discard(message_id)
+        self.uncommitted = True
+
+    def in_transaction(self) -> bool:
+        return False
+
+    async def commit(self) -> None:
+        self.uncommitted = False
+
+    async def rollback(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class SlowPublisher:
+    """Sends every message at once, the broker confirms them when the test resolves the futures."""
+
+    def __init__(self):
+        self.published: List[bytes] = []
+        self.futures: List[asyncio.Future] = []
+
+    def publish(self, queue_name: str, body: bytes, headers: Optional[Dict] = None) -> asyncio.Future:
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.published.append(body)
+        self.futures.append(future)
+        return future
+
+    def withdraw(self, future: asyncio.Future) -> bool:
+        return False
+
+    log_publish_failure = staticmethod(PikaClient.log_publish_failure)
+
+
+class TestOutbox:
+    @pytest.mark.asyncio
+    async def test_reset_password_writes_to_outbox(self, fake_redis_client):
+        service = AuthService(redis_client=fake_redis_client)
+        service.manager = FakeUserManager(User(user_id=uuid.uuid4(), email="user@example.com"))
+        service.outbox_manager = FakeOutboxManager()
+
+        response = await service.reset_password(email="user@example.com")
+
+        message: OutboxMessage = service.outbox_manager.messages[0]
+        assert message.queue_name == config.RABBITMQ_QUEUE
+        assert message.headers == {"email": "user@example.com"}
+        assert json.loads(service.outbox_manager.render_body(message))["reset_url"] == response["url"]
+
+    @pytest.mark.asyncio
+    async def test_reset_token_is_not_stored_in_outbox(self, fake_redis_client):
+        service = AuthService(redis_client=fake_redis_client)
+        service.manager = FakeUserManager(User(user_id=uuid.uuid4(), email="user@example.com"))
+        service.outbox_manager = FakeOutboxManager()
+
+        response = await service.reset_password(email="user@example.com")
+
+        token: str = response["url"].rsplit("/", 1)[-1]
+        message: OutboxMessage = service.outbox_manager.messages[0]
+        assert token not in message.body
+        assert "reset_url" not in json.loads(message.body)
+
+    @pytest.mark.asyncio
+    async def test_expired_reset_message_is_dropped(self):
+        manager = OutboxManager()
+        message: OutboxMessage = manager.create_password_reset_message(
+            email="user@example.com",
+            user_id=uuid.uuid4(),
+            token_seed="seed",
+            expires_at=datetime.now(tz=config.get_timezone()) - timedelta(seconds=1),
+        )
+        message.id = 1
+        session = FakeOutboxSession([message])
+        publisher = SlowPublisher()
+
+        async with UnitOfWork(route="test", session_maker=lambda: session):
+            assert await manager.relay_batch(publisher, batch_size=10, confirm_timeout=0.01) == 0
+
+        assert not publisher.published
+        assert not session.messages
+
+    def test_user_events_are_disabled_without_queue(self, monkeypatch):
+        monkeypatch.setattr(config, "RABBITMQ_USER_EVENTS_QUEUE", None)
+
+        assert OutboxManager().create_user_event_message("user_created", user_id=uuid.uuid4()) is None
+
+    def test_user_event_message(self, monkeypatch):
+        monkeypatch.setattr(config, "RABBITMQ_USER_EVENTS_QUEUE", "user_events")
+        user_id = uuid.uuid4()
+
+        message = OutboxManager().create_user_event_message("user_created", user_id=user_id, username="user")
+
+        assert message.queue_name == "user_events"
+        assert message.headers == {"event": "user_created"}
+        assert json.loads(message.body)["user_id"] == str(user_id)
+        assert json.loads(message.body)["username"] == "user"
+
+    @pytest.mark.asyncio
+    async def test_relay_waits_for_publisher_connection(self):
+        broker = FakeBroker()
+        broker.available = False
+        publisher = PikaClient(connection_factory=broker.connect, reconnect_delay=0.01)
+        manager = FakeOutboxManager()
+        manager.messages.append(manager.create_message(queue_name="queue", body={}))
+        relay = OutboxRelay(publisher=publisher, manager=manager, batch_size=10)
+        await publisher.start()
+
+        assert await relay.relay_once() == 0
+        assert len(manager.messages) == 1
+
+        broker.available = True
+        await asyncio.wait_for(publisher._connected.wait(), timeout=1)
+
+        assert await relay.relay_once() == 1
+        assert len(broker.queues["queue"]) == 1
+        assert relay.stats()["relayed"] == 1
+
+        await publisher.close()
+
+    @pytest.mark.asyncio
+    async def test_unconfirmed_messages_are_not_published_twice(self):
+        manager = OutboxManager()
+        session = FakeOutboxSession(
+            [OutboxMessage(id=message_id, queue_name="queue", body="{}", headers=None) for message_id in (1, 2)]
+        )
+        publisher = SlowPublisher()
+        in_flight: Dict[int, asyncio.Future] = {}
+
+        async def relay_batch() -> int:
+            async with UnitOfWork(route="test", session_maker=lambda: session):
+                return await manager.relay_batch(publisher, batch_size=10, confirm_timeout=0.01, in_flight=in_flight)
+
+        assert await relay_batch() == 0
+        assert await relay_batch() == 0
+        assert len(publisher.published) == 2
+        assert sorted(in_flight) == [1, 2]
+
+        publisher.futures[0].set_result(None)
+        publisher.futures[1].set_exception(PublishError("message was rejected by the broker"))
+
+        assert await relay_batch() == 1
+        assert list(session.messages) == [2]
+        assert len(publisher.published) == 3
+
+    @pytest.mark.asyncio
+    async def test_claim_is_committed_before_publishing(self):
+        manager = OutboxManager()
+        session = FakeOutboxSession(
+            [OutboxMessage(id=message_id, queue_name="queue", body="{}", headers=None) for message_id in (1, 2)]
+        )
+        publisher = SlowPublisher()
+        uncommitted_when_published: List[bool] = []
+        publish = publisher.publish
+
+        def publish_after_commit(queue_name: str, body: bytes, headers: Optional[Dict] = None) -> asyncio.Future:
+            uncommitted_when_published.append(session.uncommitted)
+            return publish(queue_name, body, headers)
+
+        publisher.publish = publish_after_commit
+
+        async with UnitOfWork(route="test", session_maker=lambda: session):
+            await manager.relay_batch(publisher, batch_size=10, confirm_timeout=0.01, in_flight={})
+
+        assert uncommitted_when_published == [False, False]
+        assert session.claimed == {1, 2}
+
+    @pytest.mark.asyncio
+    async def test_buffered_message_is_withdrawn(self):
+        broker = FakeBroker()
+        broker.available = False
+        publisher = PikaClient(connection_factory=broker.connect, reconnect_delay=0.01)
+        await publisher.start()
+
+        future = publisher.publish("queue", b"message")
+
+        assert publisher.withdraw(future)
+        assert future.cancelled()
+        assert publisher.pending == 0
+        assert not publisher.withdraw(future)
+
+        await publisher.close(timeout=0)
@@ -0,0 +1,167 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+import pytest
+
+from user_management.api.users.services import UserService
+from user_management.api.utils.exceptions import BadRequestHTTPException, CursorError
+from user_management.api.utils.pagination import Cursor, decode_cursor, encode_cursor
+from user_management.api.utils.principal_cache import Principal
+from user_management.database.models import User
+from user_management.managers.user_manager import UserManager
+
+
+class FakeUserManager(UserManager):
+    def __init__(self, page_size: int):
+        self.users = [User(user_id=uuid.uuid4(), username=f"user{i:03}", name=None) for i in range(page_size * 3)]
+        self.calls = []
+
+    async def get_page_after(
+        self,
+        limit: int,
+        sort_field: str,
+        ord_direction: str = "asc",
+        after: Optional[Tuple[Any, uuid.UUID]] = None,
+        name: Optional[str] = None,
+        group_id: Optional[int] = None,
+    ) -> Dict:
+        self.calls.append({"after": after, "group_id": group_id})
+        users = sorted(self.users, key=lambda user: (user.username, user.user_id))
+        if after is not None:
+            users = [user for user in users if (user.username, user.user_id) > after]
+
+        next_position = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_position = (self.get_sort_value(users[-1], sort_field), users[-1].user_id)
+
+        return {"users": users, "next": next_position}
+
+    async def get_all(self, offset: int, limit: int = 50, sort_field: Optional[str] = None, **filters) -> Dict:
+        self.calls.append({"sort_field": sort_field})
+        return {"total_count": len(self.users), "total_count_estimated": False, "users": self.users[offset:limit]}
+
+
+class TestCursor:
+    def test_round_trip(self):
+        cursor = Cursor(sort_field="username", ord_direction="desc", value="user", user_id=uuid.uuid4())
+
+        assert decode_cursor(encode_cursor(cursor)) == cursor
+
+    def test_datetime_round_trip(self):
+        created_at = datetime(2024, 1, 30, 15, 52, tzinfo=timezone.utc)
+        cursor = Cursor(sort_field="created_at", ord_direction="asc", value=created_at, user_id=uuid.uuid4())
+
+        assert decode_cursor(encode_cursor(cursor), value_type=datetime) == cursor
+
+    @pytest.mark.parametrize(
+        "value, value_type", [(1, str), (None, str), (["user"], str), ("not a date", datetime), (1, datetime)]
+    )
+    def test_value_of_other_type(self, value: Any, value_type: type):
+        cursor = encode_cursor(Cursor(sort_field="username", ord_direction="asc", value=value, user_id=uuid.uuid4()))
+
+        with pytest.raises(CursorError):
+            decode_cursor(cursor, value_type=value_type)
+
+    @pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(Cursor("a", "asc", 1, uuid.uuid4()))[:-4]])
+    def test_invalid_cursor(self, cursor: str):
+        with pytest.raises(CursorError):
+            decode_cursor(cursor)
+
+
+class TestCursorPagination:
+    admin = Principal(user_id=uuid.uuid4(), role="ADMIN", group_id=None, is_blocked=False)
+
+    @staticmethod
+    def create_service(page_size: int) -> UserService:
+        service = UserService()
+        service.manager = FakeUserManager(page_size=page_size)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_walk_all_pages(self):
+        service = self.create_service(page_size=10)
+        usernames = []
+        cursor = None
+
+        while True:
+            page = await service.read_user_list(
+                authorized_user=self.admin, limit=10, sort_field="username", pagination="cursor", cursor=cursor
+            )
+            usernames.extend(user.username for user in page["users"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert usernames == sorted(user.username for user in service.manager.users)
+        assert len(service.manager.calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_moderator_is_scoped_to_group(self):
+        service = self.create_service(page_size=10)
+        moderator = Principal(user_id=uuid.uuid4(), role="MODERATOR", group_id=1, is_blocked=False)
+
+        await service.read_user_list(authorized_user=moderator, sort_field="username", pagination="cursor")
+
+        assert service.manager.calls[0]["group_id"] == moderator.group_id
+
+    @pytest.mark.asyncio
+    async def test_cursor_must_match_sort(self):
+        service = self.create_service(page_size=10)
+        page = await service.read_user_list(
+            authorized_user=self.admin, limit=10, sort_field="username", pagination="cursor"
+        )
+
+        with pytest.raises(BadRequestHTTPException):
+            await service.read_user_list(
+                authorized_user=self.admin, limit=10, sort_field="email", cursor=page["next_cursor"]
+            )
+
+    @pytest.mark.asyncio
+    async def test_unknown_sort_field(self):
+        service = self.create_service(page_size=10)
+
+        with pytest.raises(BadRequestHTTPException):
+            await service.read_user_list(authorized_user=self.admin, sort_field="password", pagination="cursor")
+
+    @pytest.mark.asyncio
+    async def test_tampered_cursor_value(self):
+        service = self.create_service(page_size=10)
+        cursor = encode_cursor(Cursor(sort_field="created_at", ord_direction="asc", value=1, user_id=uuid.uuid4()))
+
+        with pytest.raises(BadRequestHTTPException):
+            await service.read_user_list(
+                authorized_user=self.admin, sort_field="created_at", pagination="cursor", cursor=cursor
+            )
+
+
+class TestOffsetPagination:
+    admin = Principal(user_id=uuid.uuid4(), role="ADMIN", group_id=None, is_blocked=False)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("sort_field", ["username", "user_id", "is_blocked", "group_id"])
+    async def test_sort_by_any_column(self, sort_field: str):
+        service = UserService()
+        service.manager = FakeUserManager(page_size=10)
+
+        await service.read_user_list(authorized_user=self.admin, sort_field=sort_field)
+
+        assert service.manager.calls == [{"sort_field": sort_field}]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("sort_field", ["password", "unknown"])
+    async def test_unsortable_field(self, sort_field: str):
+        service = UserService()
+        service.manager = FakeUserManager(page_size=10)
+
+        with pytest.raises(BadRequestHTTPException):
+            await service.read_user_list(authorized_user=self.admin, sort_field=sort_field)
+
+    @pytest.mark.asyncio
+    async def test_keyset_is_limited_to_indexed_fields(self):
+        service = UserService()
+        service.manager = FakeUserManager(page_size=10)
+
+        with pytest.raises(BadRequestHTTPException):
+            await service.read_user_list(authorized_user=self.admin, sort_field="user_id", pagination="cursor")
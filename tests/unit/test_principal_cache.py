@@ -0,0 +1,93 @@
+import asyncio
+import contextlib
+import uuid
+
+import pytest
+
+from user_management.api.utils.principal_cache import Principal, PrincipalCache
+
+
+class TestPrincipalCache:
+    channel = "test_principal_cache_invalidation"
+
+    @staticmethod
+    def create_principal() -> Principal:
+        return Principal(user_id=uuid.uuid4(), role="USER", group_id=1, is_blocked=False)
+
+    def test_hit_and_miss(self):
+        cache = PrincipalCache(max_size=10, ttl_seconds=60, channel=self.channel)
+        principal = self.create_principal()
+
+        assert cache.get(principal.user_id) is None
+
+        cache.put(principal, version=cache.version)
+
+        assert cache.get(principal.user_id) == principal
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_entry_expires(self):
+        cache = PrincipalCache(max_size=10, ttl_seconds=0, channel=self.channel)
+        principal = self.create_principal()
+
+        cache.put(principal, version=cache.version)
+
+        assert cache.get(principal.user_id) is None
+        assert cache.stats()["size"] == 0
+
+    def test_size_is_bounded(self):
+        cache = PrincipalCache(max_size=2, ttl_seconds=60, channel=self.channel)
+        first, second, third = self.create_principal(), self.create_principal(), self.create_principal()
+
+        cache.put(first, version=cache.version)
+        cache.put(second, version=cache.version)
+        cache.get(first.user_id)
+        cache.put(third, version=cache.version)
+
+        assert cache.get(second.user_id) is None
+        assert cache.get(first.user_id) == first
+        assert cache.get(third.user_id) == third
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate(self):
+        cache = PrincipalCache(max_size=10, ttl_seconds=60, channel=self.channel)
+        principal = self.create_principal()
+
+        cache.put(principal, version=cache.version)
+        cache.invalidate(principal.user_id)
+
+        assert cache.get(principal.user_id) is None
+
+    def test_stale_value_is_not_stored_after_invalidation(self):
+        cache = PrincipalCache(max_size=10, ttl_seconds=60, channel=self.channel)
+        principal = self.create_principal()
+
+        version = cache.version
+        cache.invalidate(principal.user_id)
+        cache.put(principal, version=version)
+
+        assert cache.get(principal.user_id) is None
+
+    @pytest.mark.asyncio
+    async def test_invalidation_from_another_worker(self, fake_redis_client):
+        cache = PrincipalCache(max_size=10, ttl_seconds=60, channel=self.channel)
+        other_worker_cache = PrincipalCache(max_size=10, ttl_seconds=60, channel=self.channel)
+        principal = self.create_principal()
+
+        listener = asyncio.create_task(cache.listen_for_invalidations(fake_redis_client))
+        while (await fake_redis_client.pubsub_numsub(self.channel))[0][1] == 0:
+            await asyncio.sleep(0.01)
+
+        cache.put(principal, version=cache.version)
+        await other_worker_cache.publish_invalidation(principal.user_id, redis_client=fake_redis_client)
+
+        for _ in range(100):
+            if cache.stats()["size"] == 0:
+                break
+            await asyncio.sleep(0.01)
+
+        listener.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await listener
+
+        assert cache.get(principal.user_id) is None
@@ -0,0 +1,153 @@
+import asyncio
+import marshal
+import time
+import uuid
+from typing import Dict, Optional
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient, Response
+
+from user_management.api.utils.principal_cache import Principal
+from user_management.api.utils.profiling import (
+    ProfileStore,
+    ProfilingMiddleware,
+    create_profiling_token,
+    verify_profiling_token,
+)
+
+ADMIN = Principal(user_id=uuid.uuid4(), role="ADMIN", group_id=None, is_blocked=False)
+USER = Principal(user_id=uuid.uuid4(), role="USER", group_id=None, is_blocked=False)
+
+
+def endpoint_to_profile() -> Dict:
+    return {"status": "ok"}
+
+
+def create_app(store: ProfileStore) -> FastAPI:
+    principals: Dict[uuid.UUID, Principal] = {principal.user_id: principal for principal in (ADMIN, USER)}
+
+    async def get_principal(user_id: uuid.UUID) -> Optional[Principal]:
+        return principals.get(user_id)
+
+    app = FastAPI()
+
+    @app.get("/endpoint")
+    async def endpoint():
+        # long enough for concurrent requests to overlap
+        await asyncio.sleep(0.01)
+        return endpoint_to_profile()
+
+    app.add_middleware(ProfilingMiddleware, store=store, get_principal=get_principal)
+    return app
+
+
+async def get_endpoint(app: FastAPI, token: Optional[str] = None) -> Response:
+    headers: Dict[str, str] = {"X-Profile": token} if token is not None else {}
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response: Response = await client.get("/endpoint", headers=headers)
+
+    assert response.json() == {"status": "ok"}
+    return response
+
+
+class TestProfilingToken:
+    def test_token_is_verified(self):
+        token, expires_at = create_profiling_token(ADMIN.user_id)
+
+        assert verify_profiling_token(token) == ADMIN.user_id
+        assert expires_at > time.time()
+
+    def test_changed_token_is_rejected(self):
+        token, _ = create_profiling_token(USER.user_id)
+        _, expires_at, signature = token.split(".")
+
+        assert verify_profiling_token(f"{ADMIN.user_id}.{expires_at}.{signature}") is None
+        assert verify_profiling_token(f"{USER.user_id}.{int(expires_at) + 3600}.{signature}") is None
+        assert verify_profiling_token("not a token") is None
+
+    def test_expired_token_is_rejected(self):
+        token, _ = create_profiling_token(ADMIN.user_id, ttl_seconds=-1)
+
+        assert verify_profiling_token(token) is None
+
+
+class TestProfileStore:
+    @pytest.mark.asyncio
+    async def test_profiles_per_minute_are_limited(self, fake_redis_client: FakeRedis):
+        store = ProfileStore(redis_client=fake_redis_client, max_profiles_per_minute=2)
+
+        assert [await store.acquire(ADMIN.user_id) for _ in range(3)] == [True, True, False]
+        assert await store.acquire(USER.user_id)
+        assert 0 < await fake_redis_client.ttl(f"{store.rate_limit_key_prefix}{ADMIN.user_id}") <= 60
+
+
+class TestProfilingMiddleware:
+    @pytest.mark.asyncio
+    async def test_request_without_header_is_not_profiled(self, fake_redis_client: FakeRedis):
+        response: Response = await get_endpoint(create_app(ProfileStore(redis_client=fake_redis_client)))
+
+        assert "x-profile-status" not in response.headers
+        assert await fake_redis_client.keys() == []
+
+    @pytest.mark.asyncio
+    async def test_admin_request_is_profiled(self, fake_redis_client: FakeRedis):
+        store = ProfileStore(redis_client=fake_redis_client)
+        token, _ = create_profiling_token(ADMIN.user_id)
+
+        response: Response = await get_endpoint(create_app(store), token)
+
+        assert response.headers["x-profile-status"] == "profiling"
+        profile: bytes = await store.load(response.headers["x-profile-id"])
+        functions = {function_name for _, _, function_name in marshal.loads(profile)}  # noqa: S302
+        assert endpoint_to_profile.__name__ in functions
+
+    @pytest.mark.asyncio
+    async def test_request_of_other_user_is_not_profiled(self, fake_redis_client: FakeRedis):
+        token, _ = create_profiling_token(USER.user_id)
+
+        response: Response = await get_endpoint(create_app(ProfileStore(redis_client=fake_redis_client)), token)
+
+        assert response.headers["x-profile-status"] == "forbidden"
+        assert "x-profile-id" not in response.headers
+
+    @pytest.mark.asyncio
+    async def test_invalid_token_is_reported(self, fake_redis_client: FakeRedis):
+        response: Response = await get_endpoint(create_app(ProfileStore(redis_client=fake_redis_client)), "token")
+
+        assert response.headers["x-profile-status"] == "invalid_token"
+
+    @pytest.mark.asyncio
+    async def test_requests_over_rate_limit_are_not_profiled(self, fake_redis_client: FakeRedis):
+        app: FastAPI = create_app(ProfileStore(redis_client=fake_redis_client, max_profiles_per_minute=1))
+        token, _ = create_profiling_token(ADMIN.user_id)
+
+        statuses = [(await get_endpoint(app, token)).headers["x-profile-status"] for _ in range(2)]
+
+        assert statuses == ["profiling", "rate_limited"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_are_profiled_one_at_a_time(self, fake_redis_client: FakeRedis):
+        app: FastAPI = create_app(ProfileStore(redis_client=fake_redis_client))
+        token, _ = create_profiling_token(ADMIN.user_id)
+
+        responses = await asyncio.gather(*(get_endpoint(app, token) for _ in range(2)))
+
+        assert sorted(response.headers["x-profile-status"] for response in responses) == ["busy", "profiling"]
+        assert (await get_endpoint(app, token)).headers["x-profile-status"] == "profiling"
+
+    @pytest.mark.asyncio
+    async def test_profiler_is_released_when_authorization_fails(self, fake_redis_client: FakeRedis):
+        async def get_principal(user_id: uuid.UUID) -> Optional[Principal]:
+            raise ConnectionError("database is unavailable")
+
+        middleware = ProfilingMiddleware(
+            create_app(ProfileStore(redis_client=fake_redis_client)), get_principal=get_principal
+        )
+        token, _ = create_profiling_token(ADMIN.user_id)
+
+        with pytest.raises(ConnectionError):
+            await middleware.authorize(token)
+
+        assert not middleware.profiling
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+
+from tests.fake_broker import FakeBroker
+from user_management.rabbit.settings import PikaClient, PublishError
+
+
+class TestPikaClient:
+    queue_name = "test_queue"
+
+    @staticmethod
+    def create_client(broker: FakeBroker, **kwargs) -> PikaClient:
+        settings = {"channel_pool_size": 2, "reconnect_delay": 0.01, "max_reconnect_delay": 0.1}
+        settings.update(kwargs)
+        return PikaClient(connection_factory=broker.connect, **settings)
+
+    @pytest.mark.asyncio
+    async def test_messages_share_connection_and_are_confirmed(self):
+        broker = FakeBroker()
+        client = self.create_client(broker)
+        await client.start()
+
+        await asyncio.wait_for(
+            asyncio.gather(*(client.publish(self.queue_name, str(i).encode()) for i in range(10))), timeout=1
+        )
+
+        assert len(broker.connections) == 1
+        assert broker.declared_queues == [self.queue_name]
+        assert [body for body, _ in broker.queues[self.queue_name]] == [str(i).encode() for i in range(10)]
+        assert client.stats()["confirmed"] == 10
+        assert client.pending == 0
+
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_buffer_is_sent_in_batches(self):
+        broker = FakeBroker()
+        client = self.create_client(broker, send_batch_size=10)
+        await client.start()
+        await asyncio.wait_for(client.publish(self.queue_name, b"declare"), timeout=1)
+
+        futures = [client.publish(self.queue_name, str(i).encode()) for i in range(50)]
+
+        async def observe_buffer() -> int:
+            return client.stats()["buffered"]
+
+        buffered_while_sending: int = await asyncio.create_task(observe_buffer())
+        await asyncio.wait_for(asyncio.gather(*futures), timeout=1)
+
+        assert 0 < buffered_while_sending < 50
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_messages_are_buffered_until_broker_is_available(self):
+        broker = FakeBroker()
+        broker.available = False
+        client = self.create_client(broker)
+        await client.start()
+
+        future = client.publish(self.queue_name, b"message")
+        await asyncio.sleep(0.05)
+        assert not future.done()
+        assert client.stats()["buffered"] == 1
+
+        broker.available = True
+        await asyncio.wait_for(future, timeout=1)
+
+        assert broker.queues[self.queue_name] == [(b"message", broker.queues[self.queue_name][0][1])]
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_unconfirmed_messages_are_resent_after_reconnect(self):
+        broker = FakeBroker(latency=0.05)
+        client = self.create_client(broker)
+        await client.start()
+
+        future = client.publish(self.queue_name, b"message")
+        while not broker.queues[self.queue_name]:
+            await asyncio.sleep(0.001)
+        broker.connections[0].drop()
+
+        await asyncio.wait_for(future, timeout=1)
+
+        assert len(broker.connections) == 2
+        assert broker.declared_queues == [self.queue_name, self.queue_name]
+        assert len(broker.queues[self.queue_name]) == 2
+        assert client.stats()["reconnects"] == 1
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_buffer_is_bounded(self):
+        broker = FakeBroker()
+        broker.available = False
+        client = self.create_client(broker, max_buffered_messages=2)
+        await client.start()
+
+        client.publish(self.queue_name, b"first")
+        client.publish(self.queue_name, b"second")
+
+        with pytest.raises(PublishError):
+            client.publish(self.queue_name, b"third")
+
+        await client.close(timeout=0)
+
+    @pytest.mark.asyncio
+    async def test_rejected_message_fails(self):
+        broker = FakeBroker()
+        broker.reject = True
+        client = self.create_client(broker)
+        await client.start()
+
+        with pytest.raises(PublishError):
+            await asyncio.wait_for(client.publish(self.queue_name, b"message"), timeout=1)
+
+        assert client.stats()["nacked"] == 1
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_close_fails_unsent_messages(self):
+        broker = FakeBroker()
+        broker.available = False
+        client = self.create_client(broker)
+        await client.start()
+
+        future = client.publish(self.queue_name, b"message")
+        await client.close(timeout=0.05)
+
+        with pytest.raises(PublishError):
+            await future
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeConnection
+from redis import asyncio as aioredis
+
+from user_management.redis_settings import InstrumentedConnectionPool, create_redis_pool
+
+
+class TestRedisPool:
+    @staticmethod
+    def create_fake_pool(max_connections: int) -> InstrumentedConnectionPool:
+        return create_redis_pool(
+            connection_class=FakeConnection,
+            server=FakeServer(),
+            lib_name=None,
+            lib_version=None,
+            max_connections=max_connections,
+        )
+
+    @pytest.mark.asyncio
+    async def test_clients_share_pool(self):
+        pool = self.create_fake_pool(max_connections=2)
+
+        first_client = aioredis.Redis(connection_pool=pool)
+        second_client = aioredis.Redis(connection_pool=pool)
+
+        await first_client.set("key", "value")
+        await first_client.aclose()
+
+        assert await second_client.get("key") == b"value"
+
+        stats = pool.stats()
+        assert stats["checkouts"] == 2
+        assert stats["in_use"] == 0
+        assert stats["idle"] == 1
+
+        await pool.disconnect()
+
+    @pytest.mark.asyncio
+    async def test_pool_size_is_capped(self):
+        pool = self.create_fake_pool(max_connections=1)
+
+        connection = await pool.get_connection("GET")
+        waiting_checkout = asyncio.create_task(pool.get_connection("GET"))
+        await asyncio.sleep(0.01)
+
+        assert pool.stats()["in_use"] == 1
+        assert pool.stats()["waiting"] == 1
+
+        await pool.release(connection)
+        await pool.release(await waiting_checkout)
+
+        assert pool.stats()["waiting"] == 0
+        assert pool.stats()["checkouts"] == 2
+
+        await pool.disconnect()
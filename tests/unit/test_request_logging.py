@@ -0,0 +1,76 @@
+import logging
+from typing import List
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from user_management.api.utils.request_logging import RequestLoggingMiddleware
+
+CHUNKS: List[bytes] = [b"first,", b"second,", b"third"]
+
+
+def create_app(**middleware_options) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/stream")
+    async def stream():
+        async def generate():
+            for chunk in CHUNKS:
+                yield chunk
+
+        return StreamingResponse(generate(), status_code=202)
+
+    app.add_middleware(RequestLoggingMiddleware, **middleware_options)
+    return app
+
+
+async def get_stream(app: FastAPI) -> List[bytes]:
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        async with client.stream("GET", "/stream", params={"token": "secret"}) as response:
+            assert response.status_code == 202
+            return [chunk async for chunk in response.aiter_raw()]
+
+
+class TestRequestLoggingMiddleware:
+    @pytest.mark.asyncio
+    async def test_response_is_streamed_and_logged(self, caplog: pytest.LogCaptureFixture):
+        with caplog.at_level(logging.INFO, logger="logger"):
+            chunks: List[bytes] = await get_stream(create_app(body_sample_rate=0))
+
+        assert b"".join(chunks) == b"".join(CHUNKS)
+        [record] = caplog.records
+        assert record.getMessage().startswith(f"GET /stream 202 {len(b''.join(CHUNKS))}B ")
+        assert "secret" not in record.getMessage()
+        assert (record.route, record.status, record.size) == ("GET /stream", 202, len(b"".join(CHUNKS)))
+        assert not hasattr(record, "body")
+        assert not hasattr(record, "headers")
+
+    @pytest.mark.asyncio
+    async def test_sampled_body_is_capped(self, caplog: pytest.LogCaptureFixture):
+        with caplog.at_level(logging.INFO, logger="logger"):
+            await get_stream(create_app(body_sample_rate=1, body_max_bytes=10))
+
+        [record] = caplog.records
+        assert record.body == "first,seco"
+        assert record.body_truncated
+
+    @pytest.mark.asyncio
+    async def test_nothing_is_logged_above_info_level(self, caplog: pytest.LogCaptureFixture):
+        with caplog.at_level(logging.WARNING, logger="logger"):
+            await get_stream(create_app(body_sample_rate=1))
+
+        assert not caplog.records
+
+    @pytest.mark.asyncio
+    async def test_headers_are_redacted_at_debug_level(self, caplog: pytest.LogCaptureFixture):
+        app: FastAPI = create_app(body_sample_rate=0)
+
+        with caplog.at_level(logging.DEBUG, logger="logger"):
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                await client.get("/stream", headers={"Authorization": "Bearer token", "X-Request": "request"})
+
+        [record] = caplog.records
+        assert record.headers["authorization"] == "[redacted]"
+        assert record.headers["x-request"] == "request"
@@ -1,8 +1,10 @@
+import asyncio
 import datetime
 import uuid
 
 import jwt
 import pytest
+import redis.exceptions
 
 from user_management.api.auth.tokens import AuthToken
 from user_management.api.utils.exceptions import TokenError
@@ -73,12 +75,15 @@ class TestToken:
             user_id=self.user_id,
             role_name=self.role_name,
             group_id=self.group_id,
+            expiration_time=self.auth_token.get_refresh_token_expiration_time(),
         )
+        jti = jwt.decode(jwt=token, key=config.SECRET_KEY, algorithms=[config.TOKEN_HASH_ALGORITHM])["jti"]
 
         await self.auth_token.add_token_to_blacklist(token, redis_client=fake_redis_client)
-        token_blacklist = await fake_redis_client.smembers("token_blacklist")
+        revoked_token_key = self.auth_token.get_revoked_token_key(jti)
 
-        assert bytes(token, encoding="utf-8") in token_blacklist
+        assert await fake_redis_client.exists(revoked_token_key)
+        assert 0 < await fake_redis_client.ttl(revoked_token_key) <= config.REFRESH_TOKEN_TTL_DAYS * 24 * 60 * 60
 
     @pytest.mark.asyncio
     async def test_check_token_blacklisted(self, fake_redis_client):
@@ -89,12 +94,56 @@ class TestToken:
             group_id=self.group_id,
         )
 
-        await fake_redis_client.sadd("token_blacklist", token)
+        await self.auth_token.check_token_blacklisted(token=token, redis_client=fake_redis_client)
+        await self.auth_token.add_token_to_blacklist(token, redis_client=fake_redis_client)
 
         with pytest.raises(TokenError, match="token in blacklist"):
             await self.auth_token.check_token_blacklisted(token=token, redis_client=fake_redis_client)
             assert False, "token was not added to blacklist"
 
+    @pytest.mark.asyncio
+    async def test_check_legacy_token_blacklisted(self, fake_redis_client):
+        token = jwt.encode(
+            headers={"jwt_type": "refresh"},
+            payload={"user_id": str(self.user_id)},
+            key=config.SECRET_KEY,
+            algorithm=config.TOKEN_HASH_ALGORITHM,
+        )
+
+        await fake_redis_client.sadd("token_blacklist", token)
+
+        with pytest.raises(TokenError, match="token in blacklist"):
+            await self.auth_token.check_token_blacklisted(token=token, redis_client=fake_redis_client)
+            assert False, "token from the legacy blacklist passed the check"
+
+    @pytest.mark.asyncio
+    async def test_migrate_legacy_blacklist(self, fake_redis_client):
+        token = self.auth_token._create_token(
+            jwt_type="refresh",
+            user_id=self.user_id,
+            role_name=self.role_name,
+            group_id=self.group_id,
+            expiration_time=self.auth_token.get_refresh_token_expiration_time(),
+        )
+        expired_token = self.auth_token._create_token(
+            jwt_type="refresh",
+            user_id=self.user_id,
+            role_name=self.role_name,
+            group_id=self.group_id,
+            expiration_time=datetime.datetime.now(datetime.UTC),
+        )
+
+        await fake_redis_client.sadd("token_blacklist", token, expired_token)
+
+        migrated_count = await self.auth_token.migrate_legacy_blacklist(redis_client=fake_redis_client)
+
+        assert migrated_count == 1
+        assert not await fake_redis_client.exists("token_blacklist")
+
+        with pytest.raises(TokenError, match="token in blacklist"):
+            await self.auth_token.check_token_blacklisted(token=token, redis_client=fake_redis_client)
+            assert False, "migrated token passed the check"
+
     @pytest.mark.asyncio
     async def test_verify_token(self):
         token = self.auth_token._create_token(
@@ -147,3 +196,88 @@ class TestToken:
         with pytest.raises(TokenError):
             await self.auth_token.verify_token(token, jwt_type=self.jwt_type)
             assert False, "token with invalid signature passed verification"
+
+
+class TestRefreshTokenRotation:
+    user_id = uuid.uuid4()
+    role_name = "USER"
+    group_id = 1
+
+    def create_refresh_token(self, auth_token: AuthToken) -> str:
+        _, refresh_token = auth_token.create_token_pair(
+            user_id=self.user_id, role_name=self.role_name, group_id=self.group_id
+        )
+        return refresh_token
+
+    @pytest.mark.asyncio
+    async def test_rotated_token_keeps_family(self, fake_redis_client):
+        auth_token = AuthToken(redis_client=fake_redis_client)
+        refresh_token = self.create_refresh_token(auth_token)
+
+        _, new_refresh_token = await auth_token.refresh_token(refresh_token)
+
+        payload = jwt.decode(refresh_token, options={"verify_signature": False})
+        new_payload = jwt.decode(new_refresh_token, options={"verify_signature": False})
+
+        assert new_payload["fam"] == payload["fam"]
+        assert new_payload["jti"] != payload["jti"]
+
+    @pytest.mark.asyncio
+    async def test_concurrent_refreshes_of_same_token(self, fake_redis_client):
+        auth_token = AuthToken(redis_client=fake_redis_client)
+        refresh_token = self.create_refresh_token(auth_token)
+
+        results = await asyncio.gather(
+            *(auth_token.refresh_token(refresh_token) for _ in range(10)), return_exceptions=True
+        )
+
+        successful = [result for result in results if not isinstance(result, Exception)]
+        failed = [result for result in results if isinstance(result, TokenError)]
+
+        assert len(successful) == 1
+        assert len(failed) == 9
+
+    @pytest.mark.asyncio
+    async def test_reuse_revokes_family(self, fake_redis_client):
+        auth_token = AuthToken(redis_client=fake_redis_client)
+        refresh_token = self.create_refresh_token(auth_token)
+
+        _, new_refresh_token = await auth_token.refresh_token(refresh_token)
+
+        with pytest.raises(TokenError, match="token in blacklist"):
+            await auth_token.refresh_token(refresh_token)
+            assert False, "rotated token was accepted twice"
+
+        with pytest.raises(TokenError, match="token in blacklist"):
+            await auth_token.refresh_token(new_refresh_token)
+            assert False, "token of a revoked family was accepted"
+
+        with pytest.raises(TokenError, match="token in blacklist"):
+            await auth_token.verify_token(new_refresh_token, jwt_type="refresh")
+            assert False, "token of a revoked family passed verification"
+
+    @pytest.mark.asyncio
+    async def test_reuse_is_refused_when_family_revocation_fails(self, fake_redis_client, monkeypatch):
+        auth_token = AuthToken(redis_client=fake_redis_client)
+        refresh_token = self.create_refresh_token(auth_token)
+        await auth_token.refresh_token(refresh_token)
+
+        async def set_failing(*args, **kwargs):
+            raise redis.exceptions.ConnectionError("connection lost")
+
+        monkeypatch.setattr(fake_redis_client, "set", set_failing)
+
+        with pytest.raises(TokenError, match="token in blacklist"):
+            await auth_token.refresh_token(refresh_token)
+
+    @pytest.mark.asyncio
+    async def test_other_families_are_not_affected(self, fake_redis_client):
+        auth_token = AuthToken(redis_client=fake_redis_client)
+        refresh_token = self.create_refresh_token(auth_token)
+        other_refresh_token = self.create_refresh_token(auth_token)
+
+        await auth_token.refresh_token(refresh_token)
+        with pytest.raises(TokenError):
+            await auth_token.refresh_token(refresh_token)
+
+        assert await auth_token.refresh_token(other_refresh_token)
@@ -0,0 +1,172 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from httpx import ASGITransport, AsyncClient
+
+from tests.fake_broker import FakeBroker
+from user_management.api.utils import request_tracing
+from user_management.api.utils.request_tracing import RequestTracingMiddleware
+from user_management.api.utils.routing import UnitOfWorkRoute
+from user_management.managers.outbox_manager import OutboxManager
+from user_management.rabbit import settings
+from user_management.rabbit.settings import PikaClient
+from user_management.tracing import (
+    Span,
+    SpanContext,
+    SpanExporter,
+    Tracer,
+    format_traceparent,
+    get_current_traceparent,
+    parse_traceparent,
+)
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+class ListSpanExporter(SpanExporter):
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter(monkeypatch: pytest.MonkeyPatch) -> ListSpanExporter:
+    span_exporter = ListSpanExporter()
+    test_tracer = Tracer(exporter=span_exporter, sample_rate=1)
+    for module in (request_tracing, settings):
+        monkeypatch.setattr(module, "tracer", test_tracer)
+    return span_exporter
+
+
+class TestTraceparent:
+    def test_round_trip(self):
+        context: Optional[SpanContext] = parse_traceparent(TRACEPARENT)
+
+        assert context == SpanContext(
+            trace_id="0af7651916cd43dd8448eb211c80319c", span_id="b7ad6b7169203331", sampled=True
+        )
+        assert format_traceparent(context) == TRACEPARENT
+
+    @pytest.mark.parametrize(
+        "traceparent",
+        [
+            None,
+            "",
+            "invalid",
+            "01-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01",
+            f"00-{'0' * 32}-b7ad6b7169203331-01",
+        ],
+    )
+    def test_invalid(self, traceparent: Optional[str]):
+        assert parse_traceparent(traceparent) is None
+
+
+class TestTracer:
+    def test_nested_spans_share_trace(self):
+        exporter = ListSpanExporter()
+        tracer = Tracer(exporter=exporter, sample_rate=1)
+
+        with tracer.span("parent") as parent, tracer.span("child") as child:
+            assert get_current_traceparent() == format_traceparent(child.context)
+
+        assert exporter.spans == [child, parent]
+        assert child.context.trace_id == parent.context.trace_id
+        assert child.parent_span_id == parent.context.span_id
+        assert parent.parent_span_id is None
+        assert get_current_traceparent() is None
+
+    def test_errors(self):
+        tracer = Tracer(exporter=ListSpanExporter(), sample_rate=1)
+
+        with pytest.raises(KeyError), tracer.span("expected", expected_errors=(KeyError,)) as expected:
+            raise KeyError("expected")
+        with pytest.raises(ValueError), tracer.span("failed", expected_errors=(KeyError,)) as failed:
+            raise ValueError("failed")
+
+        assert expected.to_dict()["status"] == "ok"
+        assert failed.to_dict()["status"] == "error"
+        assert failed.to_dict()["error"] == "ValueError('failed')"
+
+    def test_sampling(self):
+        exporter = ListSpanExporter()
+        tracer = Tracer(exporter=exporter, sample_rate=0)
+
+        with tracer.span("not sampled") as span:
+            assert tracer.start_child_span("query") is None
+        with tracer.span("sampled by caller", parent=parse_traceparent(TRACEPARENT)):
+            assert tracer.start_child_span("query") is not None
+
+        assert not span.context.sampled
+        assert [span.name for span in exporter.spans] == ["sampled by caller"]
+
+    def test_nothing_is_sampled_without_exporter(self):
+        with Tracer(exporter=None, sample_rate=1).span("request") as span:
+            assert not span.context.sampled
+
+    def test_exporter_must_implement_export(self):
+        class IncompleteSpanExporter(SpanExporter):
+            pass
+
+        with pytest.raises(TypeError):
+            IncompleteSpanExporter()
+
+
+class TestTracePropagation:
+    @pytest.mark.asyncio
+    async def test_request_continues_trace_of_caller(self, exporter: ListSpanExporter):
+        router = APIRouter(route_class=UnitOfWorkRoute)
+
+        @router.get("/tracing-test/{item_id}")
+        async def read_item(item_id: int):
+            raise HTTPException(status_code=404)
+
+        app = FastAPI()
+        app.include_router(router)
+        app.add_middleware(RequestTracingMiddleware)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/tracing-test/1", headers={"traceparent": TRACEPARENT})
+
+        [span] = exporter.spans
+        assert span.name == "GET /tracing-test/{item_id}"
+        assert span.context.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert span.parent_span_id == "b7ad6b7169203331"
+        assert span.attributes["http.status_code"] == 404
+        assert span.error is None
+
+    @pytest.mark.asyncio
+    async def test_unmatched_request_continues_trace_of_caller(self, exporter: ListSpanExporter):
+        app = FastAPI()
+        app.add_middleware(RequestTracingMiddleware)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/tracing-test-missing", headers={"traceparent": TRACEPARENT})
+
+        [span] = exporter.spans
+        assert span.name == "GET"
+        assert span.context.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert span.attributes["http.status_code"] == 404
+        assert "http.route" not in span.attributes
+
+    @pytest.mark.asyncio
+    async def test_outbox_message_is_published_in_trace_of_change(self, exporter: ListSpanExporter):
+        broker = FakeBroker()
+        client = PikaClient(connection_factory=broker.connect, reconnect_delay=0.01)
+        await client.start()
+
+        with settings.tracer.span("POST /auth/signup") as request_span:
+            message = OutboxManager().create_message("test_queue", body={}, headers={"event": "user_created"})
+
+        await asyncio.wait_for(client.publish(message.queue_name, message.body.encode(), message.headers), timeout=1)
+        await client.close()
+
+        [(_, properties)] = broker.queues["test_queue"]
+        publish_span: Span = exporter.spans[-1]
+        assert publish_span.name == "amqp.publish"
+        assert publish_span.parent_span_id == request_span.context.span_id
+        assert properties.headers == {"event": "user_created", "traceparent": format_traceparent(publish_span.context)}
+        assert publish_span.attributes["messaging.outcome"] == "confirmed"
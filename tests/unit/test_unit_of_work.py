@@ -0,0 +1,194 @@
+import asyncio
+import io
+import uuid
+from typing import Dict, List
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from sqlalchemy.orm import Session
+
+from user_management.api.auth.services import AuthService
+from user_management.api.users.services import UserService
+from user_management.api.utils.routing import UnitOfWorkRoute
+from user_management.database.models import User
+from user_management.database.unit_of_work import (
+    UnitOfWork,
+    checkout_stats,
+    count_checkout,
+    current_unit_of_work,
+    session_scope,
+)
+from user_management.managers.user_manager import UserManager
+
+
+class FakeResult:
+    def __init__(self, rows: List):
+        self.rows = rows
+
+    def unique(self) -> "FakeResult":
+        return self
+
+    def all(self) -> List:  # noqa: A003
+        return self.rows
+
+    def first(self):
+        return self.rows[0]
+
+    def one_or_none(self):
+        return self.rows[0]
+
+
+class FakeSession:
+    """Every statement returns 'rows'. A statement begins a transaction, which holds a pool connection."""
+
+    def __init__(self, rows: List):
+        self.rows = rows
+        self.transaction_open: bool = False
+        self.sync_session = Session()
+
+    def in_transaction(self) -> bool:
+        return self.transaction_open
+
+    async def execute(self, statement) -> FakeResult:
+        self.transaction_open = True
+        return FakeResult(self.rows)
+
+    async def scalars(self, statement) -> FakeResult:
+        return await self.execute(statement)
+
+    def add(self, instance) -> None:
+        pass
+
+    async def commit(self) -> None:
+        self.transaction_open = False
+
+    async def rollback(self) -> None:
+        self.transaction_open = False
+
+    async def close(self) -> None:
+        self.transaction_open = False
+
+
+class TestUnitOfWork:
+    @pytest.mark.asyncio
+    async def test_scopes_share_the_request_session(self):
+        async with UnitOfWork(route="test") as unit_of_work:
+            assert unit_of_work.session is None
+
+            async with session_scope() as first_session:
+                pass
+            async with session_scope() as second_session:
+                pass
+
+        assert first_session is second_session is unit_of_work.session
+        assert current_unit_of_work.get() is None
+
+    @pytest.mark.asyncio
+    async def test_concurrent_scopes_use_separate_sessions(self):
+        sessions = []
+
+        async def use_session():
+            async with session_scope() as session:
+                sessions.append(session)
+                await asyncio.sleep(0)
+
+        async with UnitOfWork(route="test") as unit_of_work:
+            await asyncio.gather(use_session(), use_session())
+
+        assert sessions[0] is unit_of_work.session
+        assert sessions[1] is not unit_of_work.session
+
+    @pytest.mark.asyncio
+    async def test_scope_outside_of_request_opens_a_session(self):
+        async with session_scope() as first_session:
+            pass
+        async with session_scope() as second_session:
+            pass
+
+        assert first_session is not second_session
+
+    @pytest.mark.asyncio
+    async def test_checkouts_are_recorded_per_route(self):
+        router = APIRouter(route_class=UnitOfWorkRoute)
+
+        @router.get("/items/{item_id}")
+        async def read_item(item_id: int):
+            for _ in range(item_id):
+                count_checkout(None, None, None)
+            return {"checkouts": current_unit_of_work.get().checkouts}
+
+        app = FastAPI()
+        app.include_router(router)
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = [await client.get(f"/items/{item_id}") for item_id in (1, 2)]
+
+        assert [response.json()["checkouts"] for response in responses] == [1, 2]
+        assert checkout_stats.stats()["GET /items/{item_id}"] == {"requests": 2, "checkouts": 3, "max_checkouts": 2}
+
+
+class TestConnectionRelease:
+    @staticmethod
+    def create_user() -> User:
+        return User(
+            user_id=uuid.uuid4(), username="user", password="hash", role="USER", group_id=None, is_blocked=False
+        )
+
+    @pytest.mark.asyncio
+    async def test_read_scope_ends_its_transaction(self):
+        session = FakeSession([self.create_user()])
+
+        async with UnitOfWork(route="test", session_maker=lambda: session) as unit_of_work:
+            async with session_scope() as scope_session:
+                await scope_session.execute(None)
+
+            assert not session.in_transaction()
+
+        assert not unit_of_work.wrote
+
+    @pytest.mark.asyncio
+    async def test_login_does_not_hold_a_connection_while_hashing(self, fake_redis_client):
+        session = FakeSession([self.create_user()])
+        transaction_open_while_hashing: List[bool] = []
+
+        class FakePasswordHasher:
+            async def verify_password_async(self, password: str, hashed_password: str) -> bool:
+                transaction_open_while_hashing.append(session.in_transaction())
+                return True
+
+        service = AuthService(redis_client=fake_redis_client)
+        service.manager = UserManager()
+        service.password_hasher = FakePasswordHasher()
+
+        async with UnitOfWork(route="POST /auth/login", session_maker=lambda: session):
+            await service.authenticate(username="user", password="password")
+
+        assert transaction_open_while_hashing == [False]
+
+    @pytest.mark.asyncio
+    async def test_profile_update_does_not_hold_a_connection_while_uploading(self):
+        user: User = self.create_user()
+        session = FakeSession([user])
+        transaction_open_while_uploading: List[bool] = []
+
+        class FakeS3Client:
+            async def create_bucket(self, **kwargs) -> None:
+                pass
+
+            async def upload_fileobj(self, file, bucket: str, key: str) -> None:
+                transaction_open_while_uploading.append(session.in_transaction())
+
+        class NotUpdatingUserManager(UserManager):
+            async def update_user(self, user_id: uuid.UUID, user_data: Dict, **kwargs) -> User:
+                return user
+
+        service = UserService()
+        service.manager = NotUpdatingUserManager()
+
+        async with UnitOfWork(route="PATCH /user/me", session_maker=lambda: session):
+            # the principal is read by the authenticated_user dependency
+            await service.manager.get_principal(user.user_id)
+            await service.update_user(user.user_id, {"username": "new"}, s3=FakeS3Client(), file=io.BytesIO(b"image"))
+
+        assert transaction_open_while_uploading == [False]
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.sql.selectable import Select
+
+from user_management.database.models import User
+from user_management.managers.user_counter import UserCount, UserCounter
+
+
+class FakeUserCounter(UserCounter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.database_counts: int = 0
+        self.value: int = 0
+
+    async def count_in_database(self, query: Select) -> UserCount:
+        self.database_counts += 1
+        return UserCount(value=self.value, estimated=False)
+
+
+class TestUserCounter:
+    query = select(User.user_id)
+
+    @pytest.mark.asyncio
+    async def test_count_is_cached_per_filter(self, fake_redis_client):
+        counter = FakeUserCounter(redis_client=fake_redis_client, cache_ttl_seconds=10)
+        counter.value = 5
+
+        group_field = counter.get_cache_field(name="name", group_id=1)
+        other_group_field = counter.get_cache_field(name="name", group_id=2)
+
+        assert await counter.count(self.query, cache_field=group_field) == UserCount(value=5, estimated=False)
+        assert await counter.count(self.query, cache_field=group_field) == UserCount(value=5, estimated=False)
+        assert counter.database_counts == 1
+
+        await counter.count(self.query, cache_field=other_group_field)
+        assert counter.database_counts == 2
+        assert 0 < await fake_redis_client.ttl(counter.cache_key) <= 10
+
+    @pytest.mark.asyncio
+    async def test_invalidate(self, fake_redis_client):
+        counter = FakeUserCounter(redis_client=fake_redis_client)
+        cache_field = counter.get_cache_field()
+
+        counter.value = 1
+        await counter.count(self.query, cache_field=cache_field)
+        await counter.invalidate()
+        counter.value = 2
+
+        assert (await counter.count(self.query, cache_field=cache_field)).value == 2
+
+    @pytest.mark.asyncio
+    async def test_estimated_flag_is_cached(self, fake_redis_client):
+        counter = UserCounter(redis_client=fake_redis_client)
+        cache_field = counter.get_cache_field()
+
+        await counter.cache(cache_field, UserCount(value=1_000_000, estimated=True))
+
+        assert await counter.get_cached(cache_field) == UserCount(value=1_000_000, estimated=True)
+
+    def test_cache_field_depends_on_group_and_name(self):
+        fields = {
+            UserCounter.get_cache_field(),
+            UserCounter.get_cache_field(name="a"),
+            UserCounter.get_cache_field(group_id=1),
+            UserCounter.get_cache_field(name="a", group_id=1),
+        }
+
+        assert len(fields) == 4
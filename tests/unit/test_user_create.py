@@ -0,0 +1,28 @@
+import uuid
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from user_management.database.models import Group, User
+from user_management.managers.user_manager import UserManager
+
+
+class TestUserCreate:
+    manager = UserManager()
+
+    @pytest.mark.parametrize("column", [User.created_at, User.modified_at, Group.created_at])
+    def test_timestamps_are_set_by_database(self, column):
+        assert column.default is None
+        assert str(column.server_default.arg) == "now()"
+
+    def test_insert_returns_row(self):
+        user_data = {"user_id": uuid.uuid4(), "username": "user", "email": "user@example.com", "password": "hash"}
+
+        sql = str(self.manager.get_insert_query(user_data).compile(dialect=postgresql.dialect()))
+        values, returning = sql.split("RETURNING")
+
+        assert "created_at" not in values
+        assert "modified_at" not in values
+        assert '"user".created_at' in returning
+        assert '"user".modified_at' in returning
+        assert '"user".version' in returning
@@ -0,0 +1,31 @@
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects import postgresql
+
+from user_management.database.models import Group
+from user_management.managers.user_manager import UserManager
+
+
+def compile_query(query) -> str:
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+class TestUserLoading:
+    manager = UserManager()
+
+    def test_group_members_are_not_loaded_with_group(self):
+        sql = compile_query(select(Group))
+
+        assert inspect(Group).relationships["user"].lazy == "raise"
+        assert "JOIN" not in sql
+
+    def test_user_list_loads_read_model_columns(self):
+        sql = compile_query(self.manager.filter_user_list(self.manager.select_users(), group_id=1))
+
+        assert '"user".password' not in sql
+        assert sql.count("JOIN") == 1
+        assert 'JOIN "group"' in sql
+
+    def test_login_lookup_loads_password(self):
+        sql = compile_query(self.manager.get_login_query("user", "username"))
+
+        assert '"user".password' in sql
@@ -0,0 +1,22 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from user_management.managers.user_manager import UserManager
+
+
+class TestUserSearch:
+    manager = UserManager()
+
+    def test_like_wildcards_are_escaped(self):
+        assert self.manager.escape_like("50%_off/") == "50/%/_off//"
+
+    def test_search_query(self):
+        query = self.manager.filter_user_list(select(self.manager.model), group_id=1, search="john")
+        compiled = query.compile(dialect=postgresql.dialect())
+        sql = str(compiled)
+
+        for field in ("name", "surname", "username", "email"):
+            assert f'"user".{field} ILIKE' in sql
+            assert f'"user".{field} %' in sql
+        assert '"user".group_id =' in sql
+        assert "%john%" in compiled.params.values()
@@ -0,0 +1,88 @@
+import io
+import uuid
+from typing import Dict, List, Optional
+
+import pytest
+
+from user_management.api.users.services import UserService
+from user_management.api.utils.etag import format_etag, parse_if_match
+from user_management.api.utils.exceptions import PreconditionFailedHTTPException, VersionConflictError
+from user_management.database.models import User
+from user_management.managers.user_manager import UserManager
+
+
+class FakeUserManager(UserManager):
+    def __init__(self, version: int):
+        self.version = version
+
+    async def update_user(
+        self, user_id: uuid.UUID, user_data: Dict, expected_versions: Optional[List[int]] = None
+    ) -> Optional[User]:
+        if expected_versions is not None and self.version not in expected_versions:
+            raise VersionConflictError()
+
+        self.version += 1
+        return User(user_id=user_id, version=self.version, **user_data)
+
+    async def get_username(self, user_id: uuid.UUID) -> Optional[str]:
+        return "username"
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.keys: List[str] = []
+
+    async def create_bucket(self, **kwargs) -> None:
+        pass
+
+    async def upload_fileobj(self, file, bucket: str, key: str) -> None:
+        self.keys.append(key)
+
+
+class TestIfMatch:
+    @pytest.mark.parametrize(
+        "if_match, versions",
+        [
+            (None, None),
+            ("*", None),
+            (format_etag(3), [3]),
+            ('W/"3", "4"', [3, 4]),
+            ('"abc"', []),
+        ],
+    )
+    def test_parse_if_match(self, if_match: Optional[str], versions: Optional[List[int]]):
+        assert parse_if_match(if_match) == versions
+
+
+class TestUserUpdate:
+    @staticmethod
+    def create_service(version: int) -> UserService:
+        service = UserService()
+        service.manager = FakeUserManager(version=version)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_update_with_current_version(self):
+        service = self.create_service(version=2)
+
+        user = await service.update_user(uuid.uuid4(), {"name": "name"}, s3=None, if_match=format_etag(2))
+
+        assert user.version == 3
+
+    @pytest.mark.asyncio
+    async def test_update_with_stale_version(self):
+        service = self.create_service(version=2)
+
+        with pytest.raises(PreconditionFailedHTTPException):
+            await service.update_user(uuid.uuid4(), {"name": "name"}, s3=None, if_match=format_etag(1))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("user_data, key", [({"name": "name"}, "username"), ({"username": "new"}, "new")])
+    async def test_image_is_stored_under_username(self, user_data: Dict, key: str):
+        service = self.create_service(version=2)
+        s3 = FakeS3Client()
+
+        user = await service.update_user(uuid.uuid4(), user_data, s3=s3, file=io.BytesIO(b"image"))
+
+        assert s3.keys == [key]
+        assert user.image_s3_path.endswith(f"/{key}")
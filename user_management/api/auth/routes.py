@@ -1,21 +1,21 @@
 from typing import Annotated, Dict, Optional
 
 import aioboto3
-from fastapi import APIRouter, Body, Depends, File, HTTPException, UploadFile, status
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, File, HTTPException, UploadFile, status
 from fastapi.responses import JSONResponse
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 
 from user_management.api.auth.services import AuthService
 from user_management.api.auth.tokens import AuthToken
 from user_management.api.utils.dependencies import security
+from user_management.api.utils.routing import UnitOfWorkRoute
 from user_management.aws.settings import get_aws_s3_client
 
 from ...database.models import User
-from ...rabbit.settings import PikaClient
 from ..utils.exceptions import TokenError
 from .schemas import LoginModel, ResetPasswordConfirmModel, ResetPasswordModel, SignupModel, SignupResponseModel
 
-auth_router = APIRouter(prefix="/auth", tags=["Auth"])
+auth_router = APIRouter(prefix="/auth", tags=["Auth"], route_class=UnitOfWorkRoute)
 
 
 @auth_router.post("/login")
@@ -23,8 +23,11 @@ async def login(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     service: Annotated[AuthService, Depends(AuthService)],
     auth_token: Annotated[AuthToken, Depends(AuthToken)],
+    background_tasks: BackgroundTasks,
 ):
-    user = await service.authenticate(username=form_data.username, password=form_data.password)
+    user = await service.authenticate(
+        username=form_data.username, password=form_data.password, background_tasks=background_tasks
+    )
 
     group_id: Optional[int] = user.group_id if user.group_id else None
 
@@ -66,9 +69,8 @@ async def create_user(
 async def reset_password(
     service: Annotated[AuthService, Depends(AuthService)],
     request: Annotated[ResetPasswordModel, Body()],
-    rabbit_client: Annotated[PikaClient, Depends()],
 ):
-    response: Dict = await service.reset_password(email=request.email, rabbit_client=rabbit_client)
+    response: Dict = await service.reset_password(email=request.email)
 
     return response
 
@@ -1,10 +1,11 @@
 import secrets
 import uuid
-from typing import Dict, Optional
+from datetime import datetime, timedelta
+from typing import Annotated, Dict, Optional
 
 import aioboto3
 import sqlalchemy.exc
-from fastapi import HTTPException, UploadFile, status
+from fastapi import BackgroundTasks, Depends, HTTPException, UploadFile, status
 from fastapi.responses import JSONResponse
 from pydantic import EmailStr
 from redis.asyncio import Redis
@@ -16,26 +17,46 @@ from user_management.aws.service import AWSService
 from user_management.config import config
 from user_management.database.models.user import User
 from user_management.logger_settings import logger
+from user_management.managers.outbox_manager import OutboxManager
 from user_management.managers.user_manager import UserManager
-from user_management.rabbit.settings import PikaClient
 from user_management.redis_settings import get_redis_client
 
 
 class AuthService:
     manager = UserManager()
+    outbox_manager = OutboxManager()
     password_hasher = PasswordHasher()
     reset_password_token_hasher = ResetPasswordTokenHasher()
+    password_reset_token_key_prefix = "password_reset_token:"  # noqa: S105
+    password_reset_user_key_prefix = "password_reset_user:"  # noqa: S105
 
-    async def authenticate(self, username, password) -> User:
+    def __init__(self, redis_client: Annotated[Optional[Redis], Depends(get_redis_client)] = None):
+        self.redis_client: Redis = redis_client if redis_client is not None else get_redis_client()
+
+    async def authenticate(self, username, password, background_tasks: Optional[BackgroundTasks] = None) -> User:
         user = await self.manager.get_by_username(username)
-        if not user or not self.password_hasher.verify_password(password, user.password):
+        if not user or not await self.password_hasher.verify_password_async(password, user.password):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="invalid credentials")
 
         if user.is_blocked:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="user blocked")
 
+        if background_tasks is not None and self.password_hasher.needs_update(user.password):
+            background_tasks.add_task(
+                self.upgrade_password_hash, user_id=user.user_id, password=password, old_hash=user.password
+            )
+
         return user
 
+    async def upgrade_password_hash(self, user_id: uuid.UUID, password: str, old_hash: str) -> None:
+        """Re-hash the password with the current scheme and cost after a successful login."""
+        new_hash: str = await self.password_hasher.hash_password_async(password)
+
+        try:
+            await self.manager.replace_password_hash(user_id=user_id, old_hash=old_hash, new_hash=new_hash)
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            logger.error(e)
+
     async def signup(self, user: SignupModel, s3: aioboto3.Session.client, file: Optional[UploadFile] = None) -> User:
         aws_service: AWSService = AWSService(aws_client=s3)
         user_data = user.model_dump(exclude_none=True, exclude_unset=True)
@@ -55,50 +76,86 @@ class AuthService:
         return created_user
 
     @staticmethod
-    def generate_password_reset_token():
-        token: str = secrets.token_urlsafe(64)
+    def generate_password_reset_seed() -> str:
+        seed: str = secrets.token_urlsafe(32)
+        return seed
+
+    @classmethod
+    def generate_password_reset_token(cls, seed: Optional[str] = None) -> str:
+        token: str = cls.reset_password_token_hasher.derive_token(
+            seed if seed is not None else cls.generate_password_reset_seed()
+        )
         return token
 
     @staticmethod
     def generate_password_reset_url(token: str) -> str:
-        url: str = f"{config.WEBAPP_HOST}/password/reset/{token}"
-        return url
+        return OutboxManager.get_password_reset_url(token)
 
-    @staticmethod
-    async def add_password_reset_token_to_redis(token: str, user_id: uuid.UUID) -> None:
-        redis_client: Redis = await get_redis_client().__anext__()
+    @classmethod
+    def get_password_reset_token_key(cls, token_hash: str) -> str:
+        return f"{cls.password_reset_token_key_prefix}{token_hash}"
 
-        await redis_client.set(token, str(user_id))
+    @classmethod
+    def get_password_reset_user_key(cls, user_id: uuid.UUID) -> str:
+        return f"{cls.password_reset_user_key_prefix}{user_id}"
 
-    async def reset_password(self, email: EmailStr, rabbit_client: PikaClient) -> Dict:
-        user: Optional[User] = await self.manager.get_by_email(email=email)
-        if not user:
-            raise NotFoundHTTPException(detail="User not found")
+    async def add_password_reset_token_to_redis(self, token: str, user_id: uuid.UUID) -> None:
+        """Store the hash of the token with an expiry, invalidating the token previously issued to the user.
 
-        token: str = self.generate_password_reset_token()
+        The per-user key points to the user's current token, so the old one is found without a keyspace scan.
+        """
+        token_hash: str = self.reset_password_token_hasher.hash_token(token)
+        ttl: int = config.PASSWORD_RESET_TOKEN_TTL_MINUTES * 60
 
-        if user:
-            await self.add_password_reset_token_to_redis(token=token, user_id=user.user_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.set(self.get_password_reset_user_key(user_id), token_hash, ex=ttl, get=True)
+            pipe.set(self.get_password_reset_token_key(token_hash), str(user_id), ex=ttl)
+            previous_token_hash, _ = await pipe.execute()
 
-        reset_url: str = self.generate_password_reset_url(token=token)
+        if previous_token_hash is not None:
+            await self.redis_client.delete(self.get_password_reset_token_key(previous_token_hash.decode()))
 
-        rabbit_client.publish_message(queue_name=config.RABBITMQ_QUEUE, email=email, reset_url=reset_url)
+    async def consume_password_reset_token(self, token: str) -> Optional[uuid.UUID]:
+        """Atomically read and delete the token, so it can be used only once."""
+        token_hash: str = self.reset_password_token_hasher.hash_token(token)
+        user_id_bytes: Optional[bytes] = await self.redis_client.getdel(self.get_password_reset_token_key(token_hash))
 
-        return {"url": reset_url}
+        if not user_id_bytes:
+            return None
 
-    async def reset_password_confirm(self, token: str, password: str, password_retype: str) -> JSONResponse:
-        redis_client: Redis = await get_redis_client().__anext__()
+        return uuid.UUID(user_id_bytes.decode())
 
-        user_id_bytes: bytes = await redis_client.get(token)
+    async def reset_password(self, email: EmailStr) -> Dict:
+        user: Optional[User] = await self.manager.get_by_email(email=email)
+        if not user:
+            raise NotFoundHTTPException(detail="User not found")
 
-        if not user_id_bytes:
-            raise NotFoundHTTPException(detail="user not found")
+        seed: str = self.generate_password_reset_seed()
+        token: str = self.generate_password_reset_token(seed)
+        await self.add_password_reset_token_to_redis(token=token, user_id=user.user_id)
+
+        # the message is relayed to the broker from the outbox, so the request does not wait for it.
+        # The outbox keeps only the seed of the token, the url is built when the message is published
+        expires_at: datetime = datetime.now(tz=config.get_timezone()) + timedelta(
+            minutes=config.PASSWORD_RESET_TOKEN_TTL_MINUTES
+        )
+        await self.outbox_manager.add_message(
+            self.outbox_manager.create_password_reset_message(
+                email=email, user_id=user.user_id, token_seed=seed, expires_at=expires_at
+            )
+        )
 
-        user_id: uuid.UUID = uuid.UUID(user_id_bytes.decode())
+        return {"url": self.generate_password_reset_url(token=token)}
 
+    async def reset_password_confirm(self, token: str, password: str, password_retype: str) -> JSONResponse:
         if password != password_retype:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Passwords do not match")
 
+        user_id: Optional[uuid.UUID] = await self.consume_password_reset_token(token)
+
+        if not user_id:
+            raise NotFoundHTTPException(detail="user not found")
+
         await self.manager.update_user(user_id=user_id, user_data={"password": password})
 
         return JSONResponse(status_code=status.HTTP_200_OK, content={"detail": "password changed successfully"})
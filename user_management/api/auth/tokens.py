@@ -1,20 +1,31 @@
 import datetime
+import hashlib
+import time
 import uuid
-from typing import Dict, Optional, Tuple, Union
+from typing import Annotated, Dict, Optional, Tuple, Union
 
 import jwt
 import redis.exceptions
 from fakeredis.aioredis import FakeRedis
+from fastapi import Depends
 from redis.asyncio import Redis
 
 from user_management.api.utils.exceptions import TokenError
 from user_management.redis_settings import get_redis_client
+from user_management.tracing import tracer
 
 from ...config import config
 from ...logger_settings import logger
 
 
 class AuthToken:
+    revoked_token_key_prefix = "revoked_token:"  # noqa: S105
+    revoked_family_key_prefix = "revoked_token_family:"
+    legacy_blacklist_key = "token_blacklist"
+
+    def __init__(self, redis_client: Annotated[Optional[Redis], Depends(get_redis_client)] = None):
+        self.redis_client: Redis = redis_client if redis_client is not None else get_redis_client()
+
     @staticmethod
     def get_access_token_expiration_time() -> datetime:
         return datetime.datetime.now(tz=config.get_timezone()) + datetime.timedelta(
@@ -27,15 +38,22 @@ class AuthToken:
 
     @staticmethod
     def _create_token(
-        jwt_type: str, user_id: uuid.UUID, role_name: str, group_id: int, expiration_time: datetime = None
+        jwt_type: str,
+        user_id: uuid.UUID,
+        role_name: str,
+        group_id: int,
+        expiration_time: datetime = None,
+        family_id: Optional[str] = None,
     ) -> str:
         if jwt_type not in ("access", "refresh"):
             raise TypeError("wrong type of token")
 
         headers = {"jwt_type": jwt_type}
-        payload = {"user_id": str(user_id), "role_name": role_name, "group_id": group_id}
+        payload = {"user_id": str(user_id), "role_name": role_name, "group_id": group_id, "jti": uuid.uuid4().hex}
         if expiration_time is not None:
             payload.update({"exp": expiration_time})
+        if family_id is not None:
+            payload.update({"fam": family_id})
 
         jwt_token = jwt.encode(
             headers=headers,
@@ -46,7 +64,10 @@ class AuthToken:
 
         return jwt_token
 
-    def create_token_pair(self, user_id: uuid.UUID, role_name: str, group_id: Optional[int] = None) -> Tuple:
+    def create_token_pair(
+        self, user_id: uuid.UUID, role_name: str, group_id: Optional[int] = None, family_id: Optional[str] = None
+    ) -> Tuple:
+        """Create an access and a refresh token. The refresh token starts a new family unless 'family_id' is given."""
         access_token = self._create_token(
             jwt_type="access",
             user_id=user_id,
@@ -60,6 +81,7 @@ class AuthToken:
             role_name=role_name,
             group_id=group_id,
             expiration_time=self.get_refresh_token_expiration_time(),
+            family_id=family_id if family_id is not None else uuid.uuid4().hex,
         )
 
         return access_token, refresh_token
@@ -73,11 +95,53 @@ class AuthToken:
         return None
 
     @staticmethod
-    async def add_token_to_blacklist(token: str, redis_client=None) -> None:
+    def get_token_id(payload: Dict, token: str) -> str:
+        """Return the 'jti' claim of the token or, for tokens issued without one, a digest of the token itself."""
+        token_id: Optional[str] = payload.get("jti")
+        if token_id is None:
+            token_id = hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+        return token_id
+
+    @staticmethod
+    def get_token_remaining_ttl(payload: Dict) -> int:
+        """Return the number of seconds the token stays valid. Tokens without 'exp' get the refresh token lifetime."""
+        expiration_timestamp: Optional[int] = payload.get("exp")
+        if expiration_timestamp is None:
+            return int(datetime.timedelta(days=config.REFRESH_TOKEN_TTL_DAYS).total_seconds())
+
+        return max(int(expiration_timestamp - time.time()), 0)
+
+    @classmethod
+    def get_token_family_id(cls, payload: Dict, token: str) -> str:
+        """Return the 'fam' claim. A refresh token issued before families were introduced is a family of its own."""
+        family_id: Optional[str] = payload.get("fam")
+        if family_id is None:
+            family_id = cls.get_token_id(payload, token)
+
+        return family_id
+
+    @classmethod
+    def get_revoked_token_key(cls, token_id: str) -> str:
+        return f"{cls.revoked_token_key_prefix}{token_id}"
+
+    @classmethod
+    def get_revoked_family_key(cls, family_id: str) -> str:
+        return f"{cls.revoked_family_key_prefix}{family_id}"
+
+    async def add_token_to_blacklist(self, token: str, redis_client: Optional[Union[Redis, FakeRedis]] = None) -> None:
         if redis_client is None:
-            redis_client = await get_redis_client().__anext__()
+            redis_client = self.redis_client
+
+        payload: Dict = jwt.decode(token, options={"verify_signature": False})
+        ttl: int = self.get_token_remaining_ttl(payload)
+
+        if ttl == 0:
+            return None
+
         try:
-            await redis_client.sadd("token_blacklist", token)
+            with tracer.span("redis.add_token_to_blacklist"):
+                await redis_client.set(self.get_revoked_token_key(self.get_token_id(payload, token)), 1, ex=ttl)
 
         except redis.exceptions.ConnectionError as e:
             logger.error(e)
@@ -85,15 +149,23 @@ class AuthToken:
 
         return None
 
-    @staticmethod
-    async def check_token_blacklisted(token: str, redis_client: Optional[Union[Redis, FakeRedis]] = None) -> None:
+    async def check_token_blacklisted(self, token: str, redis_client: Optional[Union[Redis, FakeRedis]] = None) -> None:
         if redis_client is None:
-            redis_client = await get_redis_client().__anext__()
+            redis_client = self.redis_client
+
+        payload: Dict = jwt.decode(token, options={"verify_signature": False})
 
         try:
-            tokens = await redis_client.smembers("token_blacklist")
-            if bytes(token, encoding="utf-8") in tokens:
-                raise TokenError("token in blacklist")
+            with tracer.span("redis.check_token_blacklisted", expected_errors=(TokenError,)):
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    pipe.exists(self.get_revoked_token_key(self.get_token_id(payload, token)))
+                    pipe.exists(self.get_revoked_family_key(self.get_token_family_id(payload, token)))
+                    if "jti" not in payload:
+                        # tokens issued before 'jti' was introduced may still be in the legacy set
+                        pipe.sismember(self.legacy_blacklist_key, token)
+
+                    if any(await pipe.execute()):
+                        raise TokenError("token in blacklist")
 
         except redis.exceptions.ConnectionError as e:
             logger.error(e)
@@ -101,7 +173,85 @@ class AuthToken:
 
         return None
 
-    async def verify_token(self, token: str, jwt_type: str) -> Dict:
+    @classmethod
+    async def migrate_legacy_blacklist(cls, redis_client: Union[Redis, FakeRedis], batch_size: int = 1000) -> int:
+        """Move tokens from the legacy 'token_blacklist' set to per-token keys with a TTL, then drop the set.
+
+        Already expired tokens are discarded. Returns the number of tokens moved to the new store.
+        """
+        migrated_count: int = 0
+        cursor: int = 0
+
+        while True:
+            cursor, tokens = await redis_client.sscan(cls.legacy_blacklist_key, cursor=cursor, count=batch_size)
+
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for raw_token in tokens:
+                    token: str = raw_token.decode("utf-8")
+                    try:
+                        payload: Dict = jwt.decode(token, options={"verify_signature": False})
+                    except jwt.exceptions.DecodeError:
+                        continue
+
+                    ttl: int = cls.get_token_remaining_ttl(payload)
+                    if ttl > 0:
+                        pipe.set(cls.get_revoked_token_key(cls.get_token_id(payload, token)), 1, ex=ttl)
+                        migrated_count += 1
+
+                await pipe.execute()
+
+            if cursor == 0:
+                break
+
+        await redis_client.delete(cls.legacy_blacklist_key)
+
+        return migrated_count
+
+    async def rotate_refresh_token(self, token: str, payload: Dict) -> None:
+        """Revoke the refresh token in one transaction, failing if it was already revoked.
+
+        Presenting a refresh token which has already been rotated means it leaked, so its whole family is revoked
+        by a second command. The token is refused even if that command fails.
+        """
+        token_id: str = self.get_token_id(payload, token)
+        family_id: str = self.get_token_family_id(payload, token)
+        ttl: int = self.get_token_remaining_ttl(payload)
+
+        try:
+            with tracer.span("redis.rotate_refresh_token"):
+                async with self.redis_client.pipeline(transaction=True) as pipe:
+                    pipe.set(self.get_revoked_token_key(token_id), 1, ex=max(ttl, 1), nx=True)
+                    pipe.exists(self.get_revoked_family_key(family_id))
+                    if "jti" not in payload:
+                        pipe.sismember(self.legacy_blacklist_key, token)
+
+                    is_first_use, *revoked = await pipe.execute()
+
+        except redis.exceptions.ConnectionError as e:
+            logger.error(e)
+            return None
+
+        if not is_first_use:
+            await self.revoke_token_family(family_id)
+
+        if not is_first_use or any(revoked):
+            raise TokenError("token in blacklist")
+
+        return None
+
+    async def revoke_token_family(self, family_id: str) -> None:
+        try:
+            with tracer.span("redis.revoke_token_family"):
+                await self.redis_client.set(
+                    self.get_revoked_family_key(family_id),
+                    1,
+                    ex=int(datetime.timedelta(days=config.REFRESH_TOKEN_TTL_DAYS).total_seconds()),
+                )
+
+        except redis.exceptions.ConnectionError as e:
+            logger.error(e)
+
+    def decode_token(self, token: str, jwt_type: str) -> Dict:
         try:
             verified_token = jwt.decode(token, key=config.SECRET_KEY, algorithms=[config.TOKEN_HASH_ALGORITHM])
 
@@ -116,19 +266,26 @@ class AuthToken:
 
         self.check_token_type(token=token, jwt_type=jwt_type)
 
+        return verified_token
+
+    async def verify_token(self, token: str, jwt_type: str) -> Dict:
+        verified_token = self.decode_token(token=token, jwt_type=jwt_type)
+
         if jwt_type == "refresh":
             await self.check_token_blacklisted(token)
 
         return verified_token
 
     async def refresh_token(self, refresh_token: str) -> Tuple:
-        verified_token = await self.verify_token(refresh_token, jwt_type="refresh")
+        verified_token = self.decode_token(refresh_token, jwt_type="refresh")
+
+        await self.rotate_refresh_token(token=refresh_token, payload=verified_token)
+
         new_token_pair = self.create_token_pair(
             user_id=verified_token["user_id"],
             role_name=verified_token["role_name"],
             group_id=verified_token["group_id"],
+            family_id=self.get_token_family_id(verified_token, refresh_token),
         )
 
-        await self.add_token_to_blacklist(refresh_token)
-
         return new_token_pair
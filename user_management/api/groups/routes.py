@@ -0,0 +1,39 @@
+from typing import Annotated, Dict, Optional
+
+from fastapi import APIRouter, Depends, Path, Query, status
+
+from user_management.api.utils.dependencies import admin_or_moderator
+from user_management.api.utils.principal_cache import Principal
+from user_management.api.utils.routing import UnitOfWorkRoute
+
+from ..users.schemas import UserCursorListReadModel
+from .services import GroupService
+
+group_router: APIRouter = APIRouter(prefix="/group", tags=["Group"], route_class=UnitOfWorkRoute)
+
+
+@group_router.get("/{group_id}/users", response_model=UserCursorListReadModel, status_code=status.HTTP_200_OK)
+async def group_users(
+    group_id: Annotated[int, Path()],
+    service: Annotated[GroupService, Depends(GroupService)],
+    authorized_user: Annotated[Principal, Depends(admin_or_moderator)],
+    limit: int = Query(ge=1, default=50),
+    sort_by: str = Query(default="username"),
+    order_by: str = Query(default="asc"),
+    cursor: Optional[str] = Query(default=None),
+):
+    """Endpoint '/group/{group_id}/users'
+
+    Members of a group, a page at a time. Pass 'next_cursor' back as 'cursor' for the next page.
+    Moderators can only read the members of their own group.
+    """
+    response: Dict = await service.read_group_users(
+        group_id=group_id,
+        authorized_user=authorized_user,
+        limit=limit,
+        sort_field=sort_by,
+        ord_direction=order_by,
+        cursor=cursor,
+    )
+
+    return response
@@ -0,0 +1,40 @@
+from typing import Dict, Optional
+
+from user_management.api.users.services import UserService
+from user_management.api.utils.exceptions import BadRequestHTTPException, NotFoundHTTPException, PermissionHTTPException
+from user_management.api.utils.principal_cache import Principal
+from user_management.database.models import Group
+from user_management.managers.group_manager import GroupManager
+
+
+class GroupService:
+    manager = GroupManager()
+    user_service = UserService()
+
+    async def read_group_users(
+        self,
+        group_id: int,
+        authorized_user: Principal,
+        limit: int = 50,
+        sort_field: str = "username",
+        ord_direction: str = "asc",
+        cursor: Optional[str] = None,
+    ) -> Dict:
+        scope_group_id: Optional[int] = self.user_service.get_scope_group_id(authorized_user)
+        if scope_group_id is not None and scope_group_id != group_id:
+            raise PermissionHTTPException()
+
+        if sort_field not in self.user_service.manager.sort_keys:
+            raise BadRequestHTTPException(detail=f"unable to sort by '{sort_field}'")
+
+        group: Optional[Group] = await self.manager.get_by_id(group_id)
+        if group is None:
+            raise NotFoundHTTPException(detail="group not found")
+
+        return await self.user_service.read_user_list_page_after(
+            limit=limit,
+            sort_field=sort_field,
+            ord_direction="desc" if ord_direction == "desc" else "asc",
+            cursor=cursor,
+            group_id=group_id,
+        )
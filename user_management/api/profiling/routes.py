@@ -0,0 +1,42 @@
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Path, Response, status
+
+from user_management.api.utils.dependencies import admin_user
+from user_management.api.utils.exceptions import NotFoundHTTPException
+from user_management.api.utils.principal_cache import Principal
+from user_management.api.utils.profiling import PROFILE_HEADER, create_profiling_token, profile_store
+from user_management.api.utils.routing import UnitOfWorkRoute
+
+from .schemas import ProfilingTokenModel
+
+profiling_router: APIRouter = APIRouter(prefix="/um/profiles", tags=["Profiling"], route_class=UnitOfWorkRoute)
+
+
+@profiling_router.post("/token", response_model=ProfilingTokenModel, status_code=status.HTTP_200_OK)
+async def profiling_token(principal: Annotated[Principal, Depends(admin_user)]):
+    """Endpoint '/um/profiles/token'
+
+    A token to send in the X-Profile header of the requests to profile. The response of a profiled request
+    has the id of its profile in the X-Profile-Id header, or the reason it was not profiled in X-Profile-Status.
+    """
+    token, expires_at = create_profiling_token(principal.user_id)
+
+    return {"header": PROFILE_HEADER, "token": token, "expires_at": expires_at}
+
+
+@profiling_router.get("/{profile_id}", dependencies=[Depends(admin_user)], status_code=status.HTTP_200_OK)
+async def download_profile(profile_id: Annotated[str, Path(pattern=r"^[0-9a-f]{32}$")]):
+    """Endpoint '/um/profiles/{profile_id}'
+
+    The profile as a file for pstats.Stats or a viewer like snakeviz.
+    """
+    profile: Optional[bytes] = await profile_store.load(profile_id)
+    if profile is None:
+        raise NotFoundHTTPException(detail="profile not found")
+
+    return Response(
+        content=profile,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'},
+    )
@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class ProfilingTokenModel(BaseModel):
+    header: str
+    token: str
+    expires_at: int
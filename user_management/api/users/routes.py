@@ -1,41 +1,60 @@
 import uuid
-from typing import Annotated, Dict, Optional
+from typing import Annotated, Dict, Literal, Optional, Union
 
 import aioboto3
-from fastapi import APIRouter, Depends, File, Path, Query, UploadFile, status
+from fastapi import APIRouter, Depends, File, Header, Path, Query, Response, UploadFile, status
 
 from user_management.api.utils.dependencies import admin_or_moderator, admin_user, authenticated_user
+from user_management.api.utils.etag import format_etag
+from user_management.api.utils.principal_cache import Principal
+from user_management.api.utils.routing import UnitOfWorkRoute
 from user_management.database.models import User
 
 from ...aws.settings import get_aws_s3_client
-from .schemas import CurrentUserUpdateModel, UserListReadModel, UserReadModel, UserUpdateModel
+from .schemas import CurrentUserUpdateModel, UserCursorListReadModel, UserListReadModel, UserReadModel, UserUpdateModel
 from .services import UserService
 
-user_router: APIRouter = APIRouter(prefix="/user", tags=["User"])
+user_router: APIRouter = APIRouter(prefix="/user", tags=["User"], route_class=UnitOfWorkRoute)
 
 
 @user_router.get("/me", response_model=UserReadModel, status_code=status.HTTP_200_OK)
-async def me(user: Annotated[User, Depends(authenticated_user)]):
+async def me(
+    principal: Annotated[Principal, Depends(authenticated_user)],
+    service: Annotated[UserService, Depends(UserService)],
+    response: Response,
+):
+    user: User = await service.read_current_user(user_id=principal.user_id)
+    response.headers["ETag"] = format_etag(user.version)
+
     return user
 
 
 @user_router.patch("/me", response_model=UserReadModel, status_code=status.HTTP_200_OK)
 async def update_me(
-    user: Annotated[User, Depends(authenticated_user)],
+    user: Annotated[Principal, Depends(authenticated_user)],
     service: Annotated[UserService, Depends(UserService)],
     s3: Annotated[aioboto3.Session.client, Depends(get_aws_s3_client)],
     data: Annotated[CurrentUserUpdateModel, Depends(CurrentUserUpdateModel.as_form)],
+    response: Response,
     file: UploadFile = File(default=None),
+    if_match: Optional[str] = Header(default=None),
 ):
+    """Endpoint '/user/me'
+
+    With an 'If-Match' header holding the ETag of a previous read, the update fails with 412 if the user has been
+    modified since.
+    """
     updated_user: User = await service.update_user(
-        user_id=user.user_id, file=file, user_data=data.model_dump(exclude_none=True), s3=s3
+        user_id=user.user_id, file=file, user_data=data.model_dump(exclude_none=True), s3=s3, if_match=if_match
     )
+    response.headers["ETag"] = format_etag(updated_user.version)
+
     return updated_user
 
 
 @user_router.delete("/me", status_code=status.HTTP_200_OK)
 async def delete_me(
-    user: Annotated[User, Depends(authenticated_user)], service: Annotated[UserService, Depends(UserService)]
+    user: Annotated[Principal, Depends(authenticated_user)], service: Annotated[UserService, Depends(UserService)]
 ):
     deleted_user_id: uuid.UUID = await service.delete_user(user_id=user.user_id)
     return {"user_id": deleted_user_id}
@@ -45,9 +64,11 @@ async def delete_me(
 async def one_user(
     user_id: Annotated[uuid.UUID, Path()],
     service: Annotated[UserService, Depends(UserService)],
-    authorized_user: Annotated[User, Depends(admin_or_moderator)],
+    authorized_user: Annotated[Principal, Depends(admin_or_moderator)],
+    response: Response,
 ):
     user: User = await service.read_one_user(user_id=user_id, authorized_user=authorized_user)
+    response.headers["ETag"] = format_etag(user.version)
 
     return user
 
@@ -60,11 +81,18 @@ async def update_one_user(
     service: Annotated[UserService, Depends(UserService)],
     s3: Annotated[aioboto3.Session.client, Depends(get_aws_s3_client)],
     data: Annotated[UserUpdateModel, Depends(UserUpdateModel.as_form)],
+    response: Response,
     file: UploadFile = File(default=None),
+    if_match: Optional[str] = Header(default=None),
 ):
+    """Endpoint '/user/{user_id}'
+
+    Concurrent edits are detected like on '/user/me': pass the ETag of the read as 'If-Match'.
+    """
     user: User = await service.update_user(
-        user_id=user_id, file=file, user_data=data.model_dump(exclude_none=True), s3=s3
+        user_id=user_id, file=file, user_data=data.model_dump(exclude_none=True), s3=s3, if_match=if_match
     )
+    response.headers["ETag"] = format_etag(user.version)
 
     return user
 
@@ -79,23 +107,33 @@ async def delete_one_user(
     return {"user_id": deleted_user_id}
 
 
-@user_router.get("s", response_model=UserListReadModel, status_code=status.HTTP_200_OK)
+@user_router.get("s", response_model=Union[UserListReadModel, UserCursorListReadModel], status_code=status.HTTP_200_OK)
 async def user_list(
     service: Annotated[UserService, Depends(UserService)],
-    authorized_user: Annotated[User, Depends(admin_or_moderator)],
+    authorized_user: Annotated[Principal, Depends(admin_or_moderator)],
     page: int = Query(ge=1, default=1),
     limit: int = Query(ge=1, default=50),
     sort_by: str = Query(default="username"),
     filter_by_name: Optional[str] = Query(default=None),
     order_by: str = Query(default="asc"),
+    pagination: Literal["offset", "cursor"] = Query(default="offset"),
+    cursor: Optional[str] = Query(default=None),
+    search: Optional[str] = Query(default=None, min_length=1),
 ):
-    """Endpoint '/users'"""
+    """Endpoint '/users'
+
+    With 'pagination=cursor' the response has no page count, pass 'next_cursor' back as 'cursor' for the next page.
+    'search' matches name, surname, username and email, and orders the users by similarity instead of 'sort_by'.
+    """
     response: Dict = await service.read_user_list(
         page=page,
         limit=limit,
         sort_field=sort_by,
         name=filter_by_name,
         ord_direction=order_by,
+        pagination=pagination,
+        cursor=cursor,
+        search=search,
         authorized_user=authorized_user,
     )
 
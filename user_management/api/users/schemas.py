@@ -24,6 +24,7 @@ class UserReadModel(BaseModel):
     is_blocked: bool
     created_at: datetime
     modified_at: datetime
+    version: int
     role: str
     group: Optional[GroupModel]
 
@@ -33,6 +34,13 @@ class UserListReadModel(BaseModel):
     limit: int
     total_pages: int
     total_count: int
+    total_count_estimated: bool = False
+    users: List[UserReadModel]
+
+
+class UserCursorListReadModel(BaseModel):
+    limit: int
+    next_cursor: Optional[str]
     users: List[UserReadModel]
 
 
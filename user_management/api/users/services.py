@@ -1,15 +1,22 @@
 import uuid
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 import aioboto3
 import sqlalchemy.exc
 from fastapi import UploadFile
 
+from user_management.api.utils.etag import parse_if_match
 from user_management.api.utils.exceptions import (
     AlreadyExistsHTTPException,
+    BadRequestHTTPException,
+    CursorError,
     NotFoundHTTPException,
     PermissionHTTPException,
+    PreconditionFailedHTTPException,
+    VersionConflictError,
 )
+from user_management.api.utils.pagination import Cursor, decode_cursor, encode_cursor
+from user_management.api.utils.principal_cache import Principal
 from user_management.aws.service import AWSService
 from user_management.database.models import User
 from user_management.managers.user_manager import UserManager
@@ -18,13 +25,23 @@ from user_management.managers.user_manager import UserManager
 class UserService:
     manager = UserManager()
 
-    async def read_one_user(self, user_id: uuid.UUID, authorized_user: User) -> User:
+    @staticmethod
+    def get_scope_group_id(authorized_user: Principal) -> Optional[int]:
+        """The group whose members a moderator is limited to. Moderators without a group are not limited."""
+        return authorized_user.group_id if authorized_user.role == "MODERATOR" else None
+
+    async def read_current_user(self, user_id: uuid.UUID) -> User:
+        user: Optional[User] = await self.manager.get_by_id(user_id)
+
+        if not user:
+            raise NotFoundHTTPException()
+
+        return user
+
+    async def read_one_user(self, user_id: uuid.UUID, authorized_user: Principal) -> User:
         user: User = await self.manager.get_by_id(user_id)
-        if (
-            authorized_user.role == "MODERATOR"
-            and authorized_user.group_id is not None
-            and authorized_user.group_id != user.group_id
-        ):
+        scope_group_id: Optional[int] = self.get_scope_group_id(authorized_user)
+        if user and scope_group_id is not None and scope_group_id != user.group_id:
             raise PermissionHTTPException()
 
         if not user:
@@ -33,23 +50,36 @@ class UserService:
         return user
 
     async def update_user(
-        self, user_id: uuid.UUID, user_data: Dict, s3: aioboto3.Session.client, file: Optional[UploadFile] = None
+        self,
+        user_id: uuid.UUID,
+        user_data: Dict,
+        s3: aioboto3.Session.client,
+        file: Optional[UploadFile] = None,
+        if_match: Optional[str] = None,
     ) -> User:
         if file:
             aws_service: AWSService = AWSService(aws_client=s3)
-            user: User = await self.manager.get_by_id(user_id)
-            key: str = user_data["username"] if "username" in user_data else user.username
+            # images are stored under the username, as at signup
+            key: Optional[str] = user_data.get("username") or await self.manager.get_username(user_id)
+            if key is None:
+                raise NotFoundHTTPException()
+
             image_s3_path: str = await aws_service.upload_image(key=key, file=file)
             user_data["image_s3_path"] = image_s3_path
 
         try:
-            updated_user: User = await self.manager.update_user(user_id=user_id, user_data=user_data)
+            updated_user: User = await self.manager.update_user(
+                user_id=user_id, user_data=user_data, expected_versions=parse_if_match(if_match)
+            )
 
         except sqlalchemy.exc.IntegrityError:
             raise AlreadyExistsHTTPException(
                 detail="user with such credentials already exists",
             )
 
+        except VersionConflictError:
+            raise PreconditionFailedHTTPException(detail="user has been modified, read it again before updating")
+
         if not updated_user:
             raise NotFoundHTTPException()
 
@@ -62,19 +92,40 @@ class UserService:
 
     async def read_user_list(
         self,
-        authorized_user: User,
+        authorized_user: Principal,
         page: int = 1,
         limit: int = 50,
         name: Optional[str] = None,
         sort_field: Optional[str] = None,
         ord_direction: str = "asc",
+        pagination: str = "offset",
+        cursor: Optional[str] = None,
+        search: Optional[str] = None,
     ):
-        offset: int = (page - 1) * limit
-
-        moderator: Optional[User] = authorized_user if authorized_user.role == "MODERATOR" else None
+        # keyset pagination needs an index on the sort key, so it is limited to the fields of 'sort_keys'
+        keyset: bool = pagination == "cursor" or cursor is not None
+        if sort_field is not None and (
+            sort_field not in self.manager.sort_keys if keyset else self.manager.get_sort_key(sort_field) is None
+        ):
+            raise BadRequestHTTPException(detail=f"unable to sort by '{sort_field}'")
+
+        # moderators only see the members of their group
+        group_id: Optional[int] = self.get_scope_group_id(authorized_user)
+
+        if keyset:
+            if search:
+                raise BadRequestHTTPException(detail="search results are ranked and can only be paginated by page")
+
+            return await self.read_user_list_page_after(
+                limit=limit,
+                name=name,
+                sort_field=sort_field or "username",
+                ord_direction="desc" if ord_direction == "desc" else "asc",
+                cursor=cursor,
+                group_id=group_id,
+            )
 
-        if moderator and moderator.group_id is None:
-            moderator = None
+        offset: int = (page - 1) * limit
 
         result: Dict = await self.manager.get_all(
             limit=limit,
@@ -82,14 +133,53 @@ class UserService:
             name=name,
             sort_field=sort_field,
             ord_direction=ord_direction,
-            moderator=moderator,
+            group_id=group_id,
+            search=search,
         )
 
         total_pages: int = (result["total_count"] + limit - 1) // limit
 
-        if page > total_pages:
+        # an estimated count may be too low, so a page past it is only missing if it is empty
+        if page > total_pages and not (result["total_count_estimated"] and result["users"]):
             raise NotFoundHTTPException(detail="page not found")
 
         result.update({"page": page, "limit": limit, "total_pages": total_pages})
 
         return result
+
+    async def read_user_list_page_after(
+        self,
+        limit: int,
+        sort_field: str,
+        ord_direction: str,
+        cursor: Optional[str] = None,
+        name: Optional[str] = None,
+        group_id: Optional[int] = None,
+    ) -> Dict:
+        """Keyset pagination: no total count is computed and the cursor encodes the position of the previous page."""
+        after: Optional[Tuple] = None
+
+        if cursor is not None:
+            try:
+                value_type: type = self.manager.get_sort_key(sort_field).type.python_type
+                decoded_cursor: Cursor = decode_cursor(cursor, value_type=value_type)
+            except CursorError as e:
+                raise BadRequestHTTPException(detail=str(e))
+
+            if (decoded_cursor.sort_field, decoded_cursor.ord_direction) != (sort_field, ord_direction):
+                raise BadRequestHTTPException(detail="cursor does not match sort_by and order_by")
+
+            after = (decoded_cursor.value, decoded_cursor.user_id)
+
+        result: Dict = await self.manager.get_page_after(
+            limit=limit, sort_field=sort_field, ord_direction=ord_direction, after=after, name=name, group_id=group_id
+        )
+
+        next_cursor: Optional[str] = None
+        if result["next"] is not None:
+            value, user_id = result["next"]
+            next_cursor = encode_cursor(
+                Cursor(sort_field=sort_field, ord_direction=ord_direction, value=value, user_id=user_id)
+            )
+
+        return {"limit": limit, "next_cursor": next_cursor, "users": result["users"]}
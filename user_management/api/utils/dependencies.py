@@ -1,29 +1,35 @@
-from typing import Annotated
+import secrets
+import uuid
+from typing import Annotated, Optional
 
 from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.security.oauth2 import OAuth2PasswordBearer
 
 from user_management.api.auth.tokens import AuthToken
 from user_management.api.utils.exceptions import PermissionHTTPException, TokenError
-from user_management.database.models import User
+from user_management.api.utils.principal_cache import Principal
+from user_management.config import config
+from user_management.database.unit_of_work import set_request_user
 from user_management.managers.user_manager import UserManager
 
 security = OAuth2PasswordBearer(tokenUrl="auth/login")
+metrics_security = HTTPBearer(auto_error=False)
 
 
 async def authenticated_user(
     access_token: Annotated[str, Depends(security)],
     user_manager: Annotated[UserManager, Depends(UserManager)],
     token_service: Annotated[AuthToken, Depends(AuthToken)],
-) -> User:
+) -> Principal:
     try:
         verified_token = await token_service.verify_token(token=access_token, jwt_type="access")
     except TokenError as e:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
 
-    user_id = verified_token["user_id"]
+    user_id = uuid.UUID(verified_token["user_id"])
 
-    user: User = await user_manager.get_by_id(user_id=user_id)
+    user: Principal = await user_manager.get_principal(user_id=user_id)
 
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="user does not exists")
@@ -31,6 +37,8 @@ async def authenticated_user(
     if user.is_blocked:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="user is blocked")
 
+    set_request_user(user.user_id)
+
     return user
 
 
@@ -38,8 +46,8 @@ async def admin_user(
     access_token: Annotated[str, Depends(security)],
     user_manager: Annotated[UserManager, Depends(UserManager)],
     token_service: Annotated[AuthToken, Depends(AuthToken)],
-):
-    user: User = await authenticated_user(
+) -> Principal:
+    user: Principal = await authenticated_user(
         access_token=access_token, user_manager=user_manager, token_service=token_service
     )
 
@@ -53,8 +61,8 @@ async def admin_or_moderator(
     access_token: Annotated[str, Depends(security)],
     user_manager: Annotated[UserManager, Depends(UserManager)],
     token_service: Annotated[AuthToken, Depends(AuthToken)],
-) -> User:
-    user: User = await authenticated_user(
+) -> Principal:
+    user: Principal = await authenticated_user(
         access_token=access_token, user_manager=user_manager, token_service=token_service
     )
 
@@ -62,3 +70,14 @@ async def admin_or_moderator(
         raise PermissionHTTPException()
 
     return user
+
+
+async def metrics_scraper(
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(metrics_security)],
+) -> None:
+    """Require the METRICS_TOKEN as a bearer token, if it is set. Scrapers can not log in to get an access token."""
+    if not config.METRICS_TOKEN:
+        return
+
+    if credentials is None or not secrets.compare_digest(credentials.credentials, config.METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="invalid metrics token")
@@ -0,0 +1,22 @@
+from typing import List, Optional
+
+
+def format_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[List[int]]:
+    """Return the versions listed in an If-Match header, or None if any version matches.
+
+    Weak tags are compared like strong ones, tags which are not user versions can never match.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    versions: List[int] = []
+    for tag in if_match.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if tag.isdigit():
+            versions.append(int(tag))
+
+    return versions
@@ -33,5 +33,33 @@ class AlreadyExistsHTTPException(HTTPException):
         super().__init__(status_code=status_code, detail=detail, headers=headers)
 
 
+class BadRequestHTTPException(HTTPException):
+    def __init__(
+        self,
+        status_code: int = status.HTTP_400_BAD_REQUEST,
+        detail: Any = "bad request",
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+
+
+class PreconditionFailedHTTPException(HTTPException):
+    def __init__(
+        self,
+        status_code: int = status.HTTP_412_PRECONDITION_FAILED,
+        detail: Any = "precondition failed",
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
+
+
 class TokenError(Exception):
     pass
+
+
+class CursorError(Exception):
+    pass
+
+
+class VersionConflictError(Exception):
+    pass
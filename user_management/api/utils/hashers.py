@@ -1,10 +1,152 @@
+import asyncio
+import base64
+import functools
 import hashlib
+import hmac
+import statistics
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from passlib.context import CryptContext
 
+from user_management.config import config
+from user_management.metrics.instruments import password_hashing_duration, password_hashing_queue_depth
+
+
+def create_password_context(schemes: List[str], bcrypt_rounds: int) -> CryptContext:
+    """Create a context which hashes with the first scheme and marks hashes of other schemes or costs for upgrade."""
+    settings: Dict = {"schemes": schemes, "deprecated": "auto"}
+    if "bcrypt" in schemes:
+        settings["bcrypt__rounds"] = bcrypt_rounds
+
+    return CryptContext(**settings)
+
+
+def measure_bcrypt_hash_time(rounds: int, samples: int = 3) -> float:
+    """Return the median time in seconds to hash a password with the given bcrypt cost on this host."""
+    context: CryptContext = create_password_context(schemes=["bcrypt"], bcrypt_rounds=rounds)
+    context.hash("warm-up password")
+    timings: List[float] = []
+
+    for _ in range(samples):
+        started_at: float = time.perf_counter()
+        context.hash("calibration password")
+        timings.append(time.perf_counter() - started_at)
+
+    return statistics.median(timings)
+
+
+def recommend_bcrypt_rounds(
+    target_seconds: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3
+) -> Tuple[int, Dict[int, float]]:
+    """Return the highest bcrypt cost whose hash time fits 'target_seconds' and the timings measured per cost.
+
+    Each extra round doubles the hash time, so measuring stops at the first cost exceeding the target.
+    'min_rounds' is returned if even that cost does not fit.
+    """
+    timings: Dict[int, float] = {}
+    recommended_rounds: int = min_rounds
+
+    for rounds in range(min_rounds, max_rounds + 1):
+        timings[rounds] = measure_bcrypt_hash_time(rounds=rounds, samples=samples)
+        if timings[rounds] > target_seconds:
+            break
+        recommended_rounds = rounds
+
+    return recommended_rounds, timings
+
+
+pwd_context: CryptContext = create_password_context(
+    schemes=config.PASSWORD_HASH_SCHEMES, bcrypt_rounds=config.PASSWORD_HASH_BCRYPT_ROUNDS
+)
+
+
+@functools.lru_cache
+def _load_password_context(context_config: str) -> CryptContext:
+    return CryptContext.from_string(context_config)
+
+
+def _verify_password(plain_password: str, hashed_password: str, context_config: str) -> bool:
+    return _load_password_context(context_config).verify(plain_password, hashed_password)
+
+
+def _hash_password(password: str, context_config: str) -> str:
+    return _load_password_context(context_config).hash(password)
+
+
+class PasswordHashingPool:
+    """Runs password hashing in a pool of worker threads or processes so that it does not block the event loop.
+
+    At most 'max_concurrency' calls are handed to the pool at a time, the rest wait in the queue.
+    """
+
+    def __init__(self, executor_type: str, max_workers: int, max_concurrency: Optional[int] = None):
+        if executor_type not in ("thread", "process"):
+            raise ValueError("executor_type must be either 'thread' or 'process'")
+
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers
+        self.queue_depth: int = 0
+        self.in_flight: int = 0
+        self.completed: int = 0
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = ThreadPoolExecutor if self.executor_type == "thread" else ProcessPoolExecutor
+            self._executor = executor_class(max_workers=self.max_workers)
+
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.queue_depth += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict:
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+        }
+
+
+password_hashing_pool = PasswordHashingPool(
+    executor_type=config.PASSWORD_HASHER_EXECUTOR,
+    max_workers=config.PASSWORD_HASHER_MAX_WORKERS,
+    max_concurrency=config.PASSWORD_HASHER_MAX_CONCURRENCY,
+)
+password_hashing_queue_depth.set_function(lambda: password_hashing_pool.queue_depth)
+
 
 class PasswordHasher:
-    pwd_context: CryptContext = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context: CryptContext = pwd_context
+    hashing_pool: PasswordHashingPool = password_hashing_pool
 
     def verify_password(self, plain_password: str, hashed_password: str):
         return self.pwd_context.verify(plain_password, hashed_password)
@@ -12,6 +154,19 @@ class PasswordHasher:
     def hash_password(self, password: str):
         return self.pwd_context.hash(password)
 
+    def needs_update(self, hashed_password: str) -> bool:
+        return self.pwd_context.needs_update(hashed_password)
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        with password_hashing_duration.time("verify"):
+            return await self.hashing_pool.run(
+                _verify_password, plain_password, hashed_password, self.pwd_context.to_string()
+            )
+
+    async def hash_password_async(self, password: str) -> str:
+        with password_hashing_duration.time("hash"):
+            return await self.hashing_pool.run(_hash_password, password, self.pwd_context.to_string())
+
 
 class ResetPasswordTokenHasher:
     def __init__(self, algorithm: str = "sha256"):
@@ -26,3 +181,9 @@ class ResetPasswordTokenHasher:
     def verify_token(self, verifiable_token: str, compared_token: str) -> bool:
         hashed_verifiable_token: str = self.hash_token(verifiable_token)
         return hashed_verifiable_token == compared_token
+
+    @staticmethod
+    def derive_token(seed: str) -> str:
+        """Return the token for the seed, which can not be derived without the secret key."""
+        digest: bytes = hmac.new(config.SECRET_KEY.encode(), seed.encode(), hashlib.sha512).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
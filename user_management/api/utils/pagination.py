@@ -0,0 +1,42 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from user_management.api.utils.exceptions import CursorError
+
+
+class Cursor(NamedTuple):
+    """Position after the last row of a page: the sort key of that row and its user_id as a tie-breaker."""
+
+    sort_field: str
+    ord_direction: str
+    value: Any
+    user_id: uuid.UUID
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    value: Any = cursor.value.isoformat() if isinstance(cursor.value, datetime) else cursor.value
+    payload: bytes = json.dumps([cursor.sort_field, cursor.ord_direction, value, str(cursor.user_id)]).encode()
+
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, value_type: type = str) -> Cursor:
+    """Decode a cursor made by 'encode_cursor' for a sort column whose values are of 'value_type'.
+
+    A client can change the cursor, so a value which is not of that type is rejected before it reaches a query.
+    """
+    try:
+        payload: bytes = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_field, ord_direction, value, user_id = json.loads(payload)
+        if value_type is datetime and isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if not isinstance(value, value_type):
+            raise TypeError(f"cursor value is not a {value_type.__name__}")
+
+        return Cursor(sort_field=sort_field, ord_direction=ord_direction, value=value, user_id=uuid.UUID(user_id))
+    except (binascii.Error, AttributeError, TypeError, ValueError) as e:
+        raise CursorError("invalid cursor") from e
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import redis.exceptions
+from redis.asyncio import Redis
+
+from user_management.config import config
+from user_management.logger_settings import logger
+from user_management.redis_settings import get_redis_client
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The part of a user that authorization checks need."""
+
+    user_id: uuid.UUID
+    role: str
+    group_id: Optional[int]
+    is_blocked: bool
+
+
+class PrincipalCache:
+    """A bounded in-process LRU cache of principals whose entries expire after a fixed TTL.
+
+    Entries are invalidated locally when a user is changed by this worker and through a Redis pub/sub channel
+    when it is changed by any other worker.
+    """
+
+    reconnect_delay_seconds: float = 1
+
+    def __init__(self, max_size: int, ttl_seconds: float, channel: str):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.channel = channel
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: OrderedDict[uuid.UUID, Tuple[float, Principal]] = OrderedDict()
+        self._version: int = 0
+
+    @property
+    def version(self) -> int:
+        """A counter bumped by every invalidation. Pass the value read before a DB lookup to 'put'."""
+        return self._version
+
+    def get(self, user_id: uuid.UUID) -> Optional[Principal]:
+        entry: Optional[Tuple[float, Principal]] = self._entries.get(user_id)
+
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+
+        return entry[1]
+
+    def put(self, principal: Principal, version: int) -> None:
+        """Store the principal unless an invalidation happened since 'version' was read."""
+        if version != self._version:
+            return None
+
+        self._entries[principal.user_id] = (time.monotonic() + self.ttl_seconds, principal)
+        self._entries.move_to_end(principal.user_id)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        return None
+
+    def invalidate(self, user_id: uuid.UUID) -> None:
+        self._version += 1
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._version += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    async def publish_invalidation(self, user_id: uuid.UUID, redis_client: Optional[Redis] = None) -> None:
+        """Invalidate the user in this worker and notify the other workers."""
+        self.invalidate(user_id)
+
+        if redis_client is None:
+            redis_client = get_redis_client()
+
+        try:
+            await redis_client.publish(self.channel, str(user_id))
+
+        except redis.exceptions.ConnectionError as e:
+            logger.error(e)
+
+        return None
+
+    async def listen_for_invalidations(self, redis_client: Redis) -> None:
+        """Apply invalidations published by other workers until cancelled.
+
+        The cache is cleared whenever the subscription is (re)established, since messages may have been missed.
+        The client should not have a socket timeout, since the subscription can stay silent for a long time.
+        """
+        while True:
+            try:
+                async with redis_client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(self.channel)
+                    self.clear()
+
+                    async for message in pubsub.listen():
+                        try:
+                            self.invalidate(uuid.UUID(message["data"].decode()))
+                        except ValueError:
+                            logger.error("invalid principal cache invalidation message: %s", message["data"])
+
+            except redis.exceptions.ConnectionError as e:
+                logger.error(e)
+                self.clear()
+                await asyncio.sleep(self.reconnect_delay_seconds)
+
+
+principal_cache = PrincipalCache(
+    max_size=config.PRINCIPAL_CACHE_MAX_SIZE,
+    ttl_seconds=config.PRINCIPAL_CACHE_TTL_SECONDS,
+    channel=config.PRINCIPAL_CACHE_CHANNEL,
+)
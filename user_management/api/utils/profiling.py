@@ -0,0 +1,189 @@
+import cProfile
+import hashlib
+import hmac
+import marshal
+import time
+import uuid
+from typing import Awaitable, Callable, Optional, Tuple
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from user_management.api.utils.principal_cache import Principal
+from user_management.config import config
+from user_management.logger_settings import logger
+from user_management.managers.user_manager import UserManager
+from user_management.redis_settings import get_redis_client
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_HEADER_KEY = PROFILE_HEADER.lower().encode("latin-1")
+
+
+def sign_profiling_token(user_id: uuid.UUID, expires_at: int) -> str:
+    message: bytes = f"{user_id}.{expires_at}".encode()
+    return hmac.new(config.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def create_profiling_token(user_id: uuid.UUID, ttl_seconds: int = config.PROFILER_TOKEN_TTL_SECONDS) -> Tuple[str, int]:
+    """Return a token for the X-Profile header of the requests to profile, and when it expires as a unix time."""
+    expires_at: int = int(time.time()) + ttl_seconds
+    return f"{user_id}.{expires_at}.{sign_profiling_token(user_id, expires_at)}", expires_at
+
+
+def verify_profiling_token(token: str) -> Optional[uuid.UUID]:
+    """Return the user the token was issued to, or None if it is malformed, forged or expired."""
+    try:
+        user_id, expires_at, signature = token.split(".")
+        user_id, expires_at = uuid.UUID(user_id), int(expires_at)
+    except ValueError:
+        return None
+
+    if not hmac.compare_digest(signature, sign_profiling_token(user_id, expires_at)) or expires_at < time.time():
+        return None
+
+    return user_id
+
+
+class ProfileStore:
+    """Profiles kept in Redis for 'ttl_seconds', and the number of profiles each user may take per minute."""
+
+    key_prefix = "profile:"  # noqa: S105
+    rate_limit_key_prefix = "profile_rate_limit:"  # noqa: S105
+
+    def __init__(
+        self,
+        redis_client: Optional[Redis] = None,
+        ttl_seconds: int = config.PROFILER_RESULT_TTL_SECONDS,
+        max_profiles_per_minute: int = config.PROFILER_MAX_PROFILES_PER_MINUTE,
+    ):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.max_profiles_per_minute = max_profiles_per_minute
+
+    def get_redis_client(self) -> Redis:
+        return self.redis_client if self.redis_client is not None else get_redis_client()
+
+    async def acquire(self, user_id: uuid.UUID) -> bool:
+        """Count a profile of the user, return False if the user has used up the profiles of the current minute."""
+        async with self.get_redis_client().pipeline(transaction=True) as pipe:
+            pipe.incr(f"{self.rate_limit_key_prefix}{user_id}")
+            pipe.expire(f"{self.rate_limit_key_prefix}{user_id}", 60, nx=True)
+            count, _ = await pipe.execute()
+
+        return count <= self.max_profiles_per_minute
+
+    async def save(self, profile_id: str, profile: bytes) -> None:
+        await self.get_redis_client().set(f"{self.key_prefix}{profile_id}", profile, ex=self.ttl_seconds)
+
+    async def load(self, profile_id: str) -> Optional[bytes]:
+        return await self.get_redis_client().get(f"{self.key_prefix}{profile_id}")
+
+
+profile_store = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """Run requests carrying a valid X-Profile token of an admin under cProfile.
+
+    The profile is stored under the id returned in the X-Profile-Id response header and downloaded as a file
+    readable by pstats. If a request can not be profiled, it is run as usual and X-Profile-Status tells why.
+    Requests without the header only pay for looking it up.
+
+    cProfile records everything run on the event loop while it is enabled, including other requests,
+    so only one request per worker is profiled at a time.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore = profile_store,
+        get_principal: Optional[Callable[[uuid.UUID], Awaitable[Optional[Principal]]]] = None,
+    ):
+        self.app = app
+        self.store = store
+        self.get_principal = get_principal if get_principal is not None else UserManager().get_principal
+        self.profiling: bool = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        token: Optional[bytes] = None
+        if scope["type"] == "http":
+            token = next((value for key, value in scope["headers"] if key == PROFILE_HEADER_KEY), None)
+
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+
+        status: str = await self.authorize(token.decode("latin-1"))
+        if status != "profiling":
+            await self.app(scope, receive, self.add_headers(send, {"x-profile-status": status}))
+            return
+
+        await self.profile(scope, receive, send)
+
+    async def authorize(self, token: str) -> str:
+        """Return why the request is not profiled, or "profiling" with the profiler of this worker reserved for it."""
+        user_id: Optional[uuid.UUID] = verify_profiling_token(token)
+        if user_id is None:
+            return "invalid_token"
+
+        # reserved before the first await, so a request arriving meanwhile finds the profiler busy
+        if self.profiling:
+            return "busy"
+        self.profiling = True
+
+        status: str = "unavailable"
+        try:
+            status = await self.check_user(user_id)
+        finally:
+            if status != "profiling":
+                self.profiling = False
+
+        return status
+
+    async def check_user(self, user_id: uuid.UUID) -> str:
+        principal: Optional[Principal] = await self.get_principal(user_id)
+        if principal is None or principal.is_blocked or principal.role != "ADMIN":
+            return "forbidden"
+
+        try:
+            if not await self.store.acquire(user_id):
+                return "rate_limited"
+        except RedisError as e:
+            logger.error(e)
+            return "unavailable"
+
+        return "profiling"
+
+    async def profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profile_id: str = uuid.uuid4().hex
+        profiler = cProfile.Profile()
+        send = self.add_headers(send, {"x-profile-status": "profiling", "x-profile-id": profile_id})
+
+        try:
+            profiler.enable()
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self.profiling = False
+            await self.save(profile_id, profiler)
+
+    async def save(self, profile_id: str, profiler: cProfile.Profile) -> None:
+        # the format written by Profile.dump_stats, loaded by pstats.Stats
+        profiler.create_stats()
+        try:
+            await self.store.save(profile_id, marshal.dumps(profiler.stats))
+        except RedisError as e:
+            logger.error(e)
+
+    @staticmethod
+    def add_headers(send: Send, headers: dict) -> Send:
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", []),
+                    *((key.encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()),
+                ]
+            await send(message)
+
+        return send_with_headers
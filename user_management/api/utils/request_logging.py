@@ -0,0 +1,91 @@
+import logging
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from user_management.api.utils.routing import get_route
+from user_management.config import config
+from user_management.logger_settings import logger
+
+LOG_LINE_FIELDS = ("method", "path", "status", "size", "duration_ms")
+REDACTED_HEADERS = frozenset({"authorization", "cookie", "set-cookie", "x-api-key"})
+
+
+def redact_headers(raw_headers: List[Tuple[bytes, bytes]]) -> Dict[str, str]:
+    return {key: "[redacted]" if key in REDACTED_HEADERS else value for key, value in Headers(raw=raw_headers).items()}
+
+
+class RequestLoggingMiddleware:
+    """Log the method, path, status, size and duration of every HTTP request.
+
+    The response is passed to the server chunk by chunk as the application sends it, nothing is buffered.
+    For debugging, the first 'body_max_bytes' of the body of a 'body_sample_rate' share of responses are logged too,
+    and the request headers, without credentials, at the DEBUG level.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        body_sample_rate: float = config.LOG_RESPONSE_BODY_SAMPLE_RATE,
+        body_max_bytes: int = config.LOG_RESPONSE_BODY_MAX_BYTES,
+    ):
+        self.app = app
+        self.body_sample_rate = body_sample_rate
+        self.body_max_bytes = body_max_bytes
+
+    def should_capture_body(self) -> bool:
+        if self.body_sample_rate <= 0 or not logger.isEnabledFor(logging.INFO):
+            return False
+
+        return random.random() < self.body_sample_rate  # noqa: S311
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at: float = time.perf_counter()
+        status_code: int = 500
+        size: int = 0
+        body: Optional[bytearray] = bytearray() if self.should_capture_body() else None
+
+        async def send_and_measure(message: Message) -> None:
+            nonlocal status_code, size
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunk: bytes = message.get("body", b"")
+                size += len(chunk)
+                if body is not None and len(body) < self.body_max_bytes:
+                    body.extend(chunk[: self.body_max_bytes - len(body)])
+
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            if logger.isEnabledFor(logging.INFO):
+                self.log_request(scope, status_code, size, time.perf_counter() - started_at, body)
+
+    def log_request(
+        self, scope: Scope, status_code: int, size: int, duration_seconds: float, body: Optional[bytearray]
+    ) -> None:
+        fields: Dict = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": get_route(scope),
+            "status": status_code,
+            "size": size,
+            "duration_ms": round(duration_seconds * 1000, 3),
+        }
+        if body is not None:
+            fields["body"] = bytes(body).decode(errors="replace")
+            fields["body_truncated"] = size > len(body)
+        if logger.isEnabledFor(logging.DEBUG):
+            fields["headers"] = redact_headers(scope["headers"])
+
+        logger.info("%s %s %s %sB %.1fms", *(fields[key] for key in LOG_LINE_FIELDS), extra=fields)
@@ -0,0 +1,43 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from user_management.api.utils.routing import get_route
+from user_management.metrics.instruments import http_request_duration, http_requests_in_flight
+
+# the route label of requests which matched no route, the paths of which are not bounded
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """Record the duration of every HTTP request by route and status code, and the number of requests being handled.
+
+    The duration is measured until the response has been sent, so it includes streaming the body.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at: float = time.perf_counter()
+        status_code: int = 500
+
+        async def send_and_record_status(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            http_requests_in_flight.dec()
+            http_request_duration.observe(
+                time.perf_counter() - started_at, get_route(scope) or UNMATCHED_ROUTE, str(status_code)
+            )
@@ -0,0 +1,47 @@
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from user_management.api.utils.routing import get_route
+from user_management.tracing import parse_traceparent, tracer
+
+
+class RequestTracingMiddleware:
+    """Trace every HTTP request in a span which continues the trace of the 'traceparent' request header.
+
+    The route is only known once the router has matched it, so the span is named after the method until then,
+    and stays so for requests which match no route. Errors turned into responses, such as HTTPException,
+    do not fail the span.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code: int = 500
+
+        async def send_and_record_status(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with tracer.span(
+            scope["method"],
+            parent=parse_traceparent(Headers(scope=scope).get("traceparent")),
+            attributes={"http.method": scope["method"]},
+        ) as span:
+            try:
+                await self.app(scope, receive, send_and_record_status)
+            finally:
+                route: Optional[str] = get_route(scope)
+                if route is not None:
+                    span.name = route
+                    span.set_attribute("http.route", scope["route"].path)
+                span.set_attribute("http.status_code", status_code)
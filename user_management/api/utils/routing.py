@@ -0,0 +1,31 @@
+from typing import Callable, Coroutine, Optional
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from starlette.types import Scope
+
+from user_management.database.unit_of_work import UnitOfWork
+
+
+def get_route(scope: Scope) -> Optional[str]:
+    """Return the method and path of the route which handled the request, None if no route matched."""
+    # the route is set in the scope by the router, so it is known once the request has been passed on
+    route = scope.get("route")
+    return f"{scope['method']} {route.path}" if route is not None else None
+
+
+class UnitOfWorkRoute(APIRoute):
+    """Run the dependencies and the endpoint of a route in one unit of work.
+
+    The unit of work is closed when the response has been built, before it is sent, so a connection held by the
+    request session goes back to the pool as early as possible.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[None, None, Response]]:
+        route_handler = super().get_route_handler()
+
+        async def unit_of_work_route_handler(request: Request) -> Response:
+            async with UnitOfWork(route=f"{request.method} {self.path_format}"):
+                return await route_handler(request)
+
+        return unit_of_work_route_handler
@@ -7,6 +7,8 @@ from fastapi import UploadFile
 from pydantic import EmailStr
 
 from user_management.config import config
+from user_management.metrics.instruments import s3_upload_duration
+from user_management.tracing import tracer
 
 
 class AWSService:
@@ -36,13 +38,15 @@ class AWSService:
         return rs
 
     async def upload_image(self, file: UploadFile, key: str) -> str:
-        with contextlib.suppress(botocore.errorfactory.ClientError):
-            await self.aws_client.create_bucket(
-                Bucket=config.AWS_S3_BUCKET_NAME,
-                CreateBucketConfiguration={"LocationConstraint": config.AWS_REGION_NAME},
-            )
-
-        await self.aws_client.upload_fileobj(file, config.AWS_S3_BUCKET_NAME, key)
+        with tracer.span("s3.upload_image", attributes={"s3.bucket": config.AWS_S3_BUCKET_NAME, "s3.key": key}):
+            with contextlib.suppress(botocore.errorfactory.ClientError):
+                await self.aws_client.create_bucket(
+                    Bucket=config.AWS_S3_BUCKET_NAME,
+                    CreateBucketConfiguration={"LocationConstraint": config.AWS_REGION_NAME},
+                )
+
+            with s3_upload_duration.time():
+                await self.aws_client.upload_fileobj(file, config.AWS_S3_BUCKET_NAME, key)
 
         image_s3_path: str = f"{config.LOCALSTACK_HOST}:{config.LOCALSTACK_PORT}/{config.AWS_S3_BUCKET_NAME}/{key}"
 
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Literal, Optional
 
 import pytz
 from pydantic import EmailStr
@@ -13,16 +13,43 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 30
+    DB_POOL_RECYCLE_SECONDS: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_PGBOUNCER_MODE: bool = False
+    DB_REPLICA_URLS: List[str] = []
+    DB_REPLICA_HEALTH_CHECK_INTERVAL_SECONDS: float = 5
+    DB_REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS: float = 1
+    DB_READ_YOUR_WRITES_SECONDS: float = 5
     WEBAPP_TEST_HOST: str
     ALLOWED_HOSTS: List[str] = ["*"]
     ACCESS_TOKEN_TTL_MINUTES: int = 5
     REFRESH_TOKEN_TTL_DAYS: int = 10
+    PASSWORD_RESET_TOKEN_TTL_MINUTES: int = 30
     TIMEZONE: str = "Europe/Minsk"
     SECRET_KEY: str
     TOKEN_HASH_ALGORITHM: str = "HS256"
+    PASSWORD_HASH_SCHEMES: List[str] = ["bcrypt"]
+    PASSWORD_HASH_BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASHER_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASHER_MAX_WORKERS: int = 4
+    PASSWORD_HASHER_MAX_CONCURRENCY: Optional[int] = None
     REDIS_PORT: int
     REDIS_HOST: str
     REDIS_DB_NUM: int
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5
+    REDIS_SOCKET_TIMEOUT: float = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30
+    PRINCIPAL_CACHE_CHANNEL: str = "principal_cache_invalidation"
+    USER_ID_GENERATOR: Literal["uuid4", "uuid7"] = "uuid7"
+    USER_COUNT_CACHE_TTL_SECONDS: int = 10
+    USER_COUNT_ESTIMATE_THRESHOLD: Optional[int] = None
     SOURCE_EMAIL: EmailStr
     WEBAPP_HOST: str
     LOCALSTACK_HOST: str
@@ -42,6 +69,33 @@ class Settings(BaseSettings):
     RABBITMQ_HOST: str
     RABBITMQ_PORT: str
     RABBITMQ_QUEUE: str
+    RABBITMQ_CHANNEL_POOL_SIZE: int = 4
+    RABBITMQ_MAX_BUFFERED_MESSAGES: int = 10000
+    RABBITMQ_RECONNECT_DELAY_SECONDS: float = 1
+    RABBITMQ_MAX_RECONNECT_DELAY_SECONDS: float = 30
+    RABBITMQ_USER_EVENTS_QUEUE: Optional[str] = None
+    OUTBOX_RELAY_ENABLED: bool = True
+    OUTBOX_RELAY_BATCH_SIZE: int = 100
+    OUTBOX_RELAY_POLL_INTERVAL_SECONDS: float = 1
+    OUTBOX_RELAY_CONFIRM_TIMEOUT_SECONDS: float = 30
+    OUTBOX_RELAY_CLAIM_SECONDS: float = 300
+    METRICS_PUSH_INTERVAL_SECONDS: float = 5
+    METRICS_TOKEN: Optional[str] = None
+    TRACING_EXPORTER: Literal["none", "stdout", "file"] = "none"
+    TRACING_FILE: str = "traces.jsonl"
+    TRACING_SAMPLE_RATE: float = 0.01
+    PROFILER_TOKEN_TTL_SECONDS: int = 600
+    PROFILER_MAX_PROFILES_PER_MINUTE: int = 6
+    PROFILER_RESULT_TTL_SECONDS: int = 3600
+    LOG_LEVEL: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"] = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_FILE: str = "info.log"
+    LOG_FILE_MAX_BYTES: int = 10485760
+    LOG_FILE_ROTATION_INTERVAL_SECONDS: int = 86400
+    LOG_FILE_BACKUP_COUNT: int = 7
+    LOG_ROUTE_SAMPLE_RATES: Dict[str, float] = {}
+    LOG_RESPONSE_BODY_SAMPLE_RATE: float = 0
+    LOG_RESPONSE_BODY_MAX_BYTES: int = 1024
 
     @property
     def db_url(self) -> str:
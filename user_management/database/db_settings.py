@@ -1,13 +1,127 @@
-from typing import AsyncGenerator
+import time
+import uuid
+from typing import Dict, Optional
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from user_management.config import config
+from user_management.metrics.instruments import current_db_operation, db_query_duration
+from user_management.tracing import Span, tracer
 
-engine = create_async_engine(config.db_url, echo=False)
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """A queue pool which counts checkouts and the time spent waiting for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts: int = 0
+        self.waiting: int = 0
+        self.wait_time_seconds: float = 0
+        self.timeouts: int = 0
+
+    def _do_get(self):
+        started_at: float = time.perf_counter()
+        self.waiting += 1
+
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+            self.wait_time_seconds += time.perf_counter() - started_at
+
+        self.checkouts += 1
+
+        return connection
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # the counters are kept when the engine replaces its pool, e.g. after the database restarted
+        pool: InstrumentedQueuePool = super().recreate()
+        pool.checkouts, pool.wait_time_seconds, pool.timeouts = self.checkouts, self.wait_time_seconds, self.timeouts
+        return pool
+
+    def stats(self) -> Dict:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "in_use": self.checkedout(),
+            "idle": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_time_seconds": round(self.wait_time_seconds, 6),
+        }
+
+
+def get_prepared_statement_name() -> str:
+    # unique names, so a statement prepared through one server connection of PgBouncer never clashes with another
+    return f"__asyncpg_{uuid.uuid4()}__"
+
+
+def get_engine_options() -> Dict:
+    options: Dict = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": config.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+    if config.DB_PGBOUNCER_MODE:
+        # PgBouncer in transaction mode may run each transaction on another server connection,
+        # so statements must not be prepared once and reused by name
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": get_prepared_statement_name,
+        }
+
+    return options
+
+
+def record_query_start(connection, cursor, statement, parameters, context, executemany) -> None:
+    context.query_started_at = time.perf_counter()
+    context.query_span = tracer.start_child_span(
+        "db.query", attributes={"db.operation": current_db_operation.get(), "db.statement": statement[:1000]}
+    )
+
+
+def record_query_duration(connection, cursor, statement, parameters, context, executemany) -> None:
+    # the async driver runs cursor events in a greenlet that shares the context of the calling task
+    db_query_duration.observe(time.perf_counter() - context.query_started_at, current_db_operation.get())
+    if context.query_span is not None:
+        tracer.end_span(context.query_span)
+
+
+def record_query_error(exception_context) -> None:
+    query_span: Optional[Span] = getattr(exception_context.execution_context, "query_span", None)
+    if query_span is not None:
+        query_span.record_error(exception_context.original_exception)
+        tracer.end_span(query_span)
+
+
+def create_engine(url: str, **options) -> AsyncEngine:
+    """Create an engine with the pool settings from the config, 'options' override them.
+
+    The time of every statement is recorded, by the manager method running it, and traced if the request is.
+    """
+    created_engine: AsyncEngine = create_async_engine(url, **{**get_engine_options(), **options})
+    event.listen(created_engine.sync_engine, "before_cursor_execute", record_query_start)
+    event.listen(created_engine.sync_engine, "after_cursor_execute", record_query_duration)
+    event.listen(created_engine.sync_engine, "handle_error", record_query_error)
+
+    return created_engine
+
+
+engine = create_engine(config.db_url, echo=False)
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
-    async with async_session_maker() as session:
-        yield session
+def get_db_pool_stats() -> Dict:
+    return engine.pool.stats()
@@ -0,0 +1,37 @@
+import json
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.sql.selectable import Select
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a select, compiled with the same bound parameters as the select itself."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def compile_explain(element: Explain, compiler, **kwargs) -> str:
+    options: str = "FORMAT JSON, ANALYZE" if element.analyze else "FORMAT JSON"
+    return f"EXPLAIN ({options}) {compiler.process(element.statement, **kwargs)}"
+
+
+async def explain(session: AsyncSession, statement: Select, analyze: bool = False) -> Dict[str, Any]:
+    """Return the top plan node of 'statement'."""
+    result: Any = await session.scalar(Explain(statement, analyze=analyze))
+    plans: List[Dict] = json.loads(result) if isinstance(result, str) else result
+
+    return plans[0]["Plan"]
+
+
+def iter_plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from iter_plan_nodes(child)
@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+import uuid
+
+from user_management.config import config
+
+
+class UUID7Generator:
+    """Generates UUIDv7 (RFC 9562): a 48-bit Unix timestamp in milliseconds, then random bits.
+
+    Keys generated one after another sort in generation order, so new rows are appended to the right edge of the
+    primary key index instead of splitting random pages. Within one millisecond the 12 'rand_a' bits are used as a
+    counter (RFC 9562, method 1), which keeps the order monotonic in the process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_timestamp_ms: int = 0
+        self.counter: int = 0
+
+    def __call__(self) -> uuid.UUID:
+        with self.lock:
+            timestamp_ms: int = time.time_ns() // 1_000_000
+
+            if timestamp_ms > self.last_timestamp_ms:
+                self.last_timestamp_ms = timestamp_ms
+                self.counter = int.from_bytes(os.urandom(2)) & 0x7FF
+            else:
+                # same millisecond or the clock went back: keep counting from the last timestamp
+                self.counter += 1
+                if self.counter > 0xFFF:
+                    self.last_timestamp_ms += 1
+                    self.counter = 0
+
+            timestamp_ms, counter = self.last_timestamp_ms, self.counter
+
+        rand_b: int = int.from_bytes(os.urandom(8)) & 0x3FFF_FFFF_FFFF_FFFF
+        value: int = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | 0x7 << 76 | counter << 64 | 0b10 << 62 | rand_b
+
+        return uuid.UUID(int=value)
+
+
+uuid7 = UUID7Generator()
+
+
+def generate_user_id() -> uuid.UUID:
+    return uuid7() if config.USER_ID_GENERATOR == "uuid7" else uuid.uuid4()
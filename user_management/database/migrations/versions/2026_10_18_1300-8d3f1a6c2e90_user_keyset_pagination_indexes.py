@@ -0,0 +1,34 @@
+"""user keyset pagination indexes
+
+Revision ID: 8d3f1a6c2e90
+Revises: 5b7e2c91d4a3
+Create Date: 2026-10-18 13:00:00.000000+03:00
+
+"""
+from typing import Optional, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8d3f1a6c2e90"
+down_revision: Optional[str] = "5b7e2c91d4a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # username, email and phone_number are already covered by their unique indexes
+    op.create_index("ix_user_name_user_id", "user", [sa.text("coalesce(name, '')"), "user_id"])
+    op.create_index("ix_user_surname_user_id", "user", [sa.text("coalesce(surname, '')"), "user_id"])
+    op.create_index("ix_user_role_user_id", "user", ["role", "user_id"])
+    op.create_index("ix_user_created_at_user_id", "user", ["created_at", "user_id"])
+    op.create_index("ix_user_modified_at_user_id", "user", ["modified_at", "user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_modified_at_user_id", table_name="user")
+    op.drop_index("ix_user_created_at_user_id", table_name="user")
+    op.drop_index("ix_user_role_user_id", table_name="user")
+    op.drop_index("ix_user_surname_user_id", table_name="user")
+    op.drop_index("ix_user_name_user_id", table_name="user")
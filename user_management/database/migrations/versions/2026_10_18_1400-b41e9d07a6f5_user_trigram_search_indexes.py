@@ -0,0 +1,32 @@
+"""user trigram search indexes
+
+Revision ID: b41e9d07a6f5
+Revises: 8d3f1a6c2e90
+Create Date: 2026-10-18 14:00:00.000000+03:00
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b41e9d07a6f5"
+down_revision: Optional[str] = "8d3f1a6c2e90"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_FIELDS = ("name", "surname", "username", "email")
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for field in SEARCH_FIELDS:
+        op.create_index(
+            f"ix_user_{field}_trgm", "user", [field], postgresql_using="gin", postgresql_ops={field: "gin_trgm_ops"}
+        )
+
+
+def downgrade() -> None:
+    for field in reversed(SEARCH_FIELDS):
+        op.drop_index(f"ix_user_{field}_trgm", table_name="user", postgresql_using="gin")
@@ -0,0 +1,30 @@
+"""login identifier indexes
+
+Revision ID: e2c5a8f3b610
+Revises: b41e9d07a6f5
+Create Date: 2026-10-18 15:00:00.000000+03:00
+
+"""
+from typing import Optional, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e2c5a8f3b610"
+down_revision: Optional[str] = "b41e9d07a6f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # not unique: existing users may differ only in case
+    op.create_index("ix_user_lower_username", "user", [sa.text("lower(username)")])
+    op.create_index("ix_user_lower_email", "user", [sa.text("lower(email)")])
+    op.create_index("ix_user_phone_number_digits", "user", [sa.text("regexp_replace(phone_number, '[^0-9]', '', 'g')")])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_phone_number_digits", table_name="user")
+    op.drop_index("ix_user_lower_email", table_name="user")
+    op.drop_index("ix_user_lower_username", table_name="user")
@@ -0,0 +1,24 @@
+"""user group members index
+
+Revision ID: 3f9b6d2a7c14
+Revises: e2c5a8f3b610
+Create Date: 2026-10-18 16:00:00.000000+03:00
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9b6d2a7c14"
+down_revision: Optional[str] = "e2c5a8f3b610"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_user_group_id_username_user_id", "user", ["group_id", "username", "user_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_group_id_username_user_id", table_name="user")
@@ -0,0 +1,25 @@
+"""user version
+
+Revision ID: 7a1c4e8b9d25
+Revises: 3f9b6d2a7c14
+Create Date: 2026-10-18 17:00:00.000000+03:00
+
+"""
+from typing import Optional, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7a1c4e8b9d25"
+down_revision: Optional[str] = "3f9b6d2a7c14"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("user", sa.Column("version", sa.Integer(), server_default=sa.text("1"), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("user", "version")
@@ -0,0 +1,29 @@
+"""timestamp server defaults
+
+Revision ID: c6d2f7a3e1b8
+Revises: 7a1c4e8b9d25
+Create Date: 2026-10-18 18:00:00.000000+03:00
+
+"""
+from typing import Optional, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c6d2f7a3e1b8"
+down_revision: Optional[str] = "7a1c4e8b9d25"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_COLUMNS = (("user", "created_at"), ("user", "modified_at"), ("group", "created_at"))
+
+
+def upgrade() -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=None)
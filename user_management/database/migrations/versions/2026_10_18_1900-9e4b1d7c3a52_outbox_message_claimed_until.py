@@ -0,0 +1,25 @@
+"""outbox message claimed until
+
+Revision ID: 9e4b1d7c3a52
+Revises: c6d2f7a3e1b8
+Create Date: 2026-10-18 19:00:00.000000+03:00
+
+"""
+from typing import Optional, Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e4b1d7c3a52"
+down_revision: Optional[str] = "c6d2f7a3e1b8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox_message", sa.Column("claimed_until", sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("outbox_message", "claimed_until")
@@ -1,3 +1,4 @@
 from .base import Base
 from .group import Group
+from .outbox import OutboxMessage
 from .user import User
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import TIMESTAMP, BigInteger, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class OutboxMessage(Base):
+    """A message written in the same transaction as the change it describes and relayed to RabbitMQ later."""
+
+    __tablename__ = "outbox_message"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)  # noqa: A003
+    queue_name: Mapped[str] = mapped_column(String(length=255))
+    headers: Mapped[Optional[Dict]] = mapped_column(JSONB, nullable=True)
+    body: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
+    # set while a relay publishes the message, other relays skip it until then
+    claimed_until: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True), nullable=True)
+
+    def __str__(self):
+        return f"{self.queue_name}:{self.id}"
@@ -1,17 +1,36 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import TIMESTAMP, UUID, Boolean, Enum, ForeignKey, String
+from sqlalchemy import TIMESTAMP, UUID, Boolean, Enum, ForeignKey, Index, Integer, String, func, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from ...config import config
+from ..identifiers import generate_user_id
 from .base import Base
 
 
 class User(Base):
     __tablename__ = "user"
+    __table_args__ = (
+        # (sort key, user_id) indexes used by keyset pagination of the user list
+        Index("ix_user_name_user_id", text("coalesce(name, '')"), "user_id"),
+        Index("ix_user_surname_user_id", text("coalesce(surname, '')"), "user_id"),
+        Index("ix_user_role_user_id", "role", "user_id"),
+        Index("ix_user_created_at_user_id", "created_at", "user_id"),
+        Index("ix_user_modified_at_user_id", "modified_at", "user_id"),
+        # members of a group, paginated by username
+        Index("ix_user_group_id_username_user_id", "group_id", "username", "user_id"),
+        # normalized login identifiers, see UserManager.login_keys
+        Index("ix_user_lower_username", text("lower(username)")),
+        Index("ix_user_lower_email", text("lower(email)")),
+        Index("ix_user_phone_number_digits", text("regexp_replace(phone_number, '[^0-9]', '', 'g')")),
+        # trigram indexes used by the user search
+        *(
+            Index(f"ix_user_{field}_trgm", field, postgresql_using="gin", postgresql_ops={field: "gin_trgm_ops"})
+            for field in ("name", "surname", "username", "email")
+        ),
+    )
 
-    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=generate_user_id)
     name: Mapped[str] = mapped_column(String(length=255), nullable=True)
     surname: Mapped[str] = mapped_column(String(length=255), nullable=True)
     username: Mapped[str] = mapped_column(String(length=255), unique=True)
@@ -21,12 +40,13 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(length=255), unique=True)
     image_s3_path: Mapped[str] = mapped_column(String(length=255), nullable=True)
     is_blocked: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), default=datetime.now(tz=config.get_timezone())
-    )
+    # set by the database, the time of the transaction which inserted or last updated the row
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), server_default=func.now())
     modified_at: Mapped[datetime] = mapped_column(
-        TIMESTAMP(timezone=True), default=datetime.now(tz=config.get_timezone())
+        TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+    # incremented by every update, sent as the ETag of a user
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default=text("1"))
 
     group_id: Mapped[int] = mapped_column(ForeignKey("group.group_id"), nullable=True)
 
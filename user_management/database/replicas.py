@@ -0,0 +1,160 @@
+import asyncio
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from user_management.config import config
+from user_management.database.db_settings import create_engine
+from user_management.logger_settings import logger
+from user_management.redis_settings import get_redis_client
+
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, SQLAlchemyError)
+
+
+class Replica:
+    def __init__(self, url: str, engine_factory: Callable[..., AsyncEngine]):
+        self.engine: AsyncEngine = engine_factory(url, pool_pre_ping=True)
+        self.session_maker: async_sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.name: str = self.engine.url.render_as_string(hide_password=True)
+        self.healthy: bool = True
+        self.reads: int = 0
+        self.failures: int = 0
+
+
+class ReplicaSet:
+    """Read replicas of the database, used round-robin while they pass their health checks.
+
+    A replica which fails a health check or refuses a connection is skipped until a later health check passes.
+    Without healthy replicas reads go to the primary.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        health_check_interval: float = config.DB_REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+        health_check_timeout: float = config.DB_REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS,
+        engine_factory: Callable[..., AsyncEngine] = create_engine,
+    ):
+        self.replicas: List[Replica] = [Replica(url, engine_factory) for url in urls]
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.primary_reads: int = 0
+        self._next: int = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        healthy_replicas: List[Replica] = [replica for replica in self.replicas if replica.healthy]
+
+        if not healthy_replicas:
+            self.primary_reads += 1
+            return None
+
+        self._next = (self._next + 1) % len(healthy_replicas)
+        replica: Replica = healthy_replicas[self._next]
+        replica.reads += 1
+
+        return replica
+
+    def mark_unhealthy(self, replica: Replica, error: Exception) -> None:
+        if replica.healthy:
+            logger.warning("Read replica %s is unavailable, reading from the primary: %r", replica.name, error)
+
+        replica.healthy = False
+        replica.failures += 1
+
+    def mark_healthy(self, replica: Replica) -> None:
+        if not replica.healthy:
+            logger.info("Read replica %s is available again", replica.name)
+
+        replica.healthy = True
+
+    async def connect(self, replica: Replica, session: AsyncSession) -> bool:
+        """Check out the connection of a replica session, return False and mark the replica unhealthy if it fails."""
+        try:
+            async with asyncio.timeout(self.health_check_timeout):
+                await session.connection()
+        except CONNECTION_ERRORS as e:
+            self.mark_unhealthy(replica, e)
+            await session.close()
+            return False
+
+        return True
+
+    async def check(self, replica: Replica) -> bool:
+        try:
+            async with asyncio.timeout(self.health_check_timeout):
+                async with replica.engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+        except CONNECTION_ERRORS as e:
+            self.mark_unhealthy(replica, e)
+            return False
+
+        self.mark_healthy(replica)
+        return True
+
+    async def run_health_checks(self) -> None:
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(self.health_check_interval)
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> Dict:
+        return {
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "healthy": replica.healthy,
+                    "reads": replica.reads,
+                    "failures": replica.failures,
+                    "pool": replica.engine.pool.stats(),
+                }
+                for replica in self.replicas
+            ],
+            "primary_reads": self.primary_reads,
+        }
+
+
+class RecentWrites:
+    """Users who have written in the last 'window_seconds'. Their reads go to the primary, so they see their writes.
+
+    The marks are kept in Redis, so they are shared by all workers. If Redis is unavailable, reads go to the primary.
+    """
+
+    key_prefix = "recent_write:"  # noqa: S105
+
+    def __init__(
+        self, redis_client: Optional[Redis] = None, window_seconds: float = config.DB_READ_YOUR_WRITES_SECONDS
+    ):
+        self.redis_client = redis_client
+        self.window_seconds = window_seconds
+
+    def get_redis_client(self) -> Redis:
+        return self.redis_client if self.redis_client is not None else get_redis_client()
+
+    async def mark(self, user_id: uuid.UUID) -> None:
+        try:
+            await self.get_redis_client().set(f"{self.key_prefix}{user_id}", 1, px=int(self.window_seconds * 1000))
+        except RedisError as e:
+            logger.error(e)
+
+    async def is_recent(self, user_id: uuid.UUID) -> bool:
+        try:
+            return bool(await self.get_redis_client().exists(f"{self.key_prefix}{user_id}"))
+        except RedisError as e:
+            logger.error(e)
+            return True
+
+
+replica_set = ReplicaSet(config.DB_REPLICA_URLS)
+recent_writes = RecentWrites()
@@ -0,0 +1,194 @@
+import contextlib
+import uuid
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from user_management.database.db_settings import async_session_maker, engine
+from user_management.database.replicas import Replica, recent_writes, replica_set
+
+
+class CheckoutStats:
+    """Pool connection checkouts per request, aggregated by route."""
+
+    def __init__(self):
+        self.routes: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, checkouts: int) -> None:
+        route_stats: Dict[str, int] = self.routes.setdefault(route, {"requests": 0, "checkouts": 0, "max_checkouts": 0})
+        route_stats["requests"] += 1
+        route_stats["checkouts"] += checkouts
+        route_stats["max_checkouts"] = max(route_stats["max_checkouts"], checkouts)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {route: dict(route_stats) for route, route_stats in self.routes.items()}
+
+
+checkout_stats = CheckoutStats()
+
+
+class UnitOfWork:
+    """The sessions shared by the managers used while a request is handled.
+
+    A session checks out a pool connection on its first statement and gives it back when its transaction ends,
+    that is when a manager commits a write or when a scope which only read exits. The connection is therefore
+    not held while the handler awaits other work, like password hashing or an upload, between two scopes.
+    """
+
+    def __init__(self, route: str, session_maker: async_sessionmaker = async_session_maker):
+        self.route = route
+        self.session_maker = session_maker
+        self.session: Optional[AsyncSession] = None
+        self.replica_sessions: Dict[Replica, AsyncSession] = {}
+        self.in_use: bool = False
+        self.checkouts: int = 0
+        self.user_id: Optional[uuid.UUID] = None
+        self.wrote: bool = False
+        self.releasing: bool = False
+        self.recent_writer: Optional[bool] = None
+
+    def get_primary_session(self) -> AsyncSession:
+        if self.session is None:
+            self.session = self.session_maker()
+            event.listen(self.session.sync_session, "after_commit", self.on_commit)
+
+        return self.session
+
+    def on_commit(self, session) -> None:
+        if not self.releasing:
+            self.wrote = True
+
+    async def release(self, session: AsyncSession) -> None:
+        """End the transaction left open by reads, which gives the connection back to the pool.
+
+        It is committed rather than rolled back, because a rollback would expire the objects which were loaded.
+        """
+        if not session.in_transaction():
+            return
+
+        self.releasing = True
+        try:
+            await session.commit()
+        finally:
+            self.releasing = False
+
+    async def get_session(self, replica: Optional[Replica] = None) -> AsyncSession:
+        if replica is None:
+            return self.get_primary_session()
+
+        session: Optional[AsyncSession] = self.replica_sessions.get(replica)
+        if session is None:
+            session = replica.session_maker()
+            if not await replica_set.connect(replica, session):
+                return self.get_primary_session()
+            self.replica_sessions[replica] = session
+
+        return session
+
+    @contextlib.asynccontextmanager
+    async def use(self, replica: Optional[Replica] = None) -> AsyncIterator[AsyncSession]:
+        self.in_use = True
+        try:
+            session: AsyncSession = await self.get_session(replica)
+            try:
+                yield session
+            except Exception:
+                await session.rollback()
+                raise
+            await self.release(session)
+        finally:
+            self.in_use = False
+
+    async def close(self) -> None:
+        for session in filter(None, (self.session, *self.replica_sessions.values())):
+            await session.close()
+
+        if self.wrote and self.user_id is not None and replica_set.enabled:
+            await recent_writes.mark(self.user_id)
+
+        checkout_stats.record(self.route, self.checkouts)
+
+    async def __aenter__(self) -> "UnitOfWork":
+        current_unit_of_work.set(self)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        current_unit_of_work.set(None)
+        await self.close()
+
+
+current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar("current_unit_of_work", default=None)
+
+
+def set_request_user(user_id: uuid.UUID) -> None:
+    """Remember the authenticated user of the request, whose writes make its later reads go to the primary."""
+    unit_of_work: Optional[UnitOfWork] = current_unit_of_work.get()
+    if unit_of_work is not None:
+        unit_of_work.user_id = user_id
+
+
+async def choose_replica(unit_of_work: Optional[UnitOfWork]) -> Optional[Replica]:
+    """Return a replica to read from, or None to read from the primary.
+
+    Reads go to the primary after the request has written, and for a while after a write by the same user.
+    """
+    if not replica_set.enabled:
+        return None
+
+    if unit_of_work is not None:
+        if unit_of_work.wrote:
+            return None
+
+        if unit_of_work.user_id is not None:
+            if unit_of_work.recent_writer is None:
+                unit_of_work.recent_writer = await recent_writes.is_recent(unit_of_work.user_id)
+            if unit_of_work.recent_writer:
+                return None
+
+    return replica_set.choose()
+
+
+@contextlib.asynccontextmanager
+async def open_session(replica: Optional[Replica] = None) -> AsyncIterator[AsyncSession]:
+    if replica is not None:
+        session: AsyncSession = replica.session_maker()
+        if await replica_set.connect(replica, session):
+            async with session:
+                yield session
+            return
+
+    async with async_session_maker() as session:
+        yield session
+
+
+@contextlib.asynccontextmanager
+async def session_scope(replica: bool = False) -> AsyncIterator[AsyncSession]:
+    """Yield the session of the current unit of work, or a new session outside of a request.
+
+    A session can not run statements concurrently, so while the request session is in use, for example by another
+    branch of asyncio.gather, a separate session is opened. With 'replica' the statements, which must only read,
+    may run on a read replica (see choose_replica), falling back to the primary if it can not be connected to.
+    """
+    unit_of_work: Optional[UnitOfWork] = current_unit_of_work.get()
+    chosen_replica: Optional[Replica] = await choose_replica(unit_of_work) if replica else None
+
+    if unit_of_work is None or unit_of_work.in_use:
+        async with open_session(chosen_replica) as session:
+            yield session
+        return
+
+    async with unit_of_work.use(chosen_replica) as session:
+        yield session
+
+
+def count_checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    # the async driver runs pool events in a greenlet that shares the context of the calling task
+    unit_of_work: Optional[UnitOfWork] = current_unit_of_work.get()
+    if unit_of_work is not None:
+        unit_of_work.checkouts += 1
+
+
+for counted_engine in (engine, *(replica.engine for replica in replica_set.replicas)):
+    event.listen(counted_engine.sync_engine, "checkout", count_checkout)
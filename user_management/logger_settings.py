@@ -1,12 +1,122 @@
+import atexit
+import datetime
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import time
+from typing import Dict, List, Tuple
 
-logger = logging.getLogger("logger")
-logger.setLevel(logging.DEBUG)
+from user_management.config import config
+
+# attributes of every log record, the other attributes come from the 'extra' argument of a logging call
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one JSON object per line, with the fields passed in 'extra' as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:  # noqa: A003
+        entry: Dict = {
+            "time": datetime.datetime.fromtimestamp(record.created, tz=config.get_timezone()).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Roll the file over when it reaches 'max_bytes' or when 'interval_seconds' have passed since the last rollover."""
+
+    def __init__(self, filename: str, max_bytes: int, interval_seconds: float, backup_count: int):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval_seconds = interval_seconds
+        self.rollover_at: float = time.time() + interval_seconds
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval_seconds > 0 and time.time() >= self.rollover_at:
+            return True
+
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval_seconds
+
+
+class RouteSamplingFilter(logging.Filter):
+    """Keep only a share of the records of a route, e.g. {"GET /um/healthcheck": 0.01}.
+
+    The route is the 'route' field of the record. Warnings and errors are always kept.
+    """
 
-fh = logging.FileHandler("info.log")
-fh.setLevel(logging.DEBUG)
+    def __init__(self, sample_rates: Dict[str, float]):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record: logging.LogRecord) -> bool:  # noqa: A003
+        sample_rate = self.sample_rates.get(getattr(record, "route", None))
+        if sample_rate is None or record.levelno >= logging.WARNING:
+            return True
+
+        return random.random() < sample_rate  # noqa: S311
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Put records on a queue, they are formatted and written by the thread of a QueueListener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # the message is merged with its arguments now, they may change before the record is written;
+        # the traceback is kept as text for the formatter of the writing handler
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+def create_file_handler(filename: str = config.LOG_FILE) -> logging.Handler:
+    handler = SizeAndTimeRotatingFileHandler(
+        filename,
+        max_bytes=config.LOG_FILE_MAX_BYTES,
+        interval_seconds=config.LOG_FILE_ROTATION_INTERVAL_SECONDS,
+        backup_count=config.LOG_FILE_BACKUP_COUNT,
+    )
+    if config.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    return handler
+
+
+def create_queue_handler(handlers: List[logging.Handler]) -> Tuple[logging.Handler, logging.handlers.QueueListener]:
+    """Return a handler which only enqueues records and the listener writing them to 'handlers' in its thread."""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    queue_handler.addFilter(RouteSamplingFilter(config.LOG_ROUTE_SAMPLE_RATES))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+    return queue_handler, listener
+
+
+logger = logging.getLogger("logger")
+logger.setLevel(config.LOG_LEVEL)
 
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-fh.setFormatter(formatter)
+queue_handler, queue_listener = create_queue_handler([create_file_handler()])
+logger.addHandler(queue_handler)
 
-logger.addHandler(fh)
+queue_listener.start()
+atexit.register(queue_listener.stop)
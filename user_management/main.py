@@ -1,14 +1,74 @@
+import asyncio
+import contextlib
+from typing import AsyncIterator, Optional
+
 from botocore.exceptions import EndpointConnectionError
-from fastapi import FastAPI, Request, status
+from fastapi import Depends, FastAPI, Request, status
 from fastapi.responses import JSONResponse, Response
+from redis import asyncio as aioredis
 from starlette.middleware.cors import CORSMiddleware
 
 from user_management.api.auth.routes import auth_router
+from user_management.api.groups.routes import group_router
+from user_management.api.profiling.routes import profiling_router
 from user_management.api.users.routes import user_router
+from user_management.api.utils.dependencies import admin_user, metrics_scraper
+from user_management.api.utils.hashers import password_hashing_pool
+from user_management.api.utils.principal_cache import principal_cache
+from user_management.api.utils.profiling import ProfilingMiddleware
+from user_management.api.utils.request_logging import RequestLoggingMiddleware
+from user_management.api.utils.request_metrics import RequestMetricsMiddleware
+from user_management.api.utils.request_tracing import RequestTracingMiddleware
 from user_management.config import config
+from user_management.database.db_settings import get_db_pool_stats
+from user_management.database.replicas import replica_set
+from user_management.database.unit_of_work import checkout_stats
 from user_management.logger_settings import logger
+from user_management.metrics.aggregation import WorkerMetrics
+from user_management.metrics.instruments import registry
+from user_management.rabbit.outbox_relay import outbox_relay
+from user_management.rabbit.settings import pika_client
+from user_management.redis_settings import close_redis_pool, get_redis_pool, get_redis_pool_stats
+from user_management.tracing import tracer
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    get_redis_pool()
+    await pika_client.start()
+    relay: Optional[asyncio.Task] = asyncio.create_task(outbox_relay.run()) if config.OUTBOX_RELAY_ENABLED else None
+    replica_health_checks: Optional[asyncio.Task] = (
+        asyncio.create_task(replica_set.run_health_checks()) if replica_set.enabled else None
+    )
+
+    # the subscription needs a connection without socket timeout, so it does not come from the shared pool
+    subscriber_redis_client: aioredis.Redis = aioredis.from_url(
+        config.redis_url, health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL
+    )
+    invalidation_listener: asyncio.Task = asyncio.create_task(
+        principal_cache.listen_for_invalidations(subscriber_redis_client)
+    )
+    metrics_pusher: asyncio.Task = asyncio.create_task(worker_metrics.run())
+
+    yield
 
-app = FastAPI(docs_url="/um")
+    for task in filter(None, (invalidation_listener, relay, replica_health_checks, metrics_pusher)):
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    await worker_metrics.remove()
+
+    await pika_client.close()
+    await replica_set.dispose()
+    await subscriber_redis_client.aclose()
+    await close_redis_pool()
+    password_hashing_pool.shutdown()
+    tracer.shutdown()
+
+
+app = FastAPI(docs_url="/um", lifespan=lifespan)
+worker_metrics = WorkerMetrics(registry)
 
 
 @app.get("/um/healthcheck")
@@ -16,8 +76,32 @@ async def healthcheck():
     return JSONResponse(status_code=200, content={"status": "healthy"})
 
 
+@app.get("/um/stats", dependencies=[Depends(admin_user)])
+async def stats():
+    return JSONResponse(
+        status_code=200,
+        content={
+            "principal_cache": principal_cache.stats(),
+            "password_hashing": password_hashing_pool.stats(),
+            "redis_pool": get_redis_pool_stats(),
+            "rabbitmq_publisher": pika_client.stats(),
+            "outbox_relay": outbox_relay.stats(),
+            "db_pool": get_db_pool_stats(),
+            "db_checkouts_per_route": checkout_stats.stats(),
+            "db_replicas": replica_set.stats(),
+        },
+    )
+
+
+@app.get("/um/metrics", dependencies=[Depends(metrics_scraper)])
+async def metrics():
+    return Response(content=registry.render(await worker_metrics.collect()), media_type=registry.content_type)
+
+
 app.include_router(auth_router)
 app.include_router(user_router)
+app.include_router(group_router)
+app.include_router(profiling_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,26 +110,12 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE"],
     allow_headers=["*"],
 )
-
-
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    logger.info(f"Received request: {request.method} {request.url} {request.headers}")
-
-    response = await call_next(request)
-
-    response_body: bytes = b""
-
-    async for chunk in response.body_iterator:
-        response_body += chunk
-
-    logger.info(f"Sent response: status_code: {response.status_code}, body: {response_body}\n")
-
-    return Response(
-        status_code=response.status_code,
-        content=response_body,
-        headers=dict(response.headers),
-    )
+# every request is measured and traced, including the ones which match no route
+app.add_middleware(RequestMetricsMiddleware)
+app.add_middleware(RequestTracingMiddleware)
+# the request log includes the time spent profiling
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestLoggingMiddleware)
 
 
 @app.exception_handler(EndpointConnectionError)
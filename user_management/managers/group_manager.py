@@ -0,0 +1,16 @@
+from typing import Optional
+
+from user_management.database.models import Group
+from user_management.database.unit_of_work import session_scope
+from user_management.metrics.instruments import db_operation
+
+
+class GroupManager:
+    """A class for managing group-related data in a database."""
+
+    model = Group
+
+    @db_operation
+    async def get_by_id(self, group_id: int) -> Optional[Group]:
+        async with session_scope() as session:
+            return await session.get(self.model, group_id)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import EmailStr
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import Update
+from sqlalchemy.sql.selectable import Select
+
+from user_management.api.utils.hashers import ResetPasswordTokenHasher
+from user_management.config import config
+from user_management.database.models import OutboxMessage
+from user_management.database.unit_of_work import session_scope
+from user_management.rabbit.settings import PikaClient, PublishError
+from user_management.tracing import get_current_traceparent
+
+
+class OutboxManager:
+    """A class for writing messages to the outbox table and relaying them to RabbitMQ."""
+
+    model = OutboxMessage
+    reset_password_token_hasher = ResetPasswordTokenHasher()
+
+    @staticmethod
+    def get_publish_datetime() -> str:
+        return datetime.now(tz=config.get_timezone()).isoformat()
+
+    def create_message(self, queue_name: str, body: Dict, headers: Optional[Dict] = None) -> OutboxMessage:
+        # the trace context of the change, continued when the relay publishes the message
+        traceparent: Optional[str] = get_current_traceparent()
+        if traceparent is not None:
+            headers = {**(headers or {}), "traceparent": traceparent}
+
+        return self.model(queue_name=queue_name, body=json.dumps(body), headers=headers)
+
+    def create_password_reset_message(
+        self, email: EmailStr, user_id: uuid.UUID, token_seed: str, expires_at: datetime
+    ) -> OutboxMessage:
+        """Return a message for the password reset queue, whose url is built from the seed when it is published.
+
+        The token can only be derived from the seed with the secret key, so the table does not hold a usable token,
+        and the message is dropped instead of published once the token has expired.
+        """
+        return self.create_message(
+            queue_name=config.RABBITMQ_QUEUE,
+            body={
+                "user_id": str(user_id),
+                "token_seed": token_seed,
+                "expires_at": expires_at.isoformat(),
+                "publish_datetime": self.get_publish_datetime(),
+            },
+            headers={"email": f"{email}"},
+        )
+
+    @staticmethod
+    def get_password_reset_url(token: str) -> str:
+        url: str = f"{config.WEBAPP_HOST}/password/reset/{token}"
+        return url
+
+    def render_body(self, message: OutboxMessage) -> Optional[bytes]:
+        """Return the body to publish, or None if the message has expired and should be dropped."""
+        body: Dict = json.loads(message.body)
+        token_seed: Optional[str] = body.pop("token_seed", None)
+        if token_seed is None:
+            return message.body.encode()
+
+        if datetime.fromisoformat(body.pop("expires_at")) <= datetime.now(tz=config.get_timezone()):
+            return None
+
+        body["reset_url"] = self.get_password_reset_url(self.reset_password_token_hasher.derive_token(token_seed))
+        return json.dumps(body).encode()
+
+    def create_user_event_message(self, event: str, user_id: uuid.UUID, **fields) -> Optional[OutboxMessage]:
+        """Return a message for the user events queue, or None if publishing user events is not configured."""
+        if not config.RABBITMQ_USER_EVENTS_QUEUE:
+            return None
+
+        body: Dict = {"event": event, "user_id": str(user_id), "publish_datetime": self.get_publish_datetime()}
+        body.update(fields)
+
+        return self.create_message(queue_name=config.RABBITMQ_USER_EVENTS_QUEUE, body=body, headers={"event": event})
+
+    async def add_message(self, message: OutboxMessage) -> None:
+        async with session_scope() as session:
+            session.add(message)
+            await session.commit()
+
+    @staticmethod
+    def is_confirmed(future: asyncio.Future) -> bool:
+        return future.done() and not future.cancelled() and future.exception() is None
+
+    def get_claim_statement(self, batch_size: int, claim_seconds: float, exclude_ids: List[int]) -> Update:
+        """Return a statement claiming the oldest unclaimed messages, skipping rows locked by other relays."""
+        claimable: Select = (
+            select(self.model.id)
+            .filter(or_(self.model.claimed_until.is_(None), self.model.claimed_until < func.now()))
+            .filter(self.model.id.notin_(exclude_ids))
+            .order_by(self.model.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+
+        return (
+            update(self.model)
+            .filter(self.model.id.in_(claimable.scalar_subquery()))
+            .values(claimed_until=func.now() + timedelta(seconds=claim_seconds))
+            .returning(self.model)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def finish_messages(self, session: AsyncSession, deleted_ids: List[int], released_ids: List[int]) -> None:
+        """Delete the relayed messages and release the claim of the ones to publish again."""
+        if deleted_ids:
+            await session.execute(delete(self.model).filter(self.model.id.in_(deleted_ids)))
+        if released_ids:
+            await session.execute(
+                update(self.model)
+                .filter(self.model.id.in_(released_ids))
+                .values(claimed_until=None)
+                .execution_options(synchronize_session=False)
+            )
+
+    async def relay_batch(
+        self,
+        publisher: PikaClient,
+        batch_size: int,
+        confirm_timeout: float,
+        in_flight: Optional[Dict[int, asyncio.Future]] = None,
+        claim_seconds: float = config.OUTBOX_RELAY_CLAIM_SECONDS,
+    ) -> int:
+        """Publish the oldest messages and delete the ones confirmed by the broker, return how many were relayed.
+
+        A batch is claimed for 'claim_seconds' in a short transaction, locking rows with SKIP LOCKED, so relays
+        running in several replicas take disjoint batches and no transaction is held open while the broker answers.
+        Messages which are not sent within 'confirm_timeout' are withdrawn from the publisher and released for
+        a later batch. Messages which are sent but not confirmed yet can not be withdrawn, so they stay claimed
+        and are kept in 'in_flight' until the broker answers, instead of being published twice. The messages
+        of a relay which stops before finishing its batch are taken by other relays when the claim expires.
+        Password reset messages whose token has expired are deleted without being published.
+        """
+        in_flight = in_flight if in_flight is not None else {}
+        answered: List[Tuple[int, asyncio.Future]] = [item for item in in_flight.items() if item[1].done()]
+        for message_id, _ in answered:
+            del in_flight[message_id]
+        confirmed_ids: List[int] = [message_id for message_id, future in answered if self.is_confirmed(future)]
+        failed_ids: List[int] = [message_id for message_id, future in answered if not self.is_confirmed(future)]
+
+        async with session_scope() as session:
+            await self.finish_messages(session, deleted_ids=confirmed_ids, released_ids=failed_ids)
+            messages: List[OutboxMessage] = sorted(
+                await session.scalars(self.get_claim_statement(batch_size, claim_seconds, list(in_flight))),
+                key=lambda message: message.id,
+            )
+            await session.commit()
+
+        relayed: int = len(confirmed_ids)
+        confirmed_ids, expired_ids = [], []
+        futures: Dict[int, asyncio.Future] = {}
+        for message in messages:
+            body: Optional[bytes] = self.render_body(message)
+            if body is None:
+                expired_ids.append(message.id)
+                continue
+
+            try:
+                future = publisher.publish(message.queue_name, body, message.headers)
+            except PublishError:
+                break
+
+            future.add_done_callback(publisher.log_publish_failure)
+            futures[message.id] = future
+
+        if futures:
+            await asyncio.wait(futures.values(), timeout=confirm_timeout)
+
+        for message_id, future in futures.items():
+            if self.is_confirmed(future):
+                confirmed_ids.append(message_id)
+            elif not future.done() and not publisher.withdraw(future):
+                in_flight[message_id] = future
+
+        finished_ids: List[int] = confirmed_ids + expired_ids
+        released_ids: List[int] = [
+            message.id for message in messages if message.id not in finished_ids and message.id not in in_flight
+        ]
+        if finished_ids or released_ids:
+            async with session_scope() as session:
+                await self.finish_messages(session, deleted_ids=finished_ids, released_ids=released_ids)
+                await session.commit()
+
+        return relayed + len(confirmed_ids)
@@ -0,0 +1,103 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.sql.selectable import Select
+
+from user_management.config import config
+from user_management.database.explain import explain
+from user_management.database.unit_of_work import session_scope
+from user_management.logger_settings import logger
+from user_management.redis_settings import get_redis_client
+
+
+@dataclass(frozen=True, slots=True)
+class UserCount:
+    value: int
+    estimated: bool
+
+
+class UserCounter:
+    """Counts the users matching a list filter, caching the result per (group, filters) in Redis.
+
+    All cached counts are kept in one hash which expires 'cache_ttl_seconds' after it was created and is deleted
+    whenever a user is created, updated or deleted. Counts above 'estimate_threshold' are taken from
+    the planner estimate instead of scanning the table.
+    """
+
+    cache_key = "user_count"
+
+    def __init__(
+        self,
+        redis_client: Optional[Redis] = None,
+        cache_ttl_seconds: int = config.USER_COUNT_CACHE_TTL_SECONDS,
+        estimate_threshold: Optional[int] = config.USER_COUNT_ESTIMATE_THRESHOLD,
+    ):
+        self.redis_client = redis_client
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self.estimate_threshold = estimate_threshold
+
+    def get_redis_client(self) -> Redis:
+        return self.redis_client if self.redis_client is not None else get_redis_client()
+
+    @staticmethod
+    def get_cache_field(
+        name: Optional[str] = None, group_id: Optional[int] = None, search: Optional[str] = None
+    ) -> str:
+        filter_hash: str = hashlib.sha256(json.dumps([name, search]).encode()).hexdigest()
+        return f"{'*' if group_id is None else group_id}:{filter_hash}"
+
+    async def count(self, query: Select, cache_field: str) -> UserCount:
+        """Count the rows of 'query', which should select only the primary key with the list filters applied."""
+        user_count: Optional[UserCount] = await self.get_cached(cache_field)
+
+        if user_count is None:
+            user_count = await self.count_in_database(query)
+            await self.cache(cache_field, user_count)
+
+        return user_count
+
+    async def count_in_database(self, query: Select) -> UserCount:
+        async with session_scope(replica=True) as session:
+            if self.estimate_threshold is not None:
+                estimate: int = int((await explain(session, query))["Plan Rows"])
+                if estimate >= self.estimate_threshold:
+                    return UserCount(value=estimate, estimated=True)
+
+            value: int = await session.scalar(select(func.count()).select_from(query.subquery()))
+
+        return UserCount(value=value, estimated=False)
+
+    async def get_cached(self, cache_field: str) -> Optional[UserCount]:
+        try:
+            cached: Optional[bytes] = await self.get_redis_client().hget(self.cache_key, cache_field)
+        except RedisError as e:
+            logger.error(e)
+            return None
+
+        if cached is None:
+            return None
+
+        value, estimated = cached.decode().split(":")
+        return UserCount(value=int(value), estimated=estimated == "1")
+
+    async def cache(self, cache_field: str, user_count: UserCount) -> None:
+        mapping: Dict[str, str] = {cache_field: f"{user_count.value}:{int(user_count.estimated)}"}
+
+        try:
+            async with self.get_redis_client().pipeline(transaction=True) as pipe:
+                pipe.hset(self.cache_key, mapping=mapping)
+                pipe.expire(self.cache_key, self.cache_ttl_seconds, nx=True)
+                await pipe.execute()
+        except RedisError as e:
+            logger.error(e)
+
+    async def invalidate(self) -> None:
+        try:
+            await self.get_redis_client().delete(self.cache_key)
+        except RedisError as e:
+            logger.error(e)
@@ -1,17 +1,26 @@
-import datetime
+import asyncio
+import re
 import uuid
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from pydantic import EmailStr
-from sqlalchemy import delete, desc, func, or_, select
+from sqlalchemy import delete, desc, func, insert, literal, literal_column, or_, select, tuple_, union, update
 from sqlalchemy.engine import ScalarResult
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import aliased, defer
+from sqlalchemy.sql.dml import Insert, Update
+from sqlalchemy.sql.elements import ColumnElement
 from sqlalchemy.sql.selectable import Select
 
+from user_management.api.utils.exceptions import VersionConflictError
 from user_management.api.utils.hashers import PasswordHasher
-from user_management.config import config
-from user_management.database.db_settings import async_session_maker
-from user_management.database.models import User
+from user_management.api.utils.principal_cache import Principal, principal_cache
+from user_management.database.identifiers import generate_user_id
+from user_management.database.models import OutboxMessage, User
+from user_management.database.unit_of_work import session_scope
+from user_management.managers.outbox_manager import OutboxManager
+from user_management.managers.user_counter import UserCount, UserCounter
+from user_management.metrics.instruments import db_operation
 
 
 class UserManager:
@@ -19,28 +28,105 @@ class UserManager:
 
     model = User
     password_hasher = PasswordHasher()
-
+    outbox_manager = OutboxManager()
+    user_counter = UserCounter()
+
+    # read paths load the columns of UserReadModel, only the login lookup needs the password hash
+    read_options = (defer(User.password, raiseload=True),)
+
+    phone_number_pattern = re.compile(r"\+?\d[\d\s()-]{3,}")
+
+    # normalized login identifiers, each has a functional index
+    login_keys: Dict[str, ColumnElement] = {
+        "username": func.lower(User.username),
+        "email": func.lower(User.email),
+        "phone_number": func.regexp_replace(
+            User.phone_number, literal_column("'[^0-9]'"), literal_column("''"), literal_column("'g'")
+        ),
+    }
+
+    def detect_login_identifier_type(self, identifier: str) -> str:
+        if "@" in identifier:
+            return "email"
+
+        if self.phone_number_pattern.fullmatch(identifier):
+            return "phone_number"
+
+        return "username"
+
+    @staticmethod
+    def normalize_login_identifier(identifier: str, identifier_type: str) -> str:
+        if identifier_type == "phone_number":
+            return re.sub(r"\D", "", identifier)
+
+        return identifier.lower()
+
+    def get_login_query(self, identifier: str, identifier_type: str) -> Select:
+        """Probe the index of one identifier type. A case-sensitive exact match comes first."""
+        key: ColumnElement = self.login_keys[identifier_type]
+        exact_match: ColumnElement = getattr(self.model, identifier_type) == identifier
+
+        return (
+            select(self.model)
+            .filter(key == self.normalize_login_identifier(identifier, identifier_type))
+            .order_by(desc(exact_match))
+            .limit(2)
+        )
+
+    def get_login_union_query(self, identifier: str) -> Select:
+        """Probe the indexes of all identifier types, combined with UNION instead of OR."""
+        user_ids = union(
+            *(
+                select(self.model.user_id).filter(key == self.normalize_login_identifier(identifier, identifier_type))
+                for identifier_type, key in self.login_keys.items()
+            )
+        )
+        exact_match: ColumnElement = or_(
+            self.model.username == identifier, self.model.email == identifier, self.model.phone_number == identifier
+        )
+
+        return (
+            select(self.model)
+            .filter(self.model.user_id.in_(user_ids.scalar_subquery()))
+            .order_by(desc(exact_match))
+            .limit(2)
+        )
+
+    @staticmethod
+    def pick_login_match(users: List[User], identifier: str) -> Optional[User]:
+        """Return the only match, or the exact match if identifiers differ only in case, None if it is ambiguous."""
+        if len(users) == 1:
+            return users[0]
+
+        for user in users:
+            if identifier in (user.username, user.email, user.phone_number):
+                return user
+
+        return None
+
+    @db_operation
     async def get_by_username(self, username: str) -> Optional[User]:
-        """Retrieve a user from the database based on the provided username, phone_number or email."""
-        async with async_session_maker() as session:
-            try:
-                user = await session.scalar(
-                    select(self.model).filter(
-                        or_(
-                            User.username == username,
-                            User.phone_number == username,
-                            User.email == username,
-                        )
-                    )
-                )
+        """Retrieve a user by username, phone_number or email, ignoring case and phone number formatting.
 
-            except NoResultFound:
-                user = None
+        The type of the identifier is guessed from its format and only that index is probed. Usernames may look
+        like an email or a phone number, so if that finds nobody, all identifier indexes are probed at once.
+        The user is read from the primary, so a changed password or a block applies to the next login.
+        """
+        identifier_type: str = self.detect_login_identifier_type(username)
 
-        return user
+        async with session_scope() as session:
+            users: List[User] = list(
+                (await session.scalars(self.get_login_query(username, identifier_type))).unique().all()
+            )
+
+            if not users and identifier_type != "username":
+                users = list((await session.scalars(self.get_login_union_query(username))).unique().all())
+
+        return self.pick_login_match(users, username)
 
+    @db_operation
     async def get_by_email(self, email: EmailStr) -> Optional[User]:
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             try:
                 user = await session.scalar(select(self.model).filter_by(email=email))
             except NoResultFound:
@@ -48,16 +134,123 @@ class UserManager:
 
         return user
 
+    @db_operation
     async def get_by_id(self, user_id: uuid.UUID) -> Optional[User]:
-        async with async_session_maker() as session:
+        async with session_scope(replica=True) as session:
             try:
-                user = await session.get(self.model, user_id)
+                user = await session.get(self.model, user_id, options=self.read_options)
 
             except NoResultFound:
                 user = None
 
         return user
 
+    @db_operation
+    async def get_username(self, user_id: uuid.UUID) -> Optional[str]:
+        async with session_scope() as session:
+            return await session.scalar(select(self.model.username).filter_by(user_id=user_id))
+
+    @db_operation
+    async def get_principal(self, user_id: uuid.UUID) -> Optional[Principal]:
+        """Retrieve only the fields of a user needed for authorization, going through the principal cache."""
+        principal: Optional[Principal] = principal_cache.get(user_id)
+        if principal is not None:
+            return principal
+
+        cache_version: int = principal_cache.version
+        query: Select = select(
+            self.model.user_id, self.model.role, self.model.group_id, self.model.is_blocked
+        ).filter_by(user_id=user_id)
+
+        async with session_scope() as session:
+            row = (await session.execute(query)).first()
+
+        if row is None:
+            return None
+
+        principal = Principal(user_id=row.user_id, role=row.role, group_id=row.group_id, is_blocked=row.is_blocked)
+        principal_cache.put(principal, version=cache_version)
+
+        return principal
+
+    sort_keys: Dict[str, ColumnElement] = {
+        "username": User.username,
+        "email": User.email,
+        "phone_number": User.phone_number,
+        "name": func.coalesce(User.name, literal_column("''")),
+        "surname": func.coalesce(User.surname, literal_column("''")),
+        "role": User.role,
+        "created_at": User.created_at,
+        "modified_at": User.modified_at,
+    }
+
+    # offset pagination can also be ordered by the other columns, except these
+    unsortable_fields = ("password",)
+
+    def get_sort_key(self, sort_field: str) -> Optional[ColumnElement]:
+        """Return the expression a list is ordered by, or None if it can not be ordered by the field.
+
+        Keyset pagination only uses the fields of 'sort_keys', whose nullable columns are coalesced so keyset
+        comparisons work.
+        """
+        if sort_field in self.sort_keys:
+            return self.sort_keys[sort_field]
+
+        if sort_field in self.unsortable_fields:
+            return None
+
+        return self.model.__table__.columns.get(sort_field)
+
+    def get_sort_value(self, user: User, sort_field: str) -> Any:
+        value: Any = getattr(user, sort_field)
+        return "" if value is None else value
+
+    search_fields = (User.name, User.surname, User.username, User.email)
+
+    @staticmethod
+    def escape_like(value: str) -> str:
+        return value.replace("/", "//").replace("%", "/%").replace("_", "/_")
+
+    def get_search_condition(self, search: str) -> ColumnElement:
+        """Match a substring or a similar word in any search field. Both operators can use the trigram indexes."""
+        pattern: str = f"%{self.escape_like(search)}%"
+
+        return or_(*(or_(field.ilike(pattern, escape="/"), field.op("%")(search)) for field in self.search_fields))
+
+    def get_search_rank(self, search: str) -> ColumnElement:
+        # greatest() skips the NULL similarity of an empty name or surname
+        return func.greatest(*(func.similarity(field, search) for field in self.search_fields))
+
+    def select_users(self) -> Select:
+        return select(self.model).options(*self.read_options)
+
+    def filter_user_list(
+        self,
+        query: Select,
+        name: Optional[str] = None,
+        group_id: Optional[int] = None,
+        search: Optional[str] = None,
+    ) -> Select:
+        if name:
+            query = query.filter(self.model.name.ilike(f"%{name}%"))
+
+        if search:
+            query = query.filter(self.get_search_condition(search))
+
+        if group_id is not None:
+            query = query.filter(self.model.group_id == group_id)
+
+        return query
+
+    def order_user_list(self, query: Select, sort_field: str, ord_direction: str) -> Select:
+        sort_key: ColumnElement = self.get_sort_key(sort_field)
+
+        if ord_direction == "desc":
+            return query.order_by(desc(sort_key), desc(self.model.user_id))
+
+        return query.order_by(sort_key, self.model.user_id)
+
+    @db_operation
     async def get_all(
         self,
         offset: int,
@@ -65,72 +258,187 @@ class UserManager:
         name: Optional[str] = None,
         sort_field: Optional[str] = None,
         ord_direction: str = "asc",
-        moderator: Optional[User] = None,
+        group_id: Optional[int] = None,
+        search: Optional[str] = None,
     ) -> Dict:
-        query: Select = select(self.model).limit(limit=limit).offset(offset=offset)
-        total_count_query: Select = select(func.count()).select_from(self.model)
+        """Return a page of users and their total count. Search results are ordered by similarity to 'search'."""
+        query: Select = self.filter_user_list(self.select_users(), name=name, group_id=group_id, search=search)
+        query = query.limit(limit=limit).offset(offset=offset)
 
-        if sort_field:
-            query = query.order_by(desc(sort_field)) if ord_direction == "desc" else query.order_by(sort_field)
+        if search:
+            query = query.order_by(desc(self.get_search_rank(search)), self.model.user_id)
+        elif sort_field:
+            query = self.order_user_list(query, sort_field=sort_field, ord_direction=ord_direction)
 
-        if name:
-            query = query.filter(self.model.name.ilike(f"%{name}%"))
+        # the page and the count use separate sessions, so they run concurrently on two connections
+        users, user_count = await asyncio.gather(
+            self.fetch_users(query), self.count_users(name=name, group_id=group_id, search=search)
+        )
+
+        result: Dict = {"total_count": user_count.value, "total_count_estimated": user_count.estimated, "users": users}
 
-        if moderator:
-            query = query.filter(self.model.group_id == moderator.group.group_id)
-            total_count_query = total_count_query.filter(self.model.group_id == moderator.group_id)
+        return result
 
-        async with async_session_maker() as session:
+    @db_operation
+    async def fetch_users(self, query: Select) -> List[User]:
+        async with session_scope(replica=True) as session:
             users: ScalarResult = await session.scalars(query)
-            total_count: int = await session.scalar(total_count_query)
+            return list(users.unique().all())
 
-        result: Dict = {"total_count": total_count, "users": users.unique().all()}
+    @db_operation
+    async def count_users(
+        self, name: Optional[str] = None, group_id: Optional[int] = None, search: Optional[str] = None
+    ) -> UserCount:
+        query: Select = self.filter_user_list(select(self.model.user_id), name=name, group_id=group_id, search=search)
+        cache_field: str = self.user_counter.get_cache_field(name=name, group_id=group_id, search=search)
 
-        return result
+        return await self.user_counter.count(query, cache_field=cache_field)
+
+    @db_operation
+    async def get_page_after(
+        self,
+        limit: int,
+        sort_field: str,
+        ord_direction: str = "asc",
+        after: Optional[Tuple[Any, uuid.UUID]] = None,
+        name: Optional[str] = None,
+        group_id: Optional[int] = None,
+    ) -> Dict:
+        """Return up to 'limit' users following the (sort value, user_id) position 'after'.
+
+        The position is compared as a row value against an index on (sort key, user_id), so the cost of a page
+        does not depend on how deep it is. 'next' is the position of the last user, or None on the last page.
+        """
+        sort_key: ColumnElement = self.get_sort_key(sort_field)
+        query: Select = self.filter_user_list(self.select_users(), name=name, group_id=group_id)
+        query = self.order_user_list(query, sort_field=sort_field, ord_direction=ord_direction).limit(limit + 1)
+
+        if after is not None:
+            value, user_id = after
+            position = tuple_(sort_key, self.model.user_id)
+            cursor = tuple_(literal(value, sort_key.type), literal(user_id, self.model.user_id.type))
+            query = query.filter(position < cursor if ord_direction == "desc" else position > cursor)
+
+        users: List[User] = await self.fetch_users(query)
+
+        next_position: Optional[Tuple[Any, uuid.UUID]] = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_position = (self.get_sort_value(users[-1], sort_field), users[-1].user_id)
 
+        return {"users": users, "next": next_position}
+
+    def get_insert_query(self, user_data: Dict) -> Insert:
+        # the columns set by the database, like created_at, come back with the row, without a refresh
+        return insert(self.model).values(**user_data).returning(self.model)
+
+    @db_operation
     async def create_user(self, user_data: Dict) -> User:
         password = user_data.pop("password")
 
-        hashed_password = self.password_hasher.hash_password(password)
+        hashed_password = await self.password_hasher.hash_password_async(password)
         user_data["password"] = hashed_password
 
-        user = self.model(**user_data)
+        user_data["user_id"] = generate_user_id()
+        event: Optional[OutboxMessage] = self.outbox_manager.create_user_event_message(
+            "user_created", user_id=user_data["user_id"], username=user_data["username"], email=user_data["email"]
+        )
 
-        async with async_session_maker() as session:
-            session.add(user)
+        async with session_scope() as session:
+            user: User = await session.scalar(self.get_insert_query(user_data))
+            if event is not None:
+                session.add(event)
             await session.commit()
 
+        await self.user_counter.invalidate()
+
         return user
 
-    async def update_user(self, user_id: uuid.UUID, user_data: Dict) -> Optional[User]:
-        user: User = await self.get_by_id(user_id)
+    @db_operation
+    async def update_user(
+        self, user_id: uuid.UUID, user_data: Dict, expected_versions: Optional[List[int]] = None
+    ) -> Optional[User]:
+        """Update a user with one UPDATE ... RETURNING, joined with the group of the updated row.
 
+        With 'expected_versions' the row is only updated if its version is one of them, and VersionConflictError
+        is raised if the user exists with another version. Returns None if the user does not exist.
+        """
         if "password" in user_data:
             password = user_data.pop("password")
 
-            hashed_password = self.password_hasher.hash_password(password)
+            hashed_password = await self.password_hasher.hash_password_async(password)
             user_data["password"] = hashed_password
 
-        if user is None:
-            return None
+        statement: Update = (
+            update(self.model)
+            .filter(self.model.user_id == user_id)
+            .values(**user_data, version=self.model.version + 1, modified_at=func.now())
+            .returning(*self.model.__table__.columns)
+        )
+        if expected_versions is not None:
+            statement = statement.filter(self.model.version.in_(expected_versions))
+
+        updated_user = aliased(self.model, statement.cte("updated_user"))
+        # the user may already be in the identity map of the request session, with the values before the update
+        query: Select = (
+            select(updated_user)
+            .options(defer(updated_user.password, raiseload=True))
+            .execution_options(populate_existing=True)
+        )
+
+        async with session_scope() as session:
+            user: Optional[User] = (await session.scalars(query)).unique().one_or_none()
+
+            if user is None:
+                exists_query: Select = select(self.model.user_id).filter_by(user_id=user_id)
+                if expected_versions is not None and await session.scalar(exists_query) is not None:
+                    raise VersionConflictError(f"user {user_id} has been modified")
+                return None
+
+            event: Optional[OutboxMessage] = self.outbox_manager.create_user_event_message(
+                "user_updated", user_id=user_id, fields=sorted(user_data)
+            )
+            if event is not None:
+                session.add(event)
+            await session.commit()
 
-        async with async_session_maker() as session:
-            for field, value in user_data.items():
-                setattr(user, field, value)
+        await principal_cache.publish_invalidation(user_id)
+        # the counts are filtered and searched by several of the columns, so any change may move them
+        if user_data:
+            await self.user_counter.invalidate()
+
+        return user
 
-            user.modified_at = datetime.datetime.now(tz=config.get_timezone())
+    @db_operation
+    async def replace_password_hash(self, user_id: uuid.UUID, old_hash: str, new_hash: str) -> bool:
+        """Store a re-hashed password unless the password has been changed since 'old_hash' was read."""
+        async with session_scope() as session:
+            replaced_user_id: Optional[uuid.UUID] = await session.scalar(
+                update(self.model)
+                .filter_by(user_id=user_id, password=old_hash)
+                .values(password=new_hash)
+                .returning(self.model.user_id)
+            )
 
-            session.add(user)
             await session.commit()
 
-        return user
+        return replaced_user_id is not None
 
+    @db_operation
     async def delete_user(self, user_id: uuid.UUID) -> uuid.UUID:
-        async with async_session_maker() as session:
+        async with session_scope() as session:
             deleted_user_id: uuid.UUID = await session.scalar(
                 delete(self.model).filter_by(user_id=user_id).returning(self.model.user_id)
             )
 
+            event: Optional[OutboxMessage] = self.outbox_manager.create_user_event_message(
+                "user_deleted", user_id=user_id
+            )
+            if deleted_user_id is not None and event is not None:
+                session.add(event)
             await session.commit()
 
+        await principal_cache.publish_invalidation(user_id)
+        await self.user_counter.invalidate()
+
         return deleted_user_id
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import List, Optional
+
+from redis.asyncio import Redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+
+from user_management.config import config
+from user_management.logger_settings import logger
+from user_management.metrics.registry import MetricsRegistry, Snapshot
+from user_management.redis_settings import get_redis_client
+
+
+class WorkerMetrics:
+    """Share the metrics of this worker with the other workers of the host through Redis.
+
+    Every worker stores a snapshot of its metrics every 'push_interval' seconds in a hash of the host, and the time
+    of the push in a sorted set of the host. Collecting sums the snapshots of the workers which pushed within the
+    last three intervals, so any worker can answer a scrape for all of them. The cumulative metrics of the other
+    workers are moved to the retired totals of the host, which are added to the sum, so a worker going away does not
+    look like a counter reset, as prometheus_client keeps the counters of dead processes in multiprocess mode.
+    If Redis is unavailable, only the metrics of this worker are returned.
+    """
+
+    key_prefix = "metrics:"  # noqa: S105
+    heartbeat_key_prefix = "metrics_heartbeat:"  # noqa: S105
+    retired_key_prefix = "metrics_retired:"  # noqa: S105
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        redis_client: Optional[Redis] = None,
+        push_interval: float = config.METRICS_PUSH_INTERVAL_SECONDS,
+        host: Optional[str] = None,
+        worker_id: Optional[str] = None,
+    ):
+        self.registry = registry
+        self.redis_client = redis_client
+        self.push_interval = push_interval
+        self.host: str = host or socket.gethostname()
+        self.worker_id: str = worker_id or str(os.getpid())
+
+    def get_redis_client(self) -> Redis:
+        return self.redis_client if self.redis_client is not None else get_redis_client()
+
+    @property
+    def key(self) -> str:
+        return f"{self.key_prefix}{self.host}"
+
+    @property
+    def heartbeat_key(self) -> str:
+        return f"{self.heartbeat_key_prefix}{self.host}"
+
+    @property
+    def retired_key(self) -> str:
+        return f"{self.retired_key_prefix}{self.host}"
+
+    @property
+    def ttl(self) -> float:
+        return self.push_interval * 3
+
+    async def push(self) -> None:
+        snapshot: str = json.dumps(self.registry.snapshot())
+
+        async with self.get_redis_client().pipeline(transaction=True) as pipe:
+            pipe.hset(self.key, self.worker_id, snapshot)
+            pipe.zadd(self.heartbeat_key, {self.worker_id: time.time()})
+            # the keys of a host whose workers have all stopped expire with the last snapshot
+            pipe.pexpire(self.key, int(self.ttl * 1000))
+            pipe.pexpire(self.heartbeat_key, int(self.ttl * 1000))
+            pipe.pexpire(self.retired_key, int(self.ttl * 1000))
+            await pipe.execute()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.push()
+            except RedisError as e:
+                logger.error(e)
+
+            await asyncio.sleep(self.push_interval)
+
+    async def retire(self, workers: Optional[List[str]] = None) -> None:
+        """Add the last snapshots of 'workers', or of the workers which stopped pushing, to the retired totals.
+
+        Only the cumulative metrics are kept. The sorted set and the totals are watched, so a worker retired
+        by several workers at once, or pushing again meanwhile, is added once, and the totals are never read
+        without the snapshots moved to them.
+        """
+
+        async def move_snapshots(pipe: Pipeline) -> None:
+            retired_workers: Optional[List] = workers
+            if retired_workers is None:
+                retired_workers = await pipe.zrangebyscore(self.heartbeat_key, "-inf", f"({time.time() - self.ttl}")
+            if not retired_workers:
+                return
+
+            snapshots: List[Optional[bytes]] = await pipe.hmget(self.key, retired_workers)
+            retired: Optional[bytes] = await pipe.get(self.retired_key)
+            totals: Snapshot = self.registry.merge(
+                [
+                    *([json.loads(retired)] if retired is not None else []),
+                    *(self.registry.cumulative(json.loads(snapshot)) for snapshot in snapshots if snapshot is not None),
+                ]
+            )
+
+            pipe.multi()
+            pipe.set(self.retired_key, json.dumps(totals), px=int(self.ttl * 1000))
+            pipe.hdel(self.key, *retired_workers)
+            pipe.zrem(self.heartbeat_key, *retired_workers)
+
+        await self.get_redis_client().transaction(move_snapshots, self.heartbeat_key, self.retired_key)
+
+    async def remove(self) -> None:
+        try:
+            await self.push()
+            await self.retire([self.worker_id])
+        except RedisError as e:
+            logger.error(e)
+
+    async def collect(self) -> Snapshot:
+        try:
+            await self.push()
+            await self.retire()
+
+            async with self.get_redis_client().pipeline(transaction=True) as pipe:
+                pipe.hgetall(self.key)
+                pipe.get(self.retired_key)
+                snapshots, retired = await pipe.execute()
+        except RedisError as e:
+            logger.error(e)
+            return self.registry.snapshot()
+
+        return self.registry.merge(
+            [*(json.loads(snapshot) for snapshot in snapshots.values()), *([json.loads(retired)] if retired else [])]
+        )
@@ -0,0 +1,55 @@
+import functools
+from contextvars import ContextVar
+from typing import Awaitable, Callable, TypeVar
+
+from user_management.metrics.registry import Gauge, Histogram, MetricsRegistry
+
+HASHING_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+registry = MetricsRegistry()
+
+http_request_duration: Histogram = registry.histogram(
+    "um_http_request_duration_seconds", "Time to handle a request, by route and status code", ("route", "status")
+)
+http_requests_in_flight: Gauge = registry.gauge("um_http_requests_in_flight", "Requests being handled")
+db_query_duration: Histogram = registry.histogram(
+    "um_db_query_duration_seconds", "Time to run a database statement, by manager method", ("operation",)
+)
+redis_command_duration: Histogram = registry.histogram(
+    "um_redis_command_duration_seconds", "Time to run a Redis command, by command", ("command",)
+)
+rabbitmq_publish_duration: Histogram = registry.histogram(
+    "um_rabbitmq_publish_duration_seconds",
+    "Time from publishing a message to its confirmation by the broker, by queue and outcome",
+    ("queue", "outcome"),
+)
+password_hashing_duration: Histogram = registry.histogram(
+    "um_password_hashing_duration_seconds",
+    "Time to hash or verify a password, including the wait for a hashing worker",
+    ("operation",),
+    buckets=HASHING_BUCKETS,
+)
+password_hashing_queue_depth: Gauge = registry.gauge(
+    "um_password_hashing_queue_depth", "Passwords waiting for a hashing worker"
+)
+s3_upload_duration: Histogram = registry.histogram("um_s3_upload_duration_seconds", "Time to upload a file to S3")
+
+# the manager method whose statements are being run, the label of db_query_duration
+current_db_operation: ContextVar[str] = ContextVar("current_db_operation", default="other")
+
+ReturnType = TypeVar("ReturnType")
+
+
+def db_operation(method: Callable[..., Awaitable[ReturnType]]) -> Callable[..., Awaitable[ReturnType]]:
+    """Label the statements run by a manager method with its name, nested calls with the name of the nested method."""
+    operation: str = method.__qualname__
+
+    @functools.wraps(method)
+    async def run_operation(*args, **kwargs) -> ReturnType:
+        token = current_db_operation.set(operation)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            current_db_operation.reset(token)
+
+    return run_operation
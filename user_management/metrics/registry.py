@@ -0,0 +1,193 @@
+import bisect
+import contextlib
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LabelValues = Tuple[str, ...]
+# {metric name: [[label values, value or histogram series], ...]}, the form in which workers exchange their metrics
+Snapshot = Dict[str, List[List]]
+
+
+def format_labels(label_names: Sequence[str], label_values: Sequence[str]) -> str:
+    if not label_names:
+        return ""
+
+    escaped_values = (
+        str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n") for value in label_values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(label_names, escaped_values)) + "}"
+
+
+def format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Histogram:
+    """Observations counted into buckets, per label values.
+
+    A series is a list of the counts of each bucket, of the observations above the last bucket and their sum.
+    Observations are made on the event loop only, so no lock is needed.
+    """
+
+    type_name = "histogram"
+    # the series only grow, so they are kept after the worker is gone
+    cumulative = True
+
+    def __init__(
+        self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Tuple[str, ...] = tuple(label_names)
+        self.buckets: Tuple[float, ...] = tuple(buckets)
+        self.series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series: Optional[List[float]] = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        started_at: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *label_values)
+
+    def samples(self) -> Dict[LabelValues, List[float]]:
+        return {label_values: list(series) for label_values, series in self.series.items()}
+
+    @staticmethod
+    def merge(first: List[float], second: List[float]) -> List[float]:
+        return [first_value + second_value for first_value, second_value in zip(first, second)]
+
+    def render(self, samples: Dict[LabelValues, List[float]]) -> Iterator[str]:
+        bucket_label_names: Tuple[str, ...] = (*self.label_names, "le")
+
+        for label_values, series in samples.items():
+            cumulative_count: float = 0
+            for upper_bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                cumulative_count += count
+                labels: str = format_labels(bucket_label_names, (*label_values, str(upper_bound)))
+                yield f"{self.name}_bucket{labels} {format_value(cumulative_count)}"
+
+            labels = format_labels(self.label_names, label_values)
+            yield f"{self.name}_sum{labels} {format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {format_value(cumulative_count)}"
+
+
+class Gauge:
+    """A value which goes up and down, per label values, or read from 'function' when the metrics are collected."""
+
+    type_name = "gauge"
+    cumulative = False
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Tuple[str, ...] = tuple(label_names)
+        self.values: Dict[LabelValues, float] = {}
+        self.function: Optional[Callable[[], float]] = None
+
+    def inc(self, *label_values: str) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + 1
+
+    def dec(self, *label_values: str) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) - 1
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.function = function
+
+    def samples(self) -> Dict[LabelValues, float]:
+        if self.function is not None:
+            return {(): self.function()}
+
+        return dict(self.values)
+
+    @staticmethod
+    def merge(first: float, second: float) -> float:
+        return first + second
+
+    def render(self, samples: Dict[LabelValues, float]) -> Iterator[str]:
+        for label_values, value in samples.items():
+            yield f"{self.name}{format_labels(self.label_names, label_values)} {format_value(value)}"
+
+
+Metric = Union[Histogram, Gauge]
+
+
+class MetricsRegistry:
+    """The metrics of a worker, rendered in the Prometheus text format.
+
+    The metrics of several workers are summed by merging their snapshots.
+    """
+
+    # the charset is added by the response
+    content_type = "text/plain; version=0.0.4"
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+
+        self.metrics[metric.name] = metric
+        return metric
+
+    def histogram(
+        self, name: str, documentation: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, label_names))
+
+    def snapshot(self) -> Snapshot:
+        return {
+            name: [[list(label_values), value] for label_values, value in metric.samples().items()]
+            for name, metric in self.metrics.items()
+        }
+
+    def cumulative(self, snapshot: Snapshot) -> Snapshot:
+        """Return the samples of the metrics which only grow."""
+        return {
+            name: samples
+            for name, samples in snapshot.items()
+            if name in self.metrics and self.metrics[name].cumulative
+        }
+
+    def merge(self, snapshots: Iterable[Snapshot]) -> Snapshot:
+        merged: Dict[str, Dict[LabelValues, Union[float, List[float]]]] = {name: {} for name in self.metrics}
+
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric: Optional[Metric] = self.metrics.get(name)
+                if metric is None:
+                    continue
+
+                for label_values, value in samples:
+                    label_values = tuple(label_values)
+                    previous = merged[name].get(label_values)
+                    merged[name][label_values] = value if previous is None else metric.merge(previous, value)
+
+        return {
+            name: [[list(label_values), value] for label_values, value in samples.items()]
+            for name, samples in merged.items()
+        }
+
+    def render(self, snapshot: Snapshot) -> str:
+        lines: List[str] = []
+
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type_name}")
+            lines.extend(metric.render({tuple(label_values): value for label_values, value in snapshot.get(name, [])}))
+
+        return "\n".join(lines) + "\n"
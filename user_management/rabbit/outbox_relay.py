@@ -0,0 +1,84 @@
+"""Relay messages from the outbox table to RabbitMQ.
+
+The relay runs inside every application process unless OUTBOX_RELAY_ENABLED is false, in which case it
+can be run as a separate worker:
+    python -m user_management.rabbit.outbox_relay
+"""
+import asyncio
+from typing import Dict, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from user_management.config import config
+from user_management.logger_settings import logger
+from user_management.managers.outbox_manager import OutboxManager
+from user_management.rabbit.settings import PikaClient, pika_client
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        publisher: PikaClient,
+        manager: Optional[OutboxManager] = None,
+        batch_size: int = config.OUTBOX_RELAY_BATCH_SIZE,
+        poll_interval: float = config.OUTBOX_RELAY_POLL_INTERVAL_SECONDS,
+        confirm_timeout: float = config.OUTBOX_RELAY_CONFIRM_TIMEOUT_SECONDS,
+        claim_seconds: float = config.OUTBOX_RELAY_CLAIM_SECONDS,
+    ):
+        self.publisher = publisher
+        self.manager = manager if manager is not None else OutboxManager()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.confirm_timeout = confirm_timeout
+        self.claim_seconds = claim_seconds
+        # messages sent by an earlier batch and not yet confirmed, by outbox message id
+        self.in_flight: Dict[int, asyncio.Future] = {}
+        self.relayed: int = 0
+        self.errors: int = 0
+
+    async def relay_once(self) -> int:
+        """Relay one batch, return how many messages were confirmed by the broker."""
+        if not self.publisher.is_connected:
+            return 0
+
+        try:
+            relayed: int = await self.manager.relay_batch(
+                publisher=self.publisher,
+                batch_size=self.batch_size,
+                confirm_timeout=self.confirm_timeout,
+                in_flight=self.in_flight,
+                claim_seconds=self.claim_seconds,
+            )
+        except SQLAlchemyError as e:
+            logger.error(e)
+            self.errors += 1
+            return 0
+
+        self.relayed += relayed
+
+        return relayed
+
+    async def run(self) -> None:
+        while True:
+            # a full batch means there is probably more waiting, so the next one is taken right away
+            if await self.relay_once() < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict:
+        return {"relayed": self.relayed, "errors": self.errors, "in_flight": len(self.in_flight)}
+
+
+outbox_relay: OutboxRelay = OutboxRelay(publisher=pika_client)
+
+
+async def main() -> None:
+    await pika_client.start()
+
+    try:
+        await outbox_relay.run()
+    finally:
+        await pika_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,50 +1,380 @@
-import json
-from datetime import datetime
-from typing import Dict
+import asyncio
+import contextlib
+import functools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 
 import pika
-import pytz
-from pika.exceptions import AMQPConnectionError
+from pika.adapters.asyncio_connection import AsyncioConnection
+from pika.channel import Channel
+from pika.exceptions import AMQPError
 
 from user_management.config import config
 from user_management.logger_settings import logger
+from user_management.metrics.instruments import rabbitmq_publish_duration
+from user_management.tracing import Span, format_traceparent, parse_traceparent, tracer
+
+
+class PublishError(Exception):
+    pass
+
+
+@dataclass(slots=True)
+class _Message:
+    queue_name: str
+    body: bytes
+    properties: pika.BasicProperties
+    future: asyncio.Future = field(repr=False)
 
 
 class PikaClient:
-    def __init__(self):
-        self.connection = None
-        self.channel = None
+    """Publisher which keeps one connection to the broker open for the lifetime of the application.
+
+    Messages are put into a bounded buffer and sent by a background task over a pool of channels in confirm mode.
+    A message is done when the broker acknowledges it. If the connection is lost, unconfirmed messages go back
+    to the buffer and are sent again after reconnecting, so delivery is at least once.
+    The buffer is sent in batches of 'send_batch_size', between which the event loop runs other tasks,
+    including the callbacks which deliver the confirmations.
+    """
+
+    def __init__(
+        self,
+        channel_pool_size: int = config.RABBITMQ_CHANNEL_POOL_SIZE,
+        max_buffered_messages: int = config.RABBITMQ_MAX_BUFFERED_MESSAGES,
+        reconnect_delay: float = config.RABBITMQ_RECONNECT_DELAY_SECONDS,
+        max_reconnect_delay: float = config.RABBITMQ_MAX_RECONNECT_DELAY_SECONDS,
+        send_batch_size: int = 100,
+        connection_factory: Optional[Callable] = None,
+    ):
         self.host = config.RABBITMQ_HOST
         self.port = config.RABBITMQ_PORT
+        self.channel_pool_size = channel_pool_size
+        self.max_buffered_messages = max_buffered_messages
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.send_batch_size = send_batch_size
+        self.connection_factory = connection_factory
+
+        self.connection = None
+        self.channels: List[Channel] = []
+        self._declared_queues: Set[str] = set()
+        self._next_channel: int = 0
+        self._delivery_tags: Dict[int, int] = {}
+        self._unconfirmed: Dict[int, Dict[int, _Message]] = {}
 
-    def connect(self):
+        self._buffer: Deque[_Message] = deque()
+        self._buffer_not_empty: Optional[asyncio.Event] = None
+        self._connected: Optional[asyncio.Event] = None
+        self._connection_closed: Optional[asyncio.Future] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closing: bool = False
+
+        self.published: int = 0
+        self.confirmed: int = 0
+        self.nacked: int = 0
+        self.reconnects: int = 0
+
+    def get_connection_parameters(self) -> pika.ConnectionParameters:
         credentials = pika.PlainCredentials(config.RABBITMQ_USERNAME, config.RABBITMQ_PASSWORD)
-        parameters = pika.ConnectionParameters(self.host, self.port, "/", credentials)
-        self.connection = pika.BlockingConnection(parameters)
-        self.channel = self.connection.channel()
+        return pika.ConnectionParameters(self.host, self.port, "/", credentials)
+
+    @property
+    def is_connected(self) -> bool:
+        return self._connected is not None and self._connected.is_set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer) + sum(len(messages) for messages in self._unconfirmed.values())
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+
+        self._closing = False
+        self._buffer_not_empty = asyncio.Event()
+        self._connected = asyncio.Event()
+        if self._buffer:
+            self._buffer_not_empty.set()
+
+        self._tasks = [
+            asyncio.create_task(self._maintain_connection()),
+            asyncio.create_task(self._send_buffered_messages()),
+        ]
+
+    async def close(self, timeout: float = 5) -> None:
+        """Wait up to `timeout` seconds for buffered messages to be confirmed, then close the connection."""
+        if not self._tasks:
+            return
 
-    def create_queue(self, queue_name):
-        self.channel.queue_declare(queue=queue_name)
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._wait_until_flushed(), timeout=timeout)
 
-    def close_connection(self):
-        if self.connection and not self.connection.is_closed:
+        self._closing = True
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+        if self.connection is not None and self.connection.is_open:
             self.connection.close()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(asyncio.shield(self._connection_closed), timeout=timeout)
+
+        self._fail_unsent(PublishError("publisher closed"))
+
+    def publish(self, queue_name: str, body: bytes, headers: Optional[Dict] = None) -> asyncio.Future:
+        """Buffer a message and return a future which is resolved once the broker confirms it.
+
+        The publish is traced as a child of the 'traceparent' header, if the message has one, else of the current
+        span, and the header is set to the trace context of the publish for the consumer.
+        """
+        if self.pending >= self.max_buffered_messages:
+            raise PublishError("publish buffer is full")
+
+        headers = dict(headers or {})
+        span: Span = tracer.start_span(
+            "amqp.publish",
+            parent=parse_traceparent(headers.get("traceparent")),
+            attributes={"messaging.destination": queue_name, "messaging.message_size": len(body)},
+        )
+        headers["traceparent"] = format_traceparent(span.context)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(functools.partial(self.record_publish, queue_name, span))
+        properties = pika.BasicProperties(headers=headers)
+        self._buffer.append(_Message(queue_name=queue_name, body=body, properties=properties, future=future))
+        if self._buffer_not_empty is not None:
+            self._buffer_not_empty.set()
+
+        return future
+
+    def withdraw(self, future: asyncio.Future) -> bool:
+        """Drop a message which is still buffered and cancel its future, return False if it has been sent already.
+
+        A sent message can not be taken back, its future is resolved when the broker confirms or rejects it.
+        """
+        message: Optional[_Message] = next((message for message in self._buffer if message.future is future), None)
+        if message is None:
+            return False
+
+        self._buffer.remove(message)
+        future.cancel()
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "connected": self.is_connected,
+            "channels": len(self.channels),
+            "buffered": len(self._buffer),
+            "unconfirmed": self.pending - len(self._buffer),
+            "published": self.published,
+            "confirmed": self.confirmed,
+            "nacked": self.nacked,
+            "reconnects": self.reconnects,
+        }
+
+    @staticmethod
+    def record_publish(queue_name: str, span: Span, future: asyncio.Future) -> None:
+        if future.cancelled():
+            outcome: str = "cancelled"
+        elif future.exception() is not None:
+            outcome = "failed"
+            span.record_error(future.exception())
+        else:
+            outcome = "confirmed"
+
+        rabbitmq_publish_duration.observe(time.perf_counter() - span.started_at, queue_name, outcome)
+        span.set_attribute("messaging.outcome", outcome)
+        tracer.end_span(span)
+
+    @staticmethod
+    def log_publish_failure(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("message was not published: %s", future.exception())
+
+    async def _wait_until_flushed(self) -> None:
+        while self.pending:
+            await asyncio.sleep(0.01)
+
+    async def _maintain_connection(self) -> None:
+        delay: float = self.reconnect_delay
+
+        while not self._closing:
+            try:
+                await self._connect()
+            except (AMQPError, OSError, asyncio.TimeoutError) as e:
+                logger.error("rabbitmq connection failed: %r", e)
+            else:
+                delay = self.reconnect_delay
+                self._connected.set()
+                reason = await asyncio.shield(self._connection_closed)
+                logger.error("rabbitmq connection lost: %s", reason)
+
+            self._on_disconnected()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        opened: asyncio.Future = loop.create_future()
+        self._connection_closed = loop.create_future()
+
+        def on_open(connection) -> None:
+            if not opened.done():
+                opened.set_result(connection)
+
+        def on_open_error(connection, error) -> None:
+            if not opened.done():
+                opened.set_exception(error if isinstance(error, BaseException) else AMQPError(error))
+
+        def on_close(connection, reason) -> None:
+            if not opened.done():
+                opened.set_exception(reason)
+            if not self._connection_closed.done():
+                self._connection_closed.set_result(reason)
+
+        factory = self.connection_factory or functools.partial(AsyncioConnection, custom_ioloop=loop)
+        self.connection = factory(
+            parameters=self.get_connection_parameters(),
+            on_open_callback=on_open,
+            on_open_error_callback=on_open_error,
+            on_close_callback=on_close,
+        )
+        await opened
 
-    def publish_message(self, email: str, reset_url: str, queue_name: str):
         try:
-            self.connect()
-            self.create_queue(queue_name)
-
-            properties: pika.BasicProperties = pika.BasicProperties(headers={"email": f"{email}"})
-            body: Dict = {
-                "reset_url": reset_url,
-                "publish_datetime": datetime.now(tz=pytz.timezone(config.TIMEZONE)).isoformat(),
-            }
-            self.channel.basic_publish(
-                exchange="", routing_key=queue_name, body=json.dumps(body), properties=properties
-            )
-        except AMQPConnectionError as e:
-            logger.error(e)
-
-        finally:
-            self.close_connection()
+            self.channels = [await self._open_channel() for _ in range(self.channel_pool_size)]
+        except BaseException:
+            if self.connection.is_open:
+                self.connection.close()
+            raise
+
+    async def _open_channel(self) -> Channel:
+        loop = asyncio.get_running_loop()
+        opened: asyncio.Future = loop.create_future()
+        confirm_enabled: asyncio.Future = loop.create_future()
+
+        self.connection.channel(on_open_callback=opened.set_result)
+        channel: Channel = await asyncio.wait_for(opened, timeout=self.max_reconnect_delay)
+        channel.add_on_close_callback(self._on_channel_closed)
+
+        self._delivery_tags[channel.channel_number] = 0
+        self._unconfirmed[channel.channel_number] = {}
+        channel.confirm_delivery(
+            ack_nack_callback=functools.partial(self._on_delivery_confirmation, channel.channel_number),
+            callback=confirm_enabled.set_result,
+        )
+        await asyncio.wait_for(confirm_enabled, timeout=self.max_reconnect_delay)
+
+        return channel
+
+    async def _declare_queue(self, channel: Channel, queue_name: str) -> None:
+        if queue_name in self._declared_queues:
+            return
+
+        declared: asyncio.Future = asyncio.get_running_loop().create_future()
+        channel.queue_declare(queue=queue_name, callback=declared.set_result)
+        await asyncio.wait_for(declared, timeout=self.max_reconnect_delay)
+        self._declared_queues.add(queue_name)
+
+    def _on_channel_closed(self, channel: Channel, reason) -> None:
+        # a channel is only closed by the broker after an error, reopening everything keeps the pool consistent
+        if not self._closing and self.connection is not None and self.connection.is_open:
+            logger.error("rabbitmq channel %s closed: %s", channel.channel_number, reason)
+            self.connection.close()
+
+    def _on_disconnected(self) -> None:
+        self._connected.clear()
+        self.channels = []
+        self._declared_queues.clear()
+        self._delivery_tags.clear()
+
+        unconfirmed: List[Tuple[int, _Message]] = []
+        for messages in self._unconfirmed.values():
+            unconfirmed.extend(messages.items())
+        self._unconfirmed.clear()
+
+        # the order between channels is not known any more, inside a channel it follows the delivery tag
+        for _, message in sorted(unconfirmed, key=lambda item: item[0], reverse=True):
+            self._buffer.appendleft(message)
+        if self._buffer:
+            self._buffer_not_empty.set()
+
+    def _on_delivery_confirmation(self, channel_number: int, method_frame) -> None:
+        method = method_frame.method
+        unconfirmed: Dict[int, _Message] = self._unconfirmed.get(channel_number, {})
+
+        if method.multiple:
+            delivery_tags = [delivery_tag for delivery_tag in unconfirmed if delivery_tag <= method.delivery_tag]
+        else:
+            delivery_tags = [method.delivery_tag]
+
+        acked: bool = isinstance(method, pika.spec.Basic.Ack)
+        for delivery_tag in delivery_tags:
+            message: Optional[_Message] = unconfirmed.pop(delivery_tag, None)
+            if message is None or message.future.done():
+                continue
+
+            if acked:
+                self.confirmed += 1
+                message.future.set_result(None)
+            else:
+                self.nacked += 1
+                message.future.set_exception(PublishError("message was rejected by the broker"))
+
+    async def _send_buffered_messages(self) -> None:
+        sent_in_batch: int = 0
+
+        while True:
+            # waiting on a set event does not suspend the task, so it yields to the event loop between batches
+            sent_in_batch += 1
+            if sent_in_batch > self.send_batch_size:
+                sent_in_batch = 0
+                await asyncio.sleep(0)
+
+            await self._buffer_not_empty.wait()
+            await self._connected.wait()
+
+            if not self._buffer:
+                self._buffer_not_empty.clear()
+                continue
+
+            message: _Message = self._buffer.popleft()
+            if message.future.done():
+                continue
+
+            channel: Channel = self.channels[self._next_channel % len(self.channels)]
+            self._next_channel += 1
+
+            try:
+                await self._declare_queue(channel, message.queue_name)
+                channel.basic_publish(
+                    exchange="", routing_key=message.queue_name, body=message.body, properties=message.properties
+                )
+            except (AMQPError, asyncio.TimeoutError) as e:
+                logger.error("rabbitmq publish failed: %s", e)
+                self._buffer.appendleft(message)
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self._delivery_tags[channel.channel_number] += 1
+            self._unconfirmed[channel.channel_number][self._delivery_tags[channel.channel_number]] = message
+            self.published += 1
+
+    def _fail_unsent(self, error: Exception) -> None:
+        for messages in self._unconfirmed.values():
+            self._buffer.extend(messages.values())
+        self._unconfirmed.clear()
+
+        while self._buffer:
+            message: _Message = self._buffer.popleft()
+            if not message.future.done():
+                message.future.set_exception(error)
+
+
+pika_client: PikaClient = PikaClient()
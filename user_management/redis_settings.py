@@ -1,11 +1,92 @@
+import time
+from typing import Dict, Optional
+
 from redis import asyncio as aioredis
 
 from user_management.config import config
+from user_management.metrics.instruments import redis_command_duration
+
+
+class InstrumentedConnectionPool(aioredis.BlockingConnectionPool):
+    """A blocking connection pool which counts checkouts and the time spent waiting for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts: int = 0
+        self.waiting: int = 0
+        self.wait_time_seconds: float = 0
+
+    async def get_connection(self, command_name, *keys, **options):
+        started_at: float = time.perf_counter()
+        self.waiting += 1
+
+        try:
+            connection = await super().get_connection(command_name, *keys, **options)
+        finally:
+            self.waiting -= 1
+            self.wait_time_seconds += time.perf_counter() - started_at
+
+        self.checkouts += 1
+
+        return connection
+
+    def stats(self) -> Dict:
+        return {
+            "max_connections": self.max_connections,
+            "in_use": len(self._in_use_connections),
+            "idle": len(self._available_connections),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "wait_time_seconds": round(self.wait_time_seconds, 6),
+        }
+
+
+class InstrumentedRedis(aioredis.Redis):
+    """A client which records the time of every command, by command name. Pipelines are not timed."""
+
+    async def execute_command(self, *args, **options):
+        with redis_command_duration.time(str(args[0])):
+            return await super().execute_command(*args, **options)
+
+
+redis_pool: Optional[InstrumentedConnectionPool] = None
+
+
+def create_redis_pool(**connection_kwargs) -> InstrumentedConnectionPool:
+    settings: Dict = {
+        "max_connections": config.REDIS_MAX_CONNECTIONS,
+        "timeout": config.REDIS_POOL_TIMEOUT,
+        "socket_timeout": config.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": config.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": config.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+    settings.update(connection_kwargs)
+
+    return InstrumentedConnectionPool.from_url(config.redis_url, **settings)
+
+
+def get_redis_pool() -> InstrumentedConnectionPool:
+    """Return the pool shared by the whole process, creating it on first use."""
+    global redis_pool
+
+    if redis_pool is None:
+        redis_pool = create_redis_pool()
+
+    return redis_pool
+
+
+async def close_redis_pool() -> None:
+    global redis_pool
+
+    if redis_pool is not None:
+        await redis_pool.disconnect()
+        redis_pool = None
+
+
+def get_redis_client() -> aioredis.Redis:
+    """Return a client bound to the shared pool. Closing the client does not close the pool."""
+    return InstrumentedRedis(connection_pool=get_redis_pool())
 
 
-async def get_redis_client():
-    redis_client: aioredis.Redis = await aioredis.from_url(config.redis_url)
-    try:
-        yield redis_client
-    finally:
-        await redis_client.aclose()
+def get_redis_pool_stats() -> Dict:
+    return get_redis_pool().stats()
@@ -0,0 +1,213 @@
+"""In-process tracing with W3C trace context propagation.
+
+A span is current within the task which opened it and the tasks started from there. Whether a trace is recorded
+is decided when its first span is opened, from the 'traceparent' of the caller or by TRACING_SAMPLE_RATE,
+and spans of traces which are not recorded only carry the trace context to outgoing messages.
+"""
+import abc
+import contextlib
+import datetime
+import json
+import queue
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Tuple, Type
+
+from user_management.config import config
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+@dataclass(slots=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context.trace_id}-{context.span_id}-{'01' if context.sampled else '00'}"
+
+
+def parse_traceparent(traceparent: Optional[str]) -> Optional[SpanContext]:
+    match: Optional[re.Match] = TRACEPARENT_PATTERN.match(traceparent.strip().lower()) if traceparent else None
+    if match is None or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+
+    trace_id, span_id, flags = match.groups()
+    return SpanContext(trace_id=trace_id, span_id=span_id, sampled=bool(int(flags, 16) & 1))
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    context: SpanContext
+    parent_span_id: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    started_at: float = field(default_factory=time.perf_counter)
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.context.sampled:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = repr(error)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time": datetime.datetime.fromtimestamp(self.start_time, tz=datetime.timezone.utc).isoformat(),
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": "error" if self.error else "ok",
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter(abc.ABC):
+    """Receives every finished span of a recorded trace. Called on the event loop, so it must not block."""
+
+    @abc.abstractmethod
+    def export(self, span: Span) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Write spans as JSON lines to a stream, from a background thread."""
+
+    def __init__(self, open_stream: Callable[[], IO[str]]):
+        self.open_stream = open_stream
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        # a finished span is not changed any more, so it is serialized by the writing thread
+        self._queue.put(span)
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _write(self) -> None:
+        stream: IO[str] = self.open_stream()
+        try:
+            while (span := self._queue.get()) is not None:
+                stream.write(json.dumps(span.to_dict(), default=str) + "\n")
+                if self._queue.empty():
+                    stream.flush()
+        finally:
+            stream.flush()
+            if stream is not sys.stdout:
+                stream.close()
+
+
+def create_span_exporter(exporter_name: str = config.TRACING_EXPORTER) -> Optional[SpanExporter]:
+    if exporter_name == "stdout":
+        return JsonLinesSpanExporter(lambda: sys.stdout)
+    if exporter_name == "file":
+        return JsonLinesSpanExporter(lambda: open(config.TRACING_FILE, "a", encoding="utf-8"))  # noqa: SIM115
+    return None
+
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Open spans and pass the finished spans of recorded traces to the exporter.
+
+    Without an exporter no trace is recorded, but the trace context is still propagated.
+    """
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = config.TRACING_SAMPLE_RATE):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def should_sample(self) -> bool:
+        return self.exporter is not None and random.random() < self.sample_rate  # noqa: S311
+
+    def start_span(
+        self, name: str, parent: Optional[SpanContext] = None, attributes: Optional[Dict[str, Any]] = None
+    ) -> Span:
+        """Start a span, a child of 'parent' or else of the current span. It is not made current."""
+        if parent is None and (current := current_span.get()) is not None:
+            parent = current.context
+
+        if parent is None:
+            context = SpanContext(
+                trace_id=secrets.token_hex(16), span_id=secrets.token_hex(8), sampled=self.should_sample()
+            )
+        else:
+            context = SpanContext(trace_id=parent.trace_id, span_id=secrets.token_hex(8), sampled=parent.sampled)
+
+        span = Span(name=name, context=context, parent_span_id=parent.span_id if parent is not None else None)
+        if attributes and context.sampled:
+            span.attributes.update(attributes)
+
+        return span
+
+    def start_child_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Start a span of the current recorded trace, or return None. Used for frequent low level operations."""
+        current: Optional[Span] = current_span.get()
+        if current is None or not current.context.sampled:
+            return None
+
+        return self.start_span(name, parent=current.context, attributes=attributes)
+
+    def end_span(self, span: Span) -> None:
+        span.duration = time.perf_counter() - span.started_at
+        if span.context.sampled and self.exporter is not None:
+            self.exporter.export(span)
+
+    @contextlib.contextmanager
+    def span(
+        self,
+        name: str,
+        parent: Optional[SpanContext] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        expected_errors: Tuple[Type[BaseException], ...] = (),
+    ) -> Iterator[Span]:
+        """Open a span which is current until the block exits.
+
+        The span fails if the block raises an error, unless it is one of 'expected_errors'.
+        """
+        span: Span = self.start_span(name, parent=parent, attributes=attributes)
+        token = current_span.set(span)
+
+        try:
+            yield span
+        except expected_errors:
+            raise
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            current_span.reset(token)
+            self.end_span(span)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+def get_current_traceparent() -> Optional[str]:
+    span: Optional[Span] = current_span.get()
+    return format_traceparent(span.context) if span is not None else None
+
+
+tracer = Tracer(exporter=create_span_exporter())